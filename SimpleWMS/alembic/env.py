@@ -8,6 +8,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 # Import de la base SQLAlchemy et des modèles
 from app.database.database import Base
+from app.database.config import DatabaseSettings
 import app.models.article
 import app.models.agent
 import app.models.commande
@@ -24,6 +25,9 @@ config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
+# Même base que l'application (variables DATABASE_*)
+config.set_main_option("sqlalchemy.url", DatabaseSettings.from_env().url.replace("%", "%%"))
+
 # Cible pour autogénération
 target_metadata = Base.metadata
 
@@ -0,0 +1,53 @@
+"""Add secondary indexes and reservation duration
+
+Revision ID: 3f6c9a2b7d15
+Revises: d1467207527b
+Create Date: 2026-10-18 09:12:41.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f6c9a2b7d15'
+down_revision: Union[str, None] = 'd1467207527b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Databases created with create_all already have the column
+    columns = [column['name'] for column in sa.inspect(op.get_bind()).get_columns('reservations')]
+    if 'duree_minutes' not in columns:
+        op.add_column('reservations', sa.Column('duree_minutes', sa.Integer(), server_default='60', nullable=False))
+
+    op.create_index('ix_reservations_salle_id_date_heure', 'reservations', ['salle_id', 'date', 'heure'], unique=True)
+    op.create_index('ix_lignes_commandes_commande_id', 'lignes_commandes', ['commande_id'], unique=False)
+    op.create_index('ix_lignes_commandes_article_id', 'lignes_commandes', ['article_id'], unique=False)
+    op.create_index('ix_implantations_article_id_emplacement_id_quantite', 'implantations', ['article_id', 'emplacement_id', 'quantite'], unique=False)
+    op.create_index('ix_implantations_emplacement_id', 'implantations', ['emplacement_id'], unique=False)
+    op.create_index('ix_missions_agent_id', 'missions', ['agent_id'], unique=False)
+    op.create_index('ix_missions_article_id', 'missions', ['article_id'], unique=False)
+    op.create_index('ix_missions_etat_type', 'missions', ['etat', 'type'], unique=False)
+    op.create_index('ix_receptions_article_id', 'receptions', ['article_id'], unique=False)
+    op.create_index('ix_receptions_emplacement_id', 'receptions', ['emplacement_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_receptions_emplacement_id', table_name='receptions')
+    op.drop_index('ix_receptions_article_id', table_name='receptions')
+    op.drop_index('ix_missions_etat_type', table_name='missions')
+    op.drop_index('ix_missions_article_id', table_name='missions')
+    op.drop_index('ix_missions_agent_id', table_name='missions')
+    op.drop_index('ix_implantations_emplacement_id', table_name='implantations')
+    op.drop_index('ix_implantations_article_id_emplacement_id_quantite', table_name='implantations')
+    op.drop_index('ix_lignes_commandes_article_id', table_name='lignes_commandes')
+    op.drop_index('ix_lignes_commandes_commande_id', table_name='lignes_commandes')
+    op.drop_index('ix_reservations_salle_id_date_heure', table_name='reservations')
+    with op.batch_alter_table('reservations') as batch_op:
+        batch_op.drop_column('duree_minutes')
@@ -0,0 +1,33 @@
+"""Add picking route and rank to missions
+
+Revision ID: 5d3a7c1e9b24
+Revises: 8b2e4d6f1a90
+Create Date: 2026-10-18 16:42:08.517306
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d3a7c1e9b24'
+down_revision: Union[str, None] = '8b2e4d6f1a90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('missions', sa.Column('tournee_id', sa.String(), nullable=True))
+    op.add_column('missions', sa.Column('ordre', sa.Integer(), nullable=True))
+    op.create_index('ix_missions_tournee_id_ordre', 'missions', ['tournee_id', 'ordre'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_missions_tournee_id_ordre', table_name='missions')
+    with op.batch_alter_table('missions') as batch_op:
+        batch_op.drop_column('ordre')
+        batch_op.drop_column('tournee_id')
@@ -0,0 +1,42 @@
+"""Add row version and modification date to salles and articles
+
+Revision ID: 8b2e4d6f1a90
+Revises: 3f6c9a2b7d15
+Create Date: 2026-10-18 14:03:27.884120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2e4d6f1a90'
+down_revision: Union[str, None] = '3f6c9a2b7d15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in ('salles', 'articles'):
+        # SQLite cannot add a column with a non-constant default: existing rows
+        # are stamped first, then the column is made NOT NULL
+        op.add_column(table, sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+        op.add_column(table, sa.Column('date_modification', sa.DateTime(), nullable=True))
+        op.execute(
+            sa.table(table, sa.column('date_modification'))
+            .update()
+            .values(date_modification=sa.func.current_timestamp())
+        )
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('date_modification', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('articles', 'salles'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('date_modification')
+            batch_op.drop_column('version')
@@ -0,0 +1,42 @@
+"""Add picking waves
+
+Revision ID: a4f81c2d6e37
+Revises: 5d3a7c1e9b24
+Create Date: 2026-10-18 17:25:51.203984
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4f81c2d6e37'
+down_revision: Union[str, None] = '5d3a7c1e9b24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'vagues',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('strategie', sa.Enum('ARTICLES', 'ZONE', 'TAILLE', name='strategievague'), nullable=False),
+        sa.Column('date_creation', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    with op.batch_alter_table('commandes') as batch_op:
+        batch_op.add_column(sa.Column('vague_id', sa.String(), nullable=True))
+        batch_op.create_foreign_key('fk_commandes_vague_id_vagues', 'vagues', ['vague_id'], ['id'])
+        batch_op.create_index('ix_commandes_etat_vague_id', ['etat', 'vague_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('commandes') as batch_op:
+        batch_op.drop_index('ix_commandes_etat_vague_id')
+        batch_op.drop_constraint('fk_commandes_vague_id_vagues', type_='foreignkey')
+        batch_op.drop_column('vague_id')
+    op.drop_table('vagues')
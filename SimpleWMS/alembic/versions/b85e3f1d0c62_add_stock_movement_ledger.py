@@ -0,0 +1,72 @@
+"""Add the stock movement ledger and its snapshots
+
+Revision ID: b85e3f1d0c62
+Revises: e3b9d4f6a217
+Create Date: 2026-10-18 12:02:17.418305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b85e3f1d0c62'
+down_revision: Union[str, None] = 'e3b9d4f6a217'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'stock_snapshots',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('date_snapshot', sa.DateTime(), nullable=False),
+        sa.Column('mouvement_id', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_stock_snapshots_date_snapshot', 'stock_snapshots', ['date_snapshot'], unique=False)
+    op.create_table(
+        'mouvements',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('article_id', sa.String(), nullable=False),
+        sa.Column('emplacement_id', sa.String(), nullable=False),
+        sa.Column('quantite', sa.Integer(), nullable=False),
+        sa.Column('type', sa.Enum('RECEPTION', 'MISSION', 'AJUSTEMENT', 'INVENTAIRE', name='typemouvement'),
+                  nullable=False),
+        sa.Column('reference', sa.String(), nullable=True),
+        sa.Column('date_mouvement', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['article_id'], ['articles.id'], ),
+        sa.ForeignKeyConstraint(['emplacement_id'], ['emplacements.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_mouvements_article_id_emplacement_id', 'mouvements', ['article_id', 'emplacement_id'],
+                    unique=False)
+    op.create_index('ix_mouvements_date_mouvement', 'mouvements', ['date_mouvement'], unique=False)
+    op.create_table(
+        'stock_snapshots_lignes',
+        sa.Column('snapshot_id', sa.Integer(), nullable=False),
+        sa.Column('article_id', sa.String(), nullable=False),
+        sa.Column('emplacement_id', sa.String(), nullable=False),
+        sa.Column('quantite', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['snapshot_id'], ['stock_snapshots.id'], ),
+        sa.PrimaryKeyConstraint('snapshot_id', 'article_id', 'emplacement_id'),
+    )
+    # Opening balance: the current stock becomes the first movement of each implantation
+    op.execute(
+        "INSERT INTO mouvements (article_id, emplacement_id, quantite, type, reference, date_mouvement) "
+        "SELECT article_id, emplacement_id, quantite, 'AJUSTEMENT', id, CURRENT_TIMESTAMP "
+        "FROM implantations WHERE quantite <> 0"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('stock_snapshots_lignes')
+    op.drop_index('ix_mouvements_date_mouvement', table_name='mouvements')
+    op.drop_index('ix_mouvements_article_id_emplacement_id', table_name='mouvements')
+    op.drop_table('mouvements')
+    op.drop_index('ix_stock_snapshots_date_snapshot', table_name='stock_snapshots')
+    op.drop_table('stock_snapshots')
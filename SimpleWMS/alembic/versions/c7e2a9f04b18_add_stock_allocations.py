@@ -0,0 +1,48 @@
+"""Add reserved quantity to implantations and stock allocations
+
+Revision ID: c7e2a9f04b18
+Revises: a4f81c2d6e37
+Create Date: 2026-10-18 18:11:36.740215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e2a9f04b18'
+down_revision: Union[str, None] = 'a4f81c2d6e37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('implantations', sa.Column('quantite_reservee', sa.Integer(), server_default='0', nullable=False))
+    op.create_table(
+        'allocations',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('ligne_id', sa.String(), nullable=False),
+        sa.Column('implantation_id', sa.String(), nullable=False),
+        sa.Column('quantite', sa.Integer(), nullable=False),
+        sa.Column('mission_id', sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(['implantation_id'], ['implantations.id'], ),
+        sa.ForeignKeyConstraint(['ligne_id'], ['lignes_commandes.id'], ),
+        sa.ForeignKeyConstraint(['mission_id'], ['missions.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_allocations_implantation_id', 'allocations', ['implantation_id'], unique=False)
+    op.create_index('ix_allocations_ligne_id', 'allocations', ['ligne_id'], unique=False)
+    op.create_index('ix_allocations_mission_id', 'allocations', ['mission_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_allocations_mission_id', table_name='allocations')
+    op.drop_index('ix_allocations_ligne_id', table_name='allocations')
+    op.drop_index('ix_allocations_implantation_id', table_name='allocations')
+    op.drop_table('allocations')
+    with op.batch_alter_table('implantations') as batch_op:
+        batch_op.drop_column('quantite_reservee')
@@ -20,13 +20,33 @@ depends_on: Union[str, Sequence[str], None] = None
 
 def upgrade() -> None:
     """Upgrade schema."""
-    # ### commands auto generated by Alembic - please adjust! ###
-    pass
-    # ### end Alembic commands ###
+    # This revision was first generated empty; databases created with
+    # create_all and stamped afterwards already have the tables.
+    tables = sa.inspect(op.get_bind()).get_table_names()
+    if 'salles' not in tables:
+        op.create_table('salles',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('nom', sa.String(), nullable=False),
+        sa.Column('capacite', sa.Integer(), nullable=False),
+        sa.Column('localisation', sa.String(), nullable=False),
+        sa.Column('disponible', sa.Boolean(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('nom')
+        )
+    if 'reservations' not in tables:
+        op.create_table('reservations',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('salle_id', sa.String(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('heure', sa.Time(), nullable=False),
+        sa.Column('utilisateur', sa.String(), nullable=False),
+        sa.Column('commentaire', sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(['salle_id'], ['salles.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
 
 
 def downgrade() -> None:
     """Downgrade schema."""
-    # ### commands auto generated by Alembic - please adjust! ###
-    pass
-    # ### end Alembic commands ###
+    op.drop_table('reservations')
+    op.drop_table('salles')
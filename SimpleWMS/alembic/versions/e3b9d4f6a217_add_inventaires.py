@@ -0,0 +1,70 @@
+"""Add inventory counting sessions, their snapshot and their scans
+
+Revision ID: e3b9d4f6a217
+Revises: c7e2a9f04b18
+Create Date: 2026-10-18 11:16:43.133911
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3b9d4f6a217'
+down_revision: Union[str, None] = 'c7e2a9f04b18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ZONES = ('STOCKAGE', 'VENTE', 'RESERVATION', 'RECEPTION', 'EXPEDITION')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # typeemplacement already exists on PostgreSQL: reuse it
+    zone = sa.Enum(*ZONES, name='typeemplacement').with_variant(
+        postgresql.ENUM(*ZONES, name='typeemplacement', create_type=False), 'postgresql'
+    )
+    op.create_table(
+        'inventaires',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('zone', zone, nullable=True),
+        sa.Column('etat', sa.Enum('EN_COURS', 'APPLIQUE', 'ANNULE', name='etatinventaire'), nullable=False),
+        sa.Column('date_creation', sa.DateTime(), nullable=True),
+        sa.Column('date_application', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_table(
+        'inventaires_comptages',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('inventaire_id', sa.String(), nullable=False),
+        sa.Column('emplacement_id', sa.String(), nullable=False),
+        sa.Column('article_id', sa.String(), nullable=False),
+        sa.Column('quantite', sa.Integer(), nullable=False),
+        sa.Column('date_comptage', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['article_id'], ['articles.id'], ),
+        sa.ForeignKeyConstraint(['emplacement_id'], ['emplacements.id'], ),
+        sa.ForeignKeyConstraint(['inventaire_id'], ['inventaires.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_inventaires_comptages_inventaire_id', 'inventaires_comptages', ['inventaire_id'], unique=False)
+    op.create_table(
+        'inventaires_stock',
+        sa.Column('inventaire_id', sa.String(), nullable=False),
+        sa.Column('implantation_id', sa.String(), nullable=False),
+        sa.Column('article_id', sa.String(), nullable=False),
+        sa.Column('emplacement_id', sa.String(), nullable=False),
+        sa.Column('quantite', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['inventaire_id'], ['inventaires.id'], ),
+        sa.PrimaryKeyConstraint('inventaire_id', 'implantation_id'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('inventaires_stock')
+    op.drop_index('ix_inventaires_comptages_inventaire_id', table_name='inventaires_comptages')
+    op.drop_table('inventaires_comptages')
+    op.drop_table('inventaires')
@@ -0,0 +1,50 @@
+"""Merge duplicate implantations and make (article_id, emplacement_id) unique
+
+Revision ID: f2a8c5d3e619
+Revises: b85e3f1d0c62
+Create Date: 2026-10-18 21:43:05.216874
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a8c5d3e619'
+down_revision: Union[str, None] = 'b85e3f1d0c62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Duplicates of a position are folded into the oldest id: quantities and
+    # reservations add up, the allocations follow. The ledger is keyed on the
+    # position, so it needs no movement.
+    bind = op.get_bind()
+    doublons = bind.execute(sa.text(
+        "SELECT article_id, emplacement_id, MIN(id), SUM(quantite), SUM(quantite_reservee), MAX(seuil_minimum) "
+        "FROM implantations GROUP BY article_id, emplacement_id HAVING COUNT(*) > 1"
+    )).all()
+    for article_id, emplacement_id, garde, quantite, reservee, seuil in doublons:
+        position = {"article": article_id, "emplacement": emplacement_id, "garde": garde}
+        bind.execute(sa.text(
+            "UPDATE allocations SET implantation_id = :garde WHERE implantation_id IN ("
+            "SELECT id FROM implantations WHERE article_id = :article AND emplacement_id = :emplacement)"
+        ), position)
+        bind.execute(sa.text(
+            "DELETE FROM implantations WHERE article_id = :article AND emplacement_id = :emplacement AND id <> :garde"
+        ), position)
+        bind.execute(sa.text(
+            "UPDATE implantations SET quantite = :quantite, quantite_reservee = :reservee, seuil_minimum = :seuil "
+            "WHERE id = :garde"
+        ), {"garde": garde, "quantite": quantite, "reservee": reservee, "seuil": seuil})
+    op.create_index('ix_implantations_article_id_emplacement_id', 'implantations', ['article_id', 'emplacement_id'],
+                    unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_implantations_article_id_emplacement_id', table_name='implantations')
@@ -0,0 +1,59 @@
+"""Async engine and session, built from the same settings as the sync engine.
+
+Needs an async driver: ``aiosqlite`` for SQLite, ``asyncpg`` for PostgreSQL
+(``poetry install -E async``). Nothing is created until first use, so the sync
+application does not depend on those drivers. Only the routers of
+``app.routers.aio`` use this session; the rest of the API stays sync.
+"""
+from functools import lru_cache
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.database.config import DatabaseSettings
+from app.database.database import settings, sqlite_pragma_listener
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+def async_url(url: str):
+    """Swap the driver of ``url`` for its async counterpart"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend!r}")
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+def build_async_engine(settings: DatabaseSettings):
+    url = async_url(settings.url)
+    options = {"echo": settings.echo, "pool_pre_ping": settings.pool_pre_ping}
+    in_memory = settings.is_sqlite and url.database in (None, "", ":memory:")
+    if not in_memory:
+        options.update(
+            pool_size=settings.pool_size,
+            max_overflow=settings.max_overflow,
+            pool_recycle=settings.pool_recycle,
+            pool_timeout=settings.pool_timeout,
+        )
+
+    engine = create_async_engine(url, **options)
+    if settings.is_sqlite:
+        event.listen(engine.sync_engine, "connect", sqlite_pragma_listener(settings, in_memory))
+    return engine
+
+@lru_cache(maxsize=None)
+def get_async_engine():
+    return build_async_engine(settings)
+
+@lru_cache(maxsize=None)
+def get_async_sessionmaker():
+    # No expiry on commit: reloading attributes would mean implicit IO
+    return async_sessionmaker(bind=get_async_engine(), autoflush=False, expire_on_commit=False)
+
+# Dependency to get an async database session
+async def get_async_db():
+    async with get_async_sessionmaker()() as db:
+        yield db
@@ -1,19 +1,54 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-import os
 
-# Database URL - SQLite file will be created in the project root
-SQLALCHEMY_DATABASE_URL = "sqlite:///./app.db"
+from app.database.config import DatabaseSettings
+
+# Database settings - SQLite file in the project root unless DATABASE_* says otherwise
+settings = DatabaseSettings.from_env()
+SQLALCHEMY_DATABASE_URL = settings.url
+
+def sqlite_pragma_listener(settings: DatabaseSettings, in_memory: bool):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not in_memory:
+            cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+            cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+        cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+        cursor.execute(f"PRAGMA cache_size={int(settings.sqlite_cache_size)}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout)}")
+        cursor.close()
+    return on_connect
+
+def build_engine(settings: DatabaseSettings):
+    """Create an engine with the pool and connection options of ``settings``"""
+    url = make_url(settings.url)
+    options = {"echo": settings.echo, "pool_pre_ping": settings.pool_pre_ping}
+    in_memory = settings.is_sqlite and url.database in (None, "", ":memory:")
+
+    if settings.is_sqlite:
+        options["connect_args"] = {"check_same_thread": False}  # Needed for SQLite
+    if not in_memory:
+        options.update(
+            pool_size=settings.pool_size,
+            max_overflow=settings.max_overflow,
+            pool_recycle=settings.pool_recycle,
+            pool_timeout=settings.pool_timeout,
+        )
+
+    engine = create_engine(url, **options)
+    if settings.is_sqlite:
+        event.listen(engine, "connect", sqlite_pragma_listener(settings, in_memory))
+    return engine
 
 # Create engine
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False}  # Needed for SQLite
-)
+engine = build_engine(settings)
 
-# Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Create SessionLocal class. Sessions live for one request and every column
+# default is computed client-side, so objects are not expired on commit: a
+# create_* returns its row without reloading it with a SELECT
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 # Create Base class
 Base = declarative_base()
@@ -24,4 +59,4 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
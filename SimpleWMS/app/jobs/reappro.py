@@ -0,0 +1,23 @@
+import argparse
+
+from app.database.database import SessionLocal
+from app.services.reappro import generate_replenishment_missions
+
+def main():
+    parser = argparse.ArgumentParser(description="Génère les missions de réapprovisionnement des implantations sous seuil.")
+    parser.add_argument("--dry-run", action="store_true", help="Calcule les missions sans les enregistrer")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        resultat = generate_replenishment_missions(db, dry_run=args.dry_run)
+    finally:
+        db.close()
+
+    print(f"Implantations sous seuil : {resultat['implantations_sous_seuil']}")
+    print(f"Missions créées : {resultat['missions_creees']}")
+    print(f"Quantité planifiée : {resultat['quantite_planifiee']}")
+    print(f"Implantations sans source disponible : {resultat['sans_source']}")
+
+if __name__ == "__main__":
+    main()
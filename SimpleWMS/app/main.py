@@ -1,6 +1,8 @@
 from fastapi import FastAPI
 
-from app.routers import article, agent, emplacement, commande, implantation, reception, mission, salle, reservation
+from app.routers import article, agent, emplacement, commande, implantation, reception, mission, salle, reservation, stock, vague, inventaire
+from app.database.database import settings
+from app.services.cache import cache
 
 app = FastAPI(
     title="Système de réservation de salles",
@@ -8,6 +10,15 @@ app = FastAPI(
     version="1.0.0",
 )
 
+# Async mode (DATABASE_MODE=async): the ported routers (salles, reservations,
+# commandes, missions) are registered first and take precedence; routes they do
+# not define, and every other router, stay on the sync stack
+if settings.async_mode:
+    from app.routers import aio
+
+    for async_router in aio.routers:
+        app.include_router(async_router)
+
 # WMS routers (legacy)
 app.include_router(article.router)
 app.include_router(agent.router)
@@ -16,6 +27,9 @@ app.include_router(commande.router)
 app.include_router(implantation.router)
 app.include_router(reception.router)
 app.include_router(mission.router)
+app.include_router(stock.router)
+app.include_router(vague.router)
+app.include_router(inventaire.router)
 app.include_router(reservation.router)
 
 # New reservation system routers
@@ -24,4 +38,8 @@ app.include_router(reservation.router)
 
 @app.get("/")
 async def root():
-    return {"message": "Bienvenue dans le système de réservation de salles!"}
\ No newline at end of file
+    return {"message": "Bienvenue dans le système de réservation de salles!"}
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return cache.stats()
\ No newline at end of file
@@ -7,6 +7,10 @@ from .implantation import Implantation
 from .reception import Reception
 from .salle import Salle
 from .reservation import Reservation
+from .vague import Vague
+from .allocation import Allocation
+from .inventaire import Inventaire, InventaireStock, Comptage
+from .mouvement import Mouvement, StockSnapshot, StockSnapshotLigne
 
 __all__ = [
     "Mission",
@@ -18,5 +22,13 @@ __all__ = [
     "Implantation",
     "Reception",
     "Salle",
-    "Reservation"
+    "Reservation",
+    "Vague",
+    "Allocation",
+    "Inventaire",
+    "InventaireStock",
+    "Comptage",
+    "Mouvement",
+    "StockSnapshot",
+    "StockSnapshotLigne"
 ]
\ No newline at end of file
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, String, Integer, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from uuid import uuid4
+
+from app.database.database import Base
+
+# Stock held on an implantation for a line of a reserved commande
+class Allocation(Base):
+    __tablename__ = "allocations"
+    __table_args__ = (
+        Index("ix_allocations_ligne_id", "ligne_id"),
+        Index("ix_allocations_implantation_id", "implantation_id"),
+        Index("ix_allocations_mission_id", "mission_id"),
+    )
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid4()))
+    ligne_id = Column(String, ForeignKey("lignes_commandes.id"), nullable=False)
+    implantation_id = Column(String, ForeignKey("implantations.id"), nullable=False)
+    quantite = Column(Integer, nullable=False)
+    # PREPARATION mission picking this stock, once one has been created
+    mission_id = Column(String, ForeignKey("missions.id"), nullable=True)
+
+    ligne = relationship("LigneCommande")
+    implantation = relationship("Implantation")
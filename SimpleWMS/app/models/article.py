@@ -1,10 +1,11 @@
-from sqlalchemy import Column, String, Float, Date, Enum
+from sqlalchemy import Column, String, Float, Date, DateTime, Enum, Integer, literal_column
 from uuid import uuid4
+from datetime import datetime
 import enum
 
 from app.database.database import Base
 
-class CategorieArticle(enum.Enum):
+class CategorieArticle(str, enum.Enum):
     PRODUIT = "Produit fini"
     PIECE = "Pièce détachée"
     CONSOMMABLE = "Consommable"
@@ -19,3 +20,6 @@ class Article(Base):
     poids_kg = Column(Float, nullable=False)
     volume_m3 = Column(Float, nullable=False)
     date_peremption = Column(Date, nullable=True)
+    # Bumped by every UPDATE: source of the ETag and Last-Modified headers
+    version = Column(Integer, nullable=False, default=1, server_default="1", onupdate=literal_column("version + 1"))
+    date_modification = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
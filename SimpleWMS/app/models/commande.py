@@ -1,11 +1,11 @@
-from sqlalchemy import Column, String, Enum, ForeignKey, Table, Integer
+from sqlalchemy import Column, String, Enum, ForeignKey, Table, Integer, Index
 from sqlalchemy.orm import relationship
 from uuid import uuid4
 import enum
 
 from app.database.database import Base
 
-class EtatCommande(enum.Enum):
+class EtatCommande(str, enum.Enum):
     BROUILLON = "Brouillon"
     RESERVEE = "Réservée"
     PREPAREE = "Préparée"
@@ -14,15 +14,24 @@ class EtatCommande(enum.Enum):
 
 class Commande(Base):
     __tablename__ = "commandes"
+    __table_args__ = (
+        Index("ix_commandes_etat_vague_id", "etat", "vague_id"),
+    )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid4()))
     reference = Column(String, unique=True, nullable=False)
     etat = Column(Enum(EtatCommande), nullable=False)
+    vague_id = Column(String, ForeignKey("vagues.id"), nullable=True)
 
     lignes = relationship("LigneCommande", back_populates="commande")
+    vague = relationship("Vague", back_populates="commandes")
 
 class LigneCommande(Base):
     __tablename__ = "lignes_commandes"
+    __table_args__ = (
+        Index("ix_lignes_commandes_commande_id", "commande_id"),
+        Index("ix_lignes_commandes_article_id", "article_id"),
+    )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid4()))
     commande_id = Column(String, ForeignKey("commandes.id"))
@@ -4,7 +4,7 @@ import enum
 
 from app.database.database import Base
 
-class TypeEmplacement(enum.Enum):
+class TypeEmplacement(str, enum.Enum):
     STOCKAGE = "Zone de stockage"
     VENTE = "Surface de vente"
     RESERVATION = "Zone de réservation"
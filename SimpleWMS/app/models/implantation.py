@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, String
+from sqlalchemy import Column, Integer, ForeignKey, String, Index
 from sqlalchemy.orm import relationship
 from uuid import uuid4
 
@@ -6,12 +6,21 @@ from app.database.database import Base
 
 class Implantation(Base):
     __tablename__ = "implantations"
+    __table_args__ = (
+        # Covers per-article stock lookups without touching the table
+        Index("ix_implantations_article_id_emplacement_id_quantite", "article_id", "emplacement_id", "quantite"),
+        Index("ix_implantations_emplacement_id", "emplacement_id"),
+        # One implantation per article and location: stock movements are keyed on the position
+        Index("ix_implantations_article_id_emplacement_id", "article_id", "emplacement_id", unique=True),
+    )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid4()))
     article_id = Column(String, ForeignKey("articles.id"), nullable=False)
     emplacement_id = Column(String, ForeignKey("emplacements.id"), nullable=False)
     quantite = Column(Integer, nullable=False)
     seuil_minimum = Column(Integer, nullable=False)
+    # Part of quantite held for reserved commandes (see app/services/allocation.py)
+    quantite_reservee = Column(Integer, nullable=False, default=0, server_default="0")
 
     article = relationship("Article")
     emplacement = relationship("Emplacement")
@@ -0,0 +1,46 @@
+from sqlalchemy import Column, String, Integer, Enum, DateTime, ForeignKey, Index
+from uuid import uuid4
+from datetime import datetime
+import enum
+
+from app.database.database import Base
+from app.models.emplacement import TypeEmplacement
+
+class EtatInventaire(str, enum.Enum):
+    EN_COURS = "En cours"
+    APPLIQUE = "Appliqué"
+    ANNULE = "Annulé"
+
+class Inventaire(Base):
+    __tablename__ = "inventaires"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid4()))
+    # None counts the whole warehouse
+    zone = Column(Enum(TypeEmplacement), nullable=True)
+    etat = Column(Enum(EtatInventaire), nullable=False, default=EtatInventaire.EN_COURS)
+    date_creation = Column(DateTime, default=datetime.utcnow)
+    date_application = Column(DateTime, nullable=True)
+
+# Quantity of each implantation of the zone when the inventory was opened
+class InventaireStock(Base):
+    __tablename__ = "inventaires_stock"
+
+    inventaire_id = Column(String, ForeignKey("inventaires.id"), primary_key=True)
+    implantation_id = Column(String, primary_key=True)
+    article_id = Column(String, nullable=False)
+    emplacement_id = Column(String, nullable=False)
+    quantite = Column(Integer, nullable=False)
+
+# Scans uploaded by the handhelds, appended batch by batch
+class Comptage(Base):
+    __tablename__ = "inventaires_comptages"
+    __table_args__ = (
+        Index("ix_inventaires_comptages_inventaire_id", "inventaire_id"),
+    )
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid4()))
+    inventaire_id = Column(String, ForeignKey("inventaires.id"), nullable=False)
+    emplacement_id = Column(String, ForeignKey("emplacements.id"), nullable=False)
+    article_id = Column(String, ForeignKey("articles.id"), nullable=False)
+    quantite = Column(Integer, nullable=False)
+    date_comptage = Column(DateTime, default=datetime.utcnow)
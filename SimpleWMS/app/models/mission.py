@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Enum, ForeignKey, Integer, DateTime, String
+from sqlalchemy import Column, Enum, ForeignKey, Integer, DateTime, String, Index
 from sqlalchemy.orm import relationship
 from uuid import uuid4
 import enum
@@ -6,14 +6,14 @@ from datetime import datetime
 
 from app.database.database import Base
 
-class TypeMission(enum.Enum):
+class TypeMission(str, enum.Enum):
     DEPLACEMENT = "Déplacement"
     REAPPRO = "Réapprovisionnement"
     INVENTAIRE = "Inventaire"
     RECEPTION = "Réception"
     PREPARATION = "Préparation commande"
 
-class EtatMission(enum.Enum):
+class EtatMission(str, enum.Enum):
     A_FAIRE = "À faire"
     EN_COURS = "En cours"
     TERMINE = "Terminé"
@@ -21,6 +21,12 @@ class EtatMission(enum.Enum):
 
 class Mission(Base):
     __tablename__ = "missions"
+    __table_args__ = (
+        Index("ix_missions_agent_id", "agent_id"),
+        Index("ix_missions_article_id", "article_id"),
+        Index("ix_missions_etat_type", "etat", "type"),
+        Index("ix_missions_tournee_id_ordre", "tournee_id", "ordre"),
+    )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid4()))
     type = Column(Enum(TypeMission), nullable=False)
@@ -32,6 +38,9 @@ class Mission(Base):
     agent_id = Column(String, ForeignKey("agents.id"), nullable=True)
     date_creation = Column(DateTime, default=datetime.utcnow)
     date_execution = Column(DateTime, nullable=True)
+    # Picking route the mission belongs to, and its rank along the route
+    tournee_id = Column(String, nullable=True)
+    ordre = Column(Integer, nullable=True)
 
     article = relationship("Article")
     source = relationship("Emplacement", foreign_keys=[source_id])
@@ -0,0 +1,49 @@
+from sqlalchemy import Column, String, Integer, Enum, DateTime, ForeignKey, Index
+from datetime import datetime
+import enum
+
+from app.database.database import Base
+
+class TypeMouvement(str, enum.Enum):
+    RECEPTION = "Réception"
+    MISSION = "Mission"
+    AJUSTEMENT = "Ajustement"
+    INVENTAIRE = "Inventaire"
+
+# Append-only: rows are never updated nor deleted (see app/services/mouvement.py)
+class Mouvement(Base):
+    __tablename__ = "mouvements"
+    __table_args__ = (
+        Index("ix_mouvements_article_id_emplacement_id", "article_id", "emplacement_id"),
+        Index("ix_mouvements_date_mouvement", "date_mouvement"),
+    )
+
+    # Increasing sequence: snapshots record the last movement they include
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    article_id = Column(String, ForeignKey("articles.id"), nullable=False)
+    emplacement_id = Column(String, ForeignKey("emplacements.id"), nullable=False)
+    # Signed quantity added to the location
+    quantite = Column(Integer, nullable=False)
+    type = Column(Enum(TypeMouvement), nullable=False)
+    # Reception, mission, implantation or inventory behind the movement
+    reference = Column(String, nullable=True)
+    date_mouvement = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+class StockSnapshot(Base):
+    __tablename__ = "stock_snapshots"
+    __table_args__ = (
+        Index("ix_stock_snapshots_date_snapshot", "date_snapshot"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    date_snapshot = Column(DateTime, nullable=False)
+    # Last movement folded into the snapshot
+    mouvement_id = Column(Integer, nullable=False)
+
+class StockSnapshotLigne(Base):
+    __tablename__ = "stock_snapshots_lignes"
+
+    snapshot_id = Column(Integer, ForeignKey("stock_snapshots.id"), primary_key=True)
+    article_id = Column(String, primary_key=True)
+    emplacement_id = Column(String, primary_key=True)
+    quantite = Column(Integer, nullable=False)
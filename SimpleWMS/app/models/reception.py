@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from uuid import uuid4
 from datetime import datetime
@@ -7,6 +7,10 @@ from app.database.database import Base
 
 class Reception(Base):
     __tablename__ = "receptions"
+    __table_args__ = (
+        Index("ix_receptions_article_id", "article_id"),
+        Index("ix_receptions_emplacement_id", "emplacement_id"),
+    )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid4()))
     article_id = Column(String, ForeignKey("articles.id"), nullable=False)
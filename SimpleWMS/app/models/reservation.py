@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Date, Time, ForeignKey
+from sqlalchemy import Column, String, Date, Time, Integer, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from uuid import uuid4
 
@@ -6,11 +6,16 @@ from app.database.database import Base
 
 class Reservation(Base):
     __tablename__ = "reservations"
+    __table_args__ = (
+        # Also enforces the no-double-booking rule for identical start slots
+        Index("ix_reservations_salle_id_date_heure", "salle_id", "date", "heure", unique=True),
+    )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid4()))
     salle_id = Column(String, ForeignKey("salles.id"), nullable=False)
     date = Column(Date, nullable=False)
     heure = Column(Time, nullable=False)
+    duree_minutes = Column(Integer, nullable=False, default=60, server_default="60")
     utilisateur = Column(String, nullable=False)
     commentaire = Column(String, nullable=True)
 
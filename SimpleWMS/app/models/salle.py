@@ -1,6 +1,7 @@
-from sqlalchemy import Column, String, Integer, Boolean
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, literal_column
 from sqlalchemy.orm import relationship
 from uuid import uuid4
+from datetime import datetime
 
 from app.database.database import Base
 
@@ -12,6 +13,9 @@ class Salle(Base):
     capacite = Column(Integer, nullable=False)
     localisation = Column(String, nullable=False)
     disponible = Column(Boolean, default=True)
+    # Bumped by every UPDATE: source of the ETag and Last-Modified headers
+    version = Column(Integer, nullable=False, default=1, server_default="1", onupdate=literal_column("version + 1"))
+    date_modification = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationship with reservations
     reservations = relationship("Reservation", back_populates="salle", cascade="all, delete-orphan")
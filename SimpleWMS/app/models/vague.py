@@ -0,0 +1,21 @@
+from sqlalchemy import Column, String, Enum, DateTime
+from sqlalchemy.orm import relationship
+from uuid import uuid4
+from datetime import datetime
+import enum
+
+from app.database.database import Base
+
+class StrategieVague(str, enum.Enum):
+    ARTICLES = "Articles communs"
+    ZONE = "Zone"
+    TAILLE = "Taille"
+
+class Vague(Base):
+    __tablename__ = "vagues"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid4()))
+    strategie = Column(Enum(StrategieVague), nullable=False)
+    date_creation = Column(DateTime, default=datetime.utcnow)
+
+    commandes = relationship("Commande", back_populates="vague")
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from app.schemas.agent import AgentRead, AgentCreate, AgentUpdate
+from app.schemas.agent import AgentRead, AgentCreate, AgentUpdate, AgentPatch
+from app.schemas.pagination import Page
+from app.schemas.export import ExportFormat
 from app.services import agent as agent_service
+from app.services.export import export_response
 from app.database.database import get_db
 
 router = APIRouter(prefix="/agents", tags=["Agents"])
@@ -12,6 +15,22 @@ router = APIRouter(prefix="/agents", tags=["Agents"])
 def list_agents(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     return agent_service.list_agents(db, skip, limit)
 
+@router.get("/page", response_model=Page[AgentRead])
+def list_agents_page(cursor: Optional[str] = None, limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_db)):
+    try:
+        items, next_cursor = agent_service.list_agents_page(db, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.get("/export")
+def export_agents(
+    format: ExportFormat = ExportFormat.NDJSON,
+    actif: Optional[bool] = None,
+    db: Session = Depends(get_db)
+):
+    return export_response(agent_service.export_agents(db, format, actif), format, "agents")
+
 @router.post("/", response_model=AgentRead)
 def create_agent(agent: AgentCreate, db: Session = Depends(get_db)):
     existing = agent_service.get_agent_by_email(db, agent.email)
@@ -33,6 +52,16 @@ def update_agent(agent_id: str, agent: AgentUpdate, db: Session = Depends(get_db
         raise HTTPException(status_code=404, detail="Agent not found")
     return updated
 
+@router.patch("/{agent_id}", response_model=AgentRead)
+def patch_agent(agent_id: str, agent: AgentPatch, db: Session = Depends(get_db)):
+    try:
+        patched = agent_service.patch_agent(db, agent_id, agent)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not patched:
+        raise HTTPException(status_code=404, detail="Agent not found")
+    return patched
+
 @router.delete("/{agent_id}", response_model=AgentRead)
 def delete_agent(agent_id: str, db: Session = Depends(get_db)):
     deleted = agent_service.delete_agent(db, agent_id)
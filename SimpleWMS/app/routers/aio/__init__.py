@@ -0,0 +1,11 @@
+"""Routers served on ``AsyncSession`` when ``DATABASE_MODE=async``.
+
+Only salles, reservations, commandes and missions are ported; the other
+routers are sync in both modes.
+"""
+from .salle import router as salle_router
+from .reservation import router as reservation_router
+from .commande import router as commande_router
+from .mission import router as mission_router
+
+routers = [salle_router, reservation_router, commande_router, mission_router]
@@ -0,0 +1,71 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from app.schemas.commande import CommandeRead, CommandeCreate, CommandeUpdate, EtatCommande
+from app.schemas.pagination import Page
+from app.schemas.export import ExportFormat
+from app.services.aio import commande as commande_service
+from app.services.export import export_response
+from app.database.async_database import get_async_db
+
+router = APIRouter(prefix="/commandes", tags=["Commandes"])
+
+@router.get("/", response_model=List[CommandeRead])
+async def list_commandes(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_db)):
+    return await commande_service.list_commandes(db, skip, limit)
+
+@router.get("/page", response_model=Page[CommandeRead])
+async def list_commandes_page(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        items, next_cursor = await commande_service.list_commandes_page(db, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.get("/export")
+async def export_commandes(
+    format: ExportFormat = ExportFormat.NDJSON,
+    etat: Optional[EtatCommande] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    chunks = commande_service.export_commandes(db, format, etat)
+    return export_response(chunks, format, "commandes")
+
+@router.post("/", response_model=CommandeRead)
+async def create_commande(commande: CommandeCreate, db: AsyncSession = Depends(get_async_db)):
+    existing = await commande_service.get_commande_by_reference(db, commande.reference)
+    if existing:
+        raise HTTPException(status_code=400, detail="Commande with this reference already exists.")
+    try:
+        return await commande_service.create_commande(db, commande)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/{commande_id}", response_model=CommandeRead)
+async def get_commande(commande_id: str, db: AsyncSession = Depends(get_async_db)):
+    commande = await commande_service.get_commande(db, commande_id)
+    if not commande:
+        raise HTTPException(status_code=404, detail="Commande not found")
+    return commande
+
+@router.put("/{commande_id}", response_model=CommandeRead)
+async def update_commande(commande_id: str, commande: CommandeUpdate, db: AsyncSession = Depends(get_async_db)):
+    try:
+        updated = await commande_service.update_commande(db, commande_id, commande)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not updated:
+        raise HTTPException(status_code=404, detail="Commande not found")
+    return updated
+
+@router.delete("/{commande_id}", response_model=CommandeRead)
+async def delete_commande(commande_id: str, db: AsyncSession = Depends(get_async_db)):
+    deleted = await commande_service.delete_commande(db, commande_id)
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Commande not found")
+    return deleted
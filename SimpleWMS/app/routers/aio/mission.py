@@ -0,0 +1,81 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import datetime
+
+from app.schemas.mission import MissionRead, MissionCreate, MissionUpdate, MissionPatch, TypeMission, EtatMission
+from app.schemas.pagination import Page
+from app.schemas.export import ExportFormat
+from app.services.aio import mission as mission_service
+from app.services.export import export_response
+from app.database.async_database import get_async_db
+
+router = APIRouter(prefix="/missions", tags=["Missions"])
+
+@router.get("/", response_model=List[MissionRead])
+async def list_missions(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_db)):
+    return await mission_service.list_missions(db, skip, limit)
+
+@router.get("/page", response_model=Page[MissionRead])
+async def list_missions_page(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        items, next_cursor = await mission_service.list_missions_page(db, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.get("/export")
+async def export_missions(
+    format: ExportFormat = ExportFormat.NDJSON,
+    type: Optional[TypeMission] = None,
+    etat: Optional[EtatMission] = None,
+    agent_id: Optional[str] = None,
+    article_id: Optional[str] = None,
+    depuis: Optional[datetime] = None,
+    jusqu_a: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    chunks = mission_service.export_missions(db, format, type, etat, agent_id, article_id, depuis, jusqu_a)
+    return export_response(chunks, format, "missions")
+
+@router.post("/", response_model=MissionRead)
+async def create_mission(mission: MissionCreate, db: AsyncSession = Depends(get_async_db)):
+    return await mission_service.create_mission(db, mission)
+
+@router.get("/{mission_id}", response_model=MissionRead)
+async def get_mission(mission_id: str, db: AsyncSession = Depends(get_async_db)):
+    mission = await mission_service.get_mission(db, mission_id)
+    if not mission:
+        raise HTTPException(status_code=404, detail="Mission not found")
+    return mission
+
+@router.put("/{mission_id}", response_model=MissionRead)
+async def update_mission(mission_id: str, mission: MissionUpdate, db: AsyncSession = Depends(get_async_db)):
+    try:
+        updated = await mission_service.update_mission(db, mission_id, mission)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not updated:
+        raise HTTPException(status_code=404, detail="Mission not found")
+    return updated
+
+@router.patch("/{mission_id}", response_model=MissionRead)
+async def patch_mission(mission_id: str, mission: MissionPatch, db: AsyncSession = Depends(get_async_db)):
+    try:
+        patched = await mission_service.patch_mission(db, mission_id, mission)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not patched:
+        raise HTTPException(status_code=404, detail="Mission not found")
+    return patched
+
+@router.delete("/{mission_id}", response_model=MissionRead)
+async def delete_mission(mission_id: str, db: AsyncSession = Depends(get_async_db)):
+    deleted = await mission_service.delete_mission(db, mission_id)
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Mission not found")
+    return deleted
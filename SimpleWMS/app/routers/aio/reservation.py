@@ -0,0 +1,71 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import date
+
+from app.schemas.reservation import ReservationRead, ReservationCreate, ReservationUpdate
+from app.schemas.pagination import Page
+from app.schemas.export import ExportFormat
+from app.services.aio import reservation as reservation_service
+from app.services.export import export_response
+from app.database.async_database import get_async_db
+
+router = APIRouter(prefix="/reservations", tags=["Réservations"])
+
+@router.get("/", response_model=List[ReservationRead])
+async def list_reservations(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_db)):
+    return await reservation_service.list_reservations(db, skip, limit)
+
+@router.get("/page", response_model=Page[ReservationRead])
+async def list_reservations_page(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        items, next_cursor = await reservation_service.list_reservations_page(db, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.get("/export")
+async def export_reservations(
+    format: ExportFormat = ExportFormat.NDJSON,
+    salle_id: Optional[str] = None,
+    depuis: Optional[date] = None,
+    jusqu_a: Optional[date] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    chunks = reservation_service.export_reservations(db, format, salle_id, depuis, jusqu_a)
+    return export_response(chunks, format, "reservations")
+
+@router.post("/", response_model=ReservationRead)
+async def create_reservation(reservation: ReservationCreate, db: AsyncSession = Depends(get_async_db)):
+    try:
+        return await reservation_service.create_reservation(db, reservation)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/{reservation_id}", response_model=ReservationRead)
+async def get_reservation(reservation_id: str, db: AsyncSession = Depends(get_async_db)):
+    reservation = await reservation_service.get_reservation(db, reservation_id)
+    if not reservation:
+        raise HTTPException(status_code=404, detail="Réservation non trouvée")
+    return reservation
+
+@router.put("/{reservation_id}", response_model=ReservationRead)
+async def update_reservation(reservation_id: str, reservation: ReservationUpdate, db: AsyncSession = Depends(get_async_db)):
+    try:
+        updated = await reservation_service.update_reservation(db, reservation_id, reservation)
+        if not updated:
+            raise HTTPException(status_code=404, detail="Réservation non trouvée")
+        return updated
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.delete("/{reservation_id}", response_model=ReservationRead)
+async def delete_reservation(reservation_id: str, db: AsyncSession = Depends(get_async_db)):
+    deleted = await reservation_service.delete_reservation(db, reservation_id)
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Réservation non trouvée")
+    return deleted
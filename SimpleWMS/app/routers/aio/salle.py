@@ -0,0 +1,117 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import date, time
+
+from app.schemas.salle import SalleRead, SalleCreate, SalleUpdate, SallePatch, SalleCreneau
+from app.schemas.pagination import Page
+from app.schemas.export import ExportFormat
+from app.services.aio import salle as salle_service
+from app.services.export import export_response
+from app.services.conditional import conditional_response, list_etag, row_etag
+from app.services import reservation as reservation_service
+from app.database.async_database import get_async_db
+
+router = APIRouter(prefix="/salles", tags=["Salles"])
+
+@router.get("/", response_model=List[SalleRead])
+async def list_salles(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    disponible: Optional[bool] = Query(None, description="Filtrer par disponibilité"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    versions = await salle_service.list_salles_versions(db, skip, limit, disponible)
+    not_modified = conditional_response(request, response, list_etag((v.id, v.version) for v in versions),
+                                        max((v.date_modification for v in versions), default=None))
+    if not_modified:
+        return not_modified
+    return await salle_service.list_salles(db, skip, limit, disponible)
+
+@router.get("/page", response_model=Page[SalleRead])
+async def list_salles_page(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    disponible: Optional[bool] = Query(None, description="Filtrer par disponibilité"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        items, next_cursor = await salle_service.list_salles_page(db, cursor, limit, disponible)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.get("/export")
+async def export_salles(
+    format: ExportFormat = ExportFormat.NDJSON,
+    disponible: Optional[bool] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    chunks = salle_service.export_salles(db, format, disponible)
+    return export_response(chunks, format, "salles")
+
+# Declared here so that GET /{salle_id} below does not capture it
+@router.get("/recherche", response_model=List[SalleCreneau])
+async def search_salles(
+    date_debut: date,
+    date_fin: Optional[date] = None,
+    capacite_min: int = Query(1, ge=1, description="Capacité minimale"),
+    localisation: Optional[str] = Query(None, description="Filtre sur la localisation"),
+    duree_minutes: int = Query(60, ge=1, description="Durée du créneau recherché"),
+    debut: time = Query(time(8, 0), description="Début de la plage horaire"),
+    fin: time = Query(time(20, 0), description="Fin de la plage horaire"),
+    pas_minutes: int = Query(30, ge=5, description="Pas entre deux créneaux proposés"),
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_db)
+):
+    date_fin = date_fin or date_debut
+    if date_fin < date_debut or (date_fin - date_debut).days > 31:
+        raise HTTPException(status_code=400, detail="La période de recherche doit couvrir entre 1 et 32 jours")
+    results = await db.run_sync(
+        reservation_service.search_free_salles,
+        capacite_min, date_debut, date_fin, duree_minutes, localisation, debut, fin, pas_minutes, limit
+    )
+    return [{"salle": salle, "jour": jour, "debut": a, "fin": b} for salle, jour, a, b in results]
+
+@router.post("/", response_model=SalleRead)
+async def create_salle(salle: SalleCreate, db: AsyncSession = Depends(get_async_db)):
+    existing = await salle_service.get_salle_by_nom(db, salle.nom)
+    if existing:
+        raise HTTPException(status_code=400, detail="Une salle avec ce nom existe déjà.")
+    return await salle_service.create_salle(db, salle)
+
+@router.get("/{salle_id}", response_model=SalleRead)
+async def get_salle(salle_id: str, request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    version = await salle_service.get_salle_version(db, salle_id)
+    if not version:
+        raise HTTPException(status_code=404, detail="Salle non trouvée")
+    not_modified = conditional_response(request, response, row_etag(version.version), version.date_modification)
+    if not_modified:
+        return not_modified
+    return await salle_service.get_salle(db, salle_id, version.version)
+
+@router.put("/{salle_id}", response_model=SalleRead)
+async def update_salle(salle_id: str, salle: SalleUpdate, db: AsyncSession = Depends(get_async_db)):
+    updated = await salle_service.update_salle(db, salle_id, salle)
+    if not updated:
+        raise HTTPException(status_code=404, detail="Salle non trouvée")
+    return updated
+
+@router.patch("/{salle_id}", response_model=SalleRead)
+async def patch_salle(salle_id: str, salle: SallePatch, db: AsyncSession = Depends(get_async_db)):
+    try:
+        patched = await salle_service.patch_salle(db, salle_id, salle)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not patched:
+        raise HTTPException(status_code=404, detail="Salle non trouvée")
+    return patched
+
+@router.delete("/{salle_id}", response_model=SalleRead)
+async def delete_salle(salle_id: str, db: AsyncSession = Depends(get_async_db)):
+    deleted = await salle_service.delete_salle(db, salle_id)
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Salle non trouvée")
+    return deleted
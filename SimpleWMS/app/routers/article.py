@@ -1,17 +1,42 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from app.schemas.article import ArticleRead, ArticleCreate, ArticleUpdate
+from app.schemas.article import ArticleRead, ArticleCreate, ArticleUpdate, ArticlePatch, CategorieArticle
+from app.schemas.pagination import Page
+from app.schemas.export import ExportFormat
 from app.services import article as article_service
+from app.services.export import export_response
+from app.services.conditional import conditional_response, list_etag, row_etag
 from app.database.database import get_db
 
 router = APIRouter(prefix="/articles", tags=["Articles"])
 
 @router.get("/", response_model=List[ArticleRead])
-def list_articles(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def list_articles(request: Request, response: Response, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+    versions = article_service.list_articles_versions(db, skip, limit)
+    not_modified = conditional_response(request, response, list_etag((v.id, v.version) for v in versions),
+                                        max((v.date_modification for v in versions), default=None))
+    if not_modified:
+        return not_modified
     return article_service.list_articles(db, skip, limit)
 
+@router.get("/page", response_model=Page[ArticleRead])
+def list_articles_page(cursor: Optional[str] = None, limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_db)):
+    try:
+        items, next_cursor = article_service.list_articles_page(db, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.get("/export")
+def export_articles(
+    format: ExportFormat = ExportFormat.NDJSON,
+    categorie: Optional[CategorieArticle] = None,
+    db: Session = Depends(get_db)
+):
+    return export_response(article_service.export_articles(db, format, categorie), format, "articles")
+
 @router.post("/", response_model=ArticleRead)
 def create_article(article: ArticleCreate, db: Session = Depends(get_db)):
     existing = article_service.get_article_by_sku(db, article.sku)
@@ -20,11 +45,14 @@ def create_article(article: ArticleCreate, db: Session = Depends(get_db)):
     return article_service.create_article(db, article)
 
 @router.get("/{article_id}", response_model=ArticleRead)
-def get_article(article_id: str, db: Session = Depends(get_db)):
-    article = article_service.get_article(db, article_id)
-    if not article:
+def get_article(article_id: str, request: Request, response: Response, db: Session = Depends(get_db)):
+    version = article_service.get_article_version(db, article_id)
+    if not version:
         raise HTTPException(status_code=404, detail="Article not found")
-    return article
+    not_modified = conditional_response(request, response, row_etag(version.version), version.date_modification)
+    if not_modified:
+        return not_modified
+    return article_service.get_article(db, article_id)
 
 @router.put("/{article_id}", response_model=ArticleRead)
 def update_article(article_id: str, article: ArticleUpdate, db: Session = Depends(get_db)):
@@ -33,6 +61,16 @@ def update_article(article_id: str, article: ArticleUpdate, db: Session = Depend
         raise HTTPException(status_code=404, detail="Article not found")
     return updated
 
+@router.patch("/{article_id}", response_model=ArticleRead)
+def patch_article(article_id: str, article: ArticlePatch, db: Session = Depends(get_db)):
+    try:
+        patched = article_service.patch_article(db, article_id, article)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not patched:
+        raise HTTPException(status_code=404, detail="Article not found")
+    return patched
+
 @router.delete("/{article_id}", response_model=ArticleRead)
 def delete_article(article_id: str, db: Session = Depends(get_db)):
     deleted = article_service.delete_article(db, article_id)
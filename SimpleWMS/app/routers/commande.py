@@ -1,9 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from app.schemas.commande import CommandeRead, CommandeCreate, CommandeUpdate
+from app.schemas.commande import (CommandeRead, CommandeCreate, CommandeUpdate, CommandeBulkResult, EtatCommande,
+                                  PreparationCreate, ReservationStock)
+from app.schemas.mission import Tournee
+from app.schemas.pagination import Page
+from app.schemas.export import ExportFormat
+from app.services import allocation as allocation_service
 from app.services import commande as commande_service
+from app.services import picking as picking_service
+from app.services.export import export_response
 from app.database.database import get_db
 
 router = APIRouter(prefix="/commandes", tags=["Commandes"])
@@ -12,12 +19,45 @@ router = APIRouter(prefix="/commandes", tags=["Commandes"])
 def list_commandes(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     return commande_service.list_commandes(db, skip, limit)
 
+@router.get("/page", response_model=Page[CommandeRead])
+def list_commandes_page(cursor: Optional[str] = None, limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_db)):
+    try:
+        items, next_cursor = commande_service.list_commandes_page(db, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.get("/export")
+def export_commandes(
+    format: ExportFormat = ExportFormat.NDJSON,
+    etat: Optional[EtatCommande] = None,
+    db: Session = Depends(get_db)
+):
+    return export_response(commande_service.export_commandes(db, format, etat), format, "commandes")
+
 @router.post("/", response_model=CommandeRead)
 def create_commande(commande: CommandeCreate, db: Session = Depends(get_db)):
     existing = commande_service.get_commande_by_reference(db, commande.reference)
     if existing:
         raise HTTPException(status_code=400, detail="Commande with this reference already exists.")
-    return commande_service.create_commande(db, commande)
+    try:
+        return commande_service.create_commande(db, commande)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/bulk", response_model=List[CommandeBulkResult])
+def create_commandes_bulk(commandes: List[CommandeCreate], db: Session = Depends(get_db)):
+    try:
+        return commande_service.create_commandes_bulk(db, commandes)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/preparation", response_model=Tournee)
+def prepare_commandes(preparation: PreparationCreate, db: Session = Depends(get_db)):
+    try:
+        return picking_service.prepare_commandes(db, preparation.commande_ids, preparation.destination_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/{commande_id}", response_model=CommandeRead)
 def get_commande(commande_id: str, db: Session = Depends(get_db)):
@@ -28,11 +68,34 @@ def get_commande(commande_id: str, db: Session = Depends(get_db)):
 
 @router.put("/{commande_id}", response_model=CommandeRead)
 def update_commande(commande_id: str, commande: CommandeUpdate, db: Session = Depends(get_db)):
-    updated = commande_service.update_commande(db, commande_id, commande)
+    try:
+        updated = commande_service.update_commande(db, commande_id, commande)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not updated:
         raise HTTPException(status_code=404, detail="Commande not found")
     return updated
 
+@router.post("/{commande_id}/reservation", response_model=ReservationStock)
+def reserve_commande(commande_id: str, partiel: bool = False, db: Session = Depends(get_db)):
+    try:
+        rapport = allocation_service.reserve_commande(db, commande_id, partiel)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if rapport is None:
+        raise HTTPException(status_code=404, detail="Commande not found")
+    return rapport
+
+@router.delete("/{commande_id}/reservation", response_model=CommandeRead)
+def release_commande(commande_id: str, db: Session = Depends(get_db)):
+    commande = commande_service.get_commande(db, commande_id)
+    if not commande:
+        raise HTTPException(status_code=404, detail="Commande not found")
+    if not allocation_service.release_commande(db, commande_id):
+        raise HTTPException(status_code=400, detail="Commande is not reserved")
+    db.refresh(commande)
+    return commande
+
 @router.delete("/{commande_id}", response_model=CommandeRead)
 def delete_commande(commande_id: str, db: Session = Depends(get_db)):
     deleted = commande_service.delete_commande(db, commande_id)
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from app.schemas.emplacement import EmplacementRead, EmplacementCreate, EmplacementUpdate
+from app.schemas.emplacement import EmplacementRead, EmplacementCreate, EmplacementUpdate, EmplacementPatch, TypeEmplacement
+from app.schemas.pagination import Page
+from app.schemas.export import ExportFormat
 from app.services import emplacement as emplacement_service
+from app.services.export import export_response
 from app.database.database import get_db
 
 router = APIRouter(prefix="/emplacements", tags=["Emplacements"])
@@ -12,6 +15,22 @@ router = APIRouter(prefix="/emplacements", tags=["Emplacements"])
 def list_emplacements(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     return emplacement_service.list_emplacements(db, skip, limit)
 
+@router.get("/page", response_model=Page[EmplacementRead])
+def list_emplacements_page(cursor: Optional[str] = None, limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_db)):
+    try:
+        items, next_cursor = emplacement_service.list_emplacements_page(db, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.get("/export")
+def export_emplacements(
+    format: ExportFormat = ExportFormat.NDJSON,
+    type: Optional[TypeEmplacement] = None,
+    db: Session = Depends(get_db)
+):
+    return export_response(emplacement_service.export_emplacements(db, format, type), format, "emplacements")
+
 @router.post("/", response_model=EmplacementRead)
 def create_emplacement(emplacement: EmplacementCreate, db: Session = Depends(get_db)):
     existing = emplacement_service.get_emplacement_by_code(db, emplacement.code)
@@ -33,6 +52,16 @@ def update_emplacement(emplacement_id: str, emplacement: EmplacementUpdate, db:
         raise HTTPException(status_code=404, detail="Emplacement not found")
     return updated
 
+@router.patch("/{emplacement_id}", response_model=EmplacementRead)
+def patch_emplacement(emplacement_id: str, emplacement: EmplacementPatch, db: Session = Depends(get_db)):
+    try:
+        patched = emplacement_service.patch_emplacement(db, emplacement_id, emplacement)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not patched:
+        raise HTTPException(status_code=404, detail="Emplacement not found")
+    return patched
+
 @router.delete("/{emplacement_id}", response_model=EmplacementRead)
 def delete_emplacement(emplacement_id: str, db: Session = Depends(get_db)):
     deleted = emplacement_service.delete_emplacement(db, emplacement_id)
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app.schemas.implantation import ImplantationRead, ImplantationCreate, ImplantationUpdate
+from app.schemas.pagination import Page
+from app.schemas.export import ExportFormat
 from app.services import implantation as implantation_service
+from app.services.export import export_response
 from app.database.database import get_db
 
 router = APIRouter(prefix="/implantations", tags=["Implantations"])
@@ -12,9 +15,30 @@ router = APIRouter(prefix="/implantations", tags=["Implantations"])
 def list_implantations(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     return implantation_service.list_implantations(db, skip, limit)
 
+@router.get("/page", response_model=Page[ImplantationRead])
+def list_implantations_page(cursor: Optional[str] = None, limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_db)):
+    try:
+        items, next_cursor = implantation_service.list_implantations_page(db, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.get("/export")
+def export_implantations(
+    format: ExportFormat = ExportFormat.NDJSON,
+    article_id: Optional[str] = None,
+    emplacement_id: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    chunks = implantation_service.export_implantations(db, format, article_id, emplacement_id)
+    return export_response(chunks, format, "implantations")
+
 @router.post("/", response_model=ImplantationRead)
 def create_implantation(implantation: ImplantationCreate, db: Session = Depends(get_db)):
-    return implantation_service.create_implantation(db, implantation)
+    try:
+        return implantation_service.create_implantation(db, implantation)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/{implantation_id}", response_model=ImplantationRead)
 def get_implantation(implantation_id: str, db: Session = Depends(get_db)):
@@ -25,14 +49,20 @@ def get_implantation(implantation_id: str, db: Session = Depends(get_db)):
 
 @router.put("/{implantation_id}", response_model=ImplantationRead)
 def update_implantation(implantation_id: str, implantation: ImplantationUpdate, db: Session = Depends(get_db)):
-    updated = implantation_service.update_implantation(db, implantation_id, implantation)
+    try:
+        updated = implantation_service.update_implantation(db, implantation_id, implantation)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not updated:
         raise HTTPException(status_code=404, detail="Implantation not found")
     return updated
 
 @router.delete("/{implantation_id}", response_model=ImplantationRead)
 def delete_implantation(implantation_id: str, db: Session = Depends(get_db)):
-    deleted = implantation_service.delete_implantation(db, implantation_id)
+    try:
+        deleted = implantation_service.delete_implantation(db, implantation_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not deleted:
         raise HTTPException(status_code=404, detail="Implantation not found")
     return deleted
@@ -0,0 +1,68 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import List
+
+from app.schemas.export import ExportFormat
+from app.schemas.inventaire import ComptageCreate, ComptageResult, InventaireCreate, InventaireRead, Reconciliation
+from app.services import inventaire as inventaire_service
+from app.services.export import export_response
+from app.database.database import get_db
+
+router = APIRouter(prefix="/inventaires", tags=["Inventaires"])
+
+@router.post("/", response_model=InventaireRead)
+def open_inventaire(inventaire: InventaireCreate, db: Session = Depends(get_db)):
+    try:
+        return inventaire_service.open_inventaire(db, inventaire.zone)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/{inventaire_id}", response_model=InventaireRead)
+def get_inventaire(inventaire_id: str, db: Session = Depends(get_db)):
+    inventaire = inventaire_service.get_inventaire(db, inventaire_id)
+    if not inventaire:
+        raise HTTPException(status_code=404, detail="Inventaire not found")
+    return inventaire
+
+@router.post("/{inventaire_id}/comptages", response_model=ComptageResult)
+def record_counts(inventaire_id: str, comptages: List[ComptageCreate], db: Session = Depends(get_db)):
+    try:
+        nb_comptages = inventaire_service.record_counts(db, inventaire_id, comptages)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if nb_comptages is None:
+        raise HTTPException(status_code=404, detail="Inventaire not found")
+    return {"inventaire_id": inventaire_id, "nb_comptages": nb_comptages}
+
+@router.get("/{inventaire_id}/ecarts", response_model=Reconciliation)
+def compute_deltas(inventaire_id: str, db: Session = Depends(get_db)):
+    return _reconcile(db, inventaire_id, appliquer=False)
+
+@router.get("/{inventaire_id}/ecarts/export")
+def export_deltas(inventaire_id: str, format: ExportFormat = ExportFormat.NDJSON, db: Session = Depends(get_db)):
+    if not inventaire_service.get_inventaire(db, inventaire_id):
+        raise HTTPException(status_code=404, detail="Inventaire not found")
+    return export_response(inventaire_service.export_ecarts(db, inventaire_id, format), format, "ecarts")
+
+@router.post("/{inventaire_id}/application", response_model=Reconciliation)
+def apply_inventaire(inventaire_id: str, db: Session = Depends(get_db)):
+    return _reconcile(db, inventaire_id, appliquer=True)
+
+@router.post("/{inventaire_id}/annulation", response_model=InventaireRead)
+def cancel_inventaire(inventaire_id: str, db: Session = Depends(get_db)):
+    try:
+        inventaire = inventaire_service.cancel_inventaire(db, inventaire_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not inventaire:
+        raise HTTPException(status_code=404, detail="Inventaire not found")
+    return inventaire
+
+def _reconcile(db: Session, inventaire_id: str, appliquer: bool):
+    try:
+        rapport = inventaire_service.reconcile(db, inventaire_id, appliquer)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if rapport is None:
+        raise HTTPException(status_code=404, detail="Inventaire not found")
+    return rapport
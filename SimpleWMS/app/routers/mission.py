@@ -1,9 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import datetime, timedelta
 
-from app.schemas.mission import MissionRead, MissionCreate, MissionUpdate
+from app.schemas.mission import (MissionRead, MissionCreate, MissionUpdate, MissionPatch, MissionTransition,
+                                 TransitionResult, TypeMission, EtatMission, AffectationResult)
+from app.schemas.pagination import Page
+from app.schemas.export import ExportFormat
 from app.services import mission as mission_service
+from app.services import dispatch as dispatch_service
+from app.services.export import export_response
 from app.database.database import get_db
 
 router = APIRouter(prefix="/missions", tags=["Missions"])
@@ -12,10 +18,49 @@ router = APIRouter(prefix="/missions", tags=["Missions"])
 def list_missions(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     return mission_service.list_missions(db, skip, limit)
 
+@router.get("/page", response_model=Page[MissionRead])
+def list_missions_page(cursor: Optional[str] = None, limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_db)):
+    try:
+        items, next_cursor = mission_service.list_missions_page(db, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.get("/export")
+def export_missions(
+    format: ExportFormat = ExportFormat.NDJSON,
+    type: Optional[TypeMission] = None,
+    etat: Optional[EtatMission] = None,
+    agent_id: Optional[str] = None,
+    article_id: Optional[str] = None,
+    depuis: Optional[datetime] = None,
+    jusqu_a: Optional[datetime] = None,
+    db: Session = Depends(get_db)
+):
+    chunks = mission_service.export_missions(db, format, type, etat, agent_id, article_id, depuis, jusqu_a)
+    return export_response(chunks, format, "missions")
+
 @router.post("/", response_model=MissionRead)
 def create_mission(mission: MissionCreate, db: Session = Depends(get_db)):
     return mission_service.create_mission(db, mission)
 
+@router.post("/affectation", response_model=AffectationResult)
+def dispatch_missions(
+    lot: int = Query(dispatch_service.LOT, ge=1, le=10000, description="Affectations validées par transaction"),
+    max_par_agent: Optional[int] = Query(None, ge=1, description="Missions ouvertes maximum par agent"),
+    types: Optional[List[TypeMission]] = Query(None, description="Types de mission à affecter"),
+    vieillissement_minutes: int = Query(30, ge=0, description="Attente qui fait gagner un rang de priorité (0 : désactivé)"),
+    db: Session = Depends(get_db)
+):
+    return dispatch_service.dispatch_missions(db, lot, max_par_agent, types, timedelta(minutes=vieillissement_minutes))
+
+@router.post("/transitions", response_model=List[TransitionResult])
+def transition_missions(transitions: List[MissionTransition], db: Session = Depends(get_db)):
+    try:
+        return mission_service.transition_missions(db, transitions)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/{mission_id}", response_model=MissionRead)
 def get_mission(mission_id: str, db: Session = Depends(get_db)):
     mission = mission_service.get_mission(db, mission_id)
@@ -25,11 +70,24 @@ def get_mission(mission_id: str, db: Session = Depends(get_db)):
 
 @router.put("/{mission_id}", response_model=MissionRead)
 def update_mission(mission_id: str, mission: MissionUpdate, db: Session = Depends(get_db)):
-    updated = mission_service.update_mission(db, mission_id, mission)
+    try:
+        updated = mission_service.update_mission(db, mission_id, mission)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not updated:
         raise HTTPException(status_code=404, detail="Mission not found")
     return updated
 
+@router.patch("/{mission_id}", response_model=MissionRead)
+def patch_mission(mission_id: str, mission: MissionPatch, db: Session = Depends(get_db)):
+    try:
+        patched = mission_service.patch_mission(db, mission_id, mission)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not patched:
+        raise HTTPException(status_code=404, detail="Mission not found")
+    return patched
+
 @router.delete("/{mission_id}", response_model=MissionRead)
 def delete_mission(mission_id: str, db: Session = Depends(get_db)):
     deleted = mission_service.delete_mission(db, mission_id)
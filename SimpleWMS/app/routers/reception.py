@@ -1,9 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 
-from app.schemas.reception import ReceptionRead, ReceptionCreate, ReceptionUpdate
+from app.schemas.reception import ReceptionRead, ReceptionCreate, ReceptionUpdate, ReceptionRangement, Rangement
+from app.schemas.emplacement import TypeEmplacement
+from app.schemas.pagination import Page
+from app.schemas.export import ExportFormat
 from app.services import reception as reception_service
+from app.services import putaway as putaway_service
+from app.services.export import export_response
 from app.database.database import get_db
 
 router = APIRouter(prefix="/receptions", tags=["Réceptions"])
@@ -12,6 +18,50 @@ router = APIRouter(prefix="/receptions", tags=["Réceptions"])
 def list_receptions(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     return reception_service.list_receptions(db, skip, limit)
 
+@router.get("/page", response_model=Page[ReceptionRead])
+def list_receptions_page(cursor: Optional[str] = None, limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_db)):
+    try:
+        items, next_cursor = reception_service.list_receptions_page(db, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.get("/export")
+def export_receptions(
+    format: ExportFormat = ExportFormat.NDJSON,
+    article_id: Optional[str] = None,
+    emplacement_id: Optional[str] = None,
+    fournisseur: Optional[str] = None,
+    depuis: Optional[datetime] = None,
+    jusqu_a: Optional[datetime] = None,
+    db: Session = Depends(get_db)
+):
+    chunks = reception_service.export_receptions(db, format, article_id, emplacement_id, fournisseur, depuis, jusqu_a)
+    return export_response(chunks, format, "receptions")
+
+@router.get("/rangement", response_model=Rangement)
+def suggest_rangement(
+    article_id: str,
+    quantite: int = Query(..., ge=1),
+    types: Optional[List[TypeEmplacement]] = Query(None, description="RECEPTION et/ou STOCKAGE"),
+    db: Session = Depends(get_db)
+):
+    try:
+        place = putaway_service.suggest_putaway(db, article_id, quantite, types)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if place is None:
+        raise HTTPException(status_code=404, detail="No putaway location can hold this quantity")
+    return place
+
+@router.post("/rangement", response_model=ReceptionRead)
+def assign_rangement(reception: ReceptionRangement, db: Session = Depends(get_db)):
+    try:
+        return putaway_service.assign_putaway(db, reception.article_id, reception.quantite, reception.fournisseur,
+                                              reception.date_reception, reception.types)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.post("/", response_model=ReceptionRead)
 def create_reception(reception: ReceptionCreate, db: Session = Depends(get_db)):
     return reception_service.create_reception(db, reception)
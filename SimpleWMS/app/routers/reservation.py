@@ -1,9 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import date
 
-from app.schemas.reservation import ReservationRead, ReservationCreate, ReservationUpdate
+from app.schemas.reservation import (ReservationRead, ReservationCreate, ReservationUpdate, ReservationRecurrenteCreate,
+                                     ReservationsRecurrentes)
+from app.schemas.pagination import Page
+from app.schemas.export import ExportFormat
 from app.services import reservation as reservation_service
+from app.services.export import export_response
 from app.database.database import get_db
 
 router = APIRouter(prefix="/reservations", tags=["Réservations"])
@@ -12,6 +17,25 @@ router = APIRouter(prefix="/reservations", tags=["Réservations"])
 def list_reservations(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     return reservation_service.list_reservations(db, skip, limit)
 
+@router.get("/page", response_model=Page[ReservationRead])
+def list_reservations_page(cursor: Optional[str] = None, limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_db)):
+    try:
+        items, next_cursor = reservation_service.list_reservations_page(db, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.get("/export")
+def export_reservations(
+    format: ExportFormat = ExportFormat.NDJSON,
+    salle_id: Optional[str] = None,
+    depuis: Optional[date] = None,
+    jusqu_a: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
+    chunks = reservation_service.export_reservations(db, format, salle_id, depuis, jusqu_a)
+    return export_response(chunks, format, "reservations")
+
 @router.post("/", response_model=ReservationRead)
 def create_reservation(reservation: ReservationCreate, db: Session = Depends(get_db)):
     try:
@@ -19,6 +43,13 @@ def create_reservation(reservation: ReservationCreate, db: Session = Depends(get
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/recurrentes", response_model=ReservationsRecurrentes)
+def create_recurring_reservation(reservation: ReservationRecurrenteCreate, db: Session = Depends(get_db)):
+    try:
+        return reservation_service.create_recurring_reservation(db, reservation)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/{reservation_id}", response_model=ReservationRead)
 def get_reservation(reservation_id: str, db: Session = Depends(get_db)):
     reservation = reservation_service.get_reservation(db, reservation_id)
@@ -1,22 +1,78 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from datetime import date, time
 
-from app.schemas.salle import SalleRead, SalleCreate, SalleUpdate
+from app.schemas.salle import SalleRead, SalleCreate, SalleUpdate, SallePatch, SalleCreneau
+from app.schemas.pagination import Page
+from app.schemas.export import ExportFormat
+from app.schemas.reservation import Creneau, Disponibilite
 from app.services import salle as salle_service
+from app.services.export import export_response
+from app.services.conditional import conditional_response, list_etag, row_etag
+from app.services import reservation as reservation_service
 from app.database.database import get_db
 
 router = APIRouter(prefix="/salles", tags=["Salles"])
 
 @router.get("/", response_model=List[SalleRead])
 def list_salles(
+    request: Request,
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
     disponible: Optional[bool] = Query(None, description="Filtrer par disponibilité"),
     db: Session = Depends(get_db)
 ):
+    versions = salle_service.list_salles_versions(db, skip, limit, disponible)
+    not_modified = conditional_response(request, response, list_etag((v.id, v.version) for v in versions),
+                                        max((v.date_modification for v in versions), default=None))
+    if not_modified:
+        return not_modified
     return salle_service.list_salles(db, skip, limit, disponible)
 
+@router.get("/page", response_model=Page[SalleRead])
+def list_salles_page(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    disponible: Optional[bool] = Query(None, description="Filtrer par disponibilité"),
+    db: Session = Depends(get_db)
+):
+    try:
+        items, next_cursor = salle_service.list_salles_page(db, cursor, limit, disponible)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.get("/export")
+def export_salles(
+    format: ExportFormat = ExportFormat.NDJSON,
+    disponible: Optional[bool] = None,
+    db: Session = Depends(get_db)
+):
+    return export_response(salle_service.export_salles(db, format, disponible), format, "salles")
+
+@router.get("/recherche", response_model=List[SalleCreneau])
+def search_salles(
+    date_debut: date,
+    date_fin: Optional[date] = None,
+    capacite_min: int = Query(1, ge=1, description="Capacité minimale"),
+    localisation: Optional[str] = Query(None, description="Filtre sur la localisation"),
+    duree_minutes: int = Query(60, ge=1, description="Durée du créneau recherché"),
+    debut: time = Query(time(8, 0), description="Début de la plage horaire"),
+    fin: time = Query(time(20, 0), description="Fin de la plage horaire"),
+    pas_minutes: int = Query(30, ge=5, description="Pas entre deux créneaux proposés"),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    date_fin = date_fin or date_debut
+    if date_fin < date_debut or (date_fin - date_debut).days > 31:
+        raise HTTPException(status_code=400, detail="La période de recherche doit couvrir entre 1 et 32 jours")
+    results = reservation_service.search_free_salles(
+        db, capacite_min, date_debut, date_fin, duree_minutes, localisation, debut, fin, pas_minutes, limit
+    )
+    return [{"salle": salle, "jour": jour, "debut": a, "fin": b} for salle, jour, a, b in results]
+
 @router.post("/", response_model=SalleRead)
 def create_salle(salle: SalleCreate, db: Session = Depends(get_db)):
     existing = salle_service.get_salle_by_nom(db, salle.nom)
@@ -25,11 +81,14 @@ def create_salle(salle: SalleCreate, db: Session = Depends(get_db)):
     return salle_service.create_salle(db, salle)
 
 @router.get("/{salle_id}", response_model=SalleRead)
-def get_salle(salle_id: str, db: Session = Depends(get_db)):
-    salle = salle_service.get_salle(db, salle_id)
-    if not salle:
+def get_salle(salle_id: str, request: Request, response: Response, db: Session = Depends(get_db)):
+    version = salle_service.get_salle_version(db, salle_id)
+    if not version:
         raise HTTPException(status_code=404, detail="Salle non trouvée")
-    return salle
+    not_modified = conditional_response(request, response, row_etag(version.version), version.date_modification)
+    if not_modified:
+        return not_modified
+    return salle_service.get_salle(db, salle_id, version.version)
 
 @router.put("/{salle_id}", response_model=SalleRead)
 def update_salle(salle_id: str, salle: SalleUpdate, db: Session = Depends(get_db)):
@@ -38,9 +97,48 @@ def update_salle(salle_id: str, salle: SalleUpdate, db: Session = Depends(get_db
         raise HTTPException(status_code=404, detail="Salle non trouvée")
     return updated
 
+@router.patch("/{salle_id}", response_model=SalleRead)
+def patch_salle(salle_id: str, salle: SallePatch, db: Session = Depends(get_db)):
+    try:
+        patched = salle_service.patch_salle(db, salle_id, salle)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not patched:
+        raise HTTPException(status_code=404, detail="Salle non trouvée")
+    return patched
+
 @router.delete("/{salle_id}", response_model=SalleRead)
 def delete_salle(salle_id: str, db: Session = Depends(get_db)):
     deleted = salle_service.delete_salle(db, salle_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="Salle non trouvée")
     return deleted
+
+@router.get("/{salle_id}/disponibilite", response_model=Disponibilite)
+def check_disponibilite(
+    salle_id: str,
+    jour: date,
+    debut: time,
+    fin: time,
+    db: Session = Depends(get_db)
+):
+    if not salle_service.get_salle(db, salle_id):
+        raise HTTPException(status_code=404, detail="Salle non trouvée")
+    if fin <= debut:
+        raise HTTPException(status_code=400, detail="L'heure de fin doit suivre l'heure de début")
+    disponible = reservation_service.check_availability_between(db, salle_id, jour, debut, fin)
+    return Disponibilite(salle_id=salle_id, jour=jour, debut=debut, fin=fin, disponible=disponible)
+
+@router.get("/{salle_id}/creneaux", response_model=List[Creneau])
+def list_creneaux_libres(
+    salle_id: str,
+    jour: date,
+    debut: time = Query(time(8, 0), description="Début de la plage horaire"),
+    fin: time = Query(time(20, 0), description="Fin de la plage horaire"),
+    duree_minutes: int = Query(1, ge=1, description="Durée minimale d'un créneau libre"),
+    db: Session = Depends(get_db)
+):
+    if not salle_service.get_salle(db, salle_id):
+        raise HTTPException(status_code=404, detail="Salle non trouvée")
+    slots = reservation_service.list_free_slots(db, salle_id, jour, debut, fin, duree_minutes)
+    return [Creneau(debut=a, fin=b) for a, b in slots]
@@ -0,0 +1,66 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import datetime
+
+from app.schemas.emplacement import TypeEmplacement
+from app.schemas.stock import (StockArticle, StockEmplacement, ImplantationSousSeuil, MouvementRead, StockPosition,
+                               SnapshotRead)
+from app.services import mouvement as mouvement_service
+from app.services import stock as stock_service
+from app.database.database import get_db
+
+router = APIRouter(prefix="/stock", tags=["Stock"])
+
+@router.get("/articles", response_model=List[StockArticle])
+def list_stock_by_article(skip: int = 0, limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_db)):
+    return stock_service.list_stock_by_article(db, skip, limit)
+
+@router.get("/articles/{article_id}", response_model=StockArticle)
+def get_stock_for_article(article_id: str, db: Session = Depends(get_db)):
+    stock = stock_service.get_stock_for_article(db, article_id)
+    if not stock:
+        raise HTTPException(status_code=404, detail="Article not found")
+    return stock
+
+@router.get("/emplacements", response_model=List[StockEmplacement])
+def list_stock_by_emplacement(
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    type: Optional[TypeEmplacement] = None,
+    db: Session = Depends(get_db)
+):
+    return stock_service.list_stock_by_emplacement(db, skip, limit, type)
+
+@router.get("/sous-seuil", response_model=List[ImplantationSousSeuil])
+def list_below_threshold(
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    article_id: Optional[str] = None,
+    emplacement_id: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    return stock_service.list_below_threshold(db, skip, limit, article_id, emplacement_id)
+
+@router.get("/mouvements", response_model=List[MouvementRead])
+def list_movements(
+    article_id: Optional[str] = None,
+    emplacement_id: Optional[str] = None,
+    apres: Optional[int] = Query(None, description="Id du dernier mouvement déjà lu"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    return mouvement_service.list_movements(db, article_id, emplacement_id, apres, limit)
+
+@router.get("/historique", response_model=List[StockPosition])
+def stock_at(
+    date: Optional[datetime] = Query(None, description="Instant du stock, maintenant si absent"),
+    article_id: Optional[str] = None,
+    emplacement_id: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    return mouvement_service.stock_at(db, date, article_id, emplacement_id)
+
+@router.post("/compaction", response_model=Optional[SnapshotRead])
+def compact(db: Session = Depends(get_db)):
+    return mouvement_service.compact(db)
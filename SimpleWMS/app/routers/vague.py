@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from app.schemas.mission import MissionRead
+from app.schemas.vague import StrategieVague, VaguePlanifiee, VagueRead
+from app.services import vague as vague_service
+from app.database.database import get_db
+
+router = APIRouter(prefix="/vagues", tags=["Vagues"])
+
+@router.post("/", response_model=List[VaguePlanifiee])
+def plan_waves(
+    strategie: StrategieVague = StrategieVague.ARTICLES,
+    max_commandes: int = Query(vague_service.MAX_COMMANDES, ge=1, description="Commandes maximum par vague"),
+    max_lignes: int = Query(vague_service.MAX_LIGNES, ge=1, description="Lignes de commande maximum par vague"),
+    destination_id: Optional[str] = Query(None, description="Emplacement de dépose des missions"),
+    simulation: bool = Query(False, description="Calculer les vagues sans rien enregistrer"),
+    db: Session = Depends(get_db)
+):
+    try:
+        return vague_service.plan_waves(db, strategie, max_commandes, max_lignes, destination_id, simulation)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/{vague_id}", response_model=VagueRead)
+def get_vague(vague_id: str, db: Session = Depends(get_db)):
+    vague = vague_service.get_vague(db, vague_id)
+    if not vague:
+        raise HTTPException(status_code=404, detail="Vague not found")
+    return vague
+
+@router.get("/{vague_id}/missions", response_model=List[MissionRead])
+def list_wave_missions(vague_id: str, db: Session = Depends(get_db)):
+    if not vague_service.get_vague(db, vague_id):
+        raise HTTPException(status_code=404, detail="Vague not found")
+    return vague_service.list_wave_missions(db, vague_id)
@@ -12,6 +12,11 @@ class AgentCreate(AgentBase):
 class AgentUpdate(AgentBase):
     pass
 
+class AgentPatch(BaseModel):
+    nom: Optional[str] = None
+    email: Optional[EmailStr] = None
+    actif: Optional[bool] = None
+
 class AgentRead(AgentBase):
     id: str
 
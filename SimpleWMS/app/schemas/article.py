@@ -22,6 +22,14 @@ class ArticleCreate(ArticleBase):
 class ArticleUpdate(ArticleBase):
     pass
 
+class ArticlePatch(BaseModel):
+    sku: Optional[str] = None
+    designation: Optional[str] = None
+    categorie: Optional[CategorieArticle] = None
+    poids_kg: Optional[float] = None
+    volume_m3: Optional[float] = None
+    date_peremption: Optional[date] = None
+
 class ArticleRead(ArticleBase):
     id: str
 
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from enum import Enum
-from typing import List
+from typing import List, Optional
 
 class EtatCommande(str, Enum):
     BROUILLON = "Brouillon"
@@ -35,6 +35,39 @@ class CommandeUpdate(CommandeBase):
 class CommandeRead(CommandeBase):
     id: str
     lignes: List[LigneCommandeRead]
+    vague_id: Optional[str] = None
 
     class Config:
         orm_mode = True
+
+class BulkStatus(str, Enum):
+    CREATED = "created"
+    REJECTED = "rejected"
+
+class CommandeBulkResult(BaseModel):
+    index: int
+    reference: str
+    status: BulkStatus
+    id: Optional[str] = None
+    detail: Optional[str] = None
+
+class AllocationRead(BaseModel):
+    ligne_id: str
+    article_id: str
+    implantation_id: str
+    quantite: int
+
+class LigneManquante(BaseModel):
+    ligne_id: str
+    article_id: str
+    manque: int
+
+class ReservationStock(BaseModel):
+    commande_id: str
+    reservee: bool
+    allocations: List[AllocationRead]
+    manques: List[LigneManquante]
+
+class PreparationCreate(BaseModel):
+    commande_ids: List[str]
+    destination_id: Optional[str] = None
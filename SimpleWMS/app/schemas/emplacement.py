@@ -21,6 +21,12 @@ class EmplacementCreate(EmplacementBase):
 class EmplacementUpdate(EmplacementBase):
     pass
 
+class EmplacementPatch(BaseModel):
+    code: Optional[str] = None
+    type: Optional[TypeEmplacement] = None
+    capacite_poids_kg: Optional[float] = None
+    capacite_volume_m3: Optional[float] = None
+
 class EmplacementRead(EmplacementBase):
     id: str
 
@@ -14,6 +14,7 @@ class ImplantationUpdate(ImplantationBase):
 
 class ImplantationRead(ImplantationBase):
     id: str
+    quantite_reservee: int = 0
 
     class Config:
         orm_mode = True
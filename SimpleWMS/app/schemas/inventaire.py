@@ -0,0 +1,54 @@
+from pydantic import BaseModel, Field
+from enum import Enum
+from typing import List, Optional
+from datetime import datetime
+
+from app.schemas.emplacement import TypeEmplacement
+
+class EtatInventaire(str, Enum):
+    EN_COURS = "En cours"
+    APPLIQUE = "Appliqué"
+    ANNULE = "Annulé"
+
+class InventaireCreate(BaseModel):
+    zone: Optional[TypeEmplacement] = None
+
+class InventaireRead(BaseModel):
+    id: str
+    zone: Optional[TypeEmplacement] = None
+    etat: EtatInventaire
+    date_creation: datetime
+    date_application: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+
+class ComptageCreate(BaseModel):
+    emplacement_id: str
+    article_id: str
+    quantite: int = Field(ge=0)
+
+class ComptageResult(BaseModel):
+    inventaire_id: str
+    nb_comptages: int
+
+class Ecart(BaseModel):
+    implantation_id: Optional[str] = None
+    article_id: str
+    emplacement_id: str
+    quantite_theorique: int
+    quantite_comptee: int
+    ecart: int
+
+class Conflit(Ecart):
+    motif: str
+
+class Reconciliation(BaseModel):
+    inventaire_id: str
+    etat: EtatInventaire
+    nb_positions: int
+    nb_comptees: int
+    nb_non_comptees: int
+    nb_ecarts: int
+    nb_conflits: int
+    conflits: List[Conflit]
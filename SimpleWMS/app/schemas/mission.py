@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from enum import Enum
 from datetime import datetime
 
@@ -33,8 +33,55 @@ class MissionCreate(MissionBase):
 class MissionUpdate(MissionBase):
     pass
 
+# date_creation is not patchable
+class MissionPatch(BaseModel):
+    type: Optional[TypeMission] = None
+    etat: Optional[EtatMission] = None
+    article_id: Optional[str] = None
+    source_id: Optional[str] = None
+    destination_id: Optional[str] = None
+    quantite: Optional[int] = None
+    agent_id: Optional[str] = None
+    date_execution: Optional[datetime] = None
+
 class MissionRead(MissionBase):
     id: str
+    tournee_id: Optional[str] = None
+    ordre: Optional[int] = None
 
     class Config:
         orm_mode = True
+
+class MissionTransition(BaseModel):
+    mission_id: str
+    etat: EtatMission
+    # Time of the scan on the handheld, now if missing
+    date: Optional[datetime] = None
+
+class TransitionStatus(str, Enum):
+    APPLIED = "applied"
+    REJECTED = "rejected"
+
+class TransitionResult(BaseModel):
+    index: int
+    mission_id: str
+    status: TransitionStatus
+    etat: Optional[EtatMission] = None
+    detail: Optional[str] = None
+
+class AffectationResult(BaseModel):
+    missions_en_attente: int
+    agents_actifs: int
+    missions_assignees: int
+    missions_non_assignees: int
+
+class LigneNonServie(BaseModel):
+    commande_id: str
+    article_id: str
+    manque: int
+
+class Tournee(BaseModel):
+    tournee_id: Optional[str] = None
+    distance: int
+    missions: List[MissionRead]
+    lignes_non_servies: List[LigneNonServie]
@@ -1,5 +1,8 @@
 from pydantic import BaseModel
 from datetime import datetime
+from typing import List, Optional
+
+from app.schemas.emplacement import TypeEmplacement
 
 class ReceptionBase(BaseModel):
     article_id: str
@@ -19,3 +22,18 @@ class ReceptionRead(ReceptionBase):
 
     class Config:
         orm_mode = True
+
+class ReceptionRangement(BaseModel):
+    """Goods to receive at the location chosen by the putaway engine"""
+    article_id: str
+    quantite: int
+    fournisseur: str
+    date_reception: Optional[datetime] = None
+    types: Optional[List[TypeEmplacement]] = None
+
+class Rangement(BaseModel):
+    emplacement_id: str
+    code: str
+    type: TypeEmplacement
+    volume_restant_m3: float
+    poids_restant_kg: float
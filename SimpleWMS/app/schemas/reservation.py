@@ -1,11 +1,13 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from datetime import date, time
+from enum import Enum
 
 class ReservationBase(BaseModel):
     salle_id: str
     date: date
     heure: time
+    duree_minutes: int = 60
     utilisateur: str
     commentaire: Optional[str] = None
 
@@ -13,10 +15,46 @@ class ReservationCreate(ReservationBase):
     pass
 
 class ReservationUpdate(ReservationBase):
-    pass
+    # Omitted: the booking keeps its duration
+    duree_minutes: Optional[int] = None
 
 class ReservationRead(ReservationBase):
     id: str
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class Frequence(str, Enum):
+    QUOTIDIENNE = "Quotidienne"
+    HEBDOMADAIRE = "Hebdomadaire"
+    MENSUELLE = "Mensuelle"
+
+class Recurrence(BaseModel):
+    frequence: Frequence
+    # Every n days, weeks or months
+    intervalle: int = Field(1, ge=1)
+    # Exactly one of the two bounds the series
+    jusqu_au: Optional[date] = None
+    nombre: Optional[int] = Field(None, ge=1)
+
+class ReservationRecurrenteCreate(ReservationBase):
+    recurrence: Recurrence
+
+class OccurrenceConflit(BaseModel):
+    date: date
+    heure: time
+    # Booking the occurrence overlaps
+    reservation_id: str
+
+class ReservationsRecurrentes(BaseModel):
+    reservations: List[ReservationRead]
+    conflits: List[OccurrenceConflit]
+
+class Creneau(BaseModel):
+    debut: time
+    fin: time
+
+class Disponibilite(Creneau):
+    salle_id: str
+    jour: date
+    disponible: bool
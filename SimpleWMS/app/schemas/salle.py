@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from typing import Optional
+from datetime import date, time
 
 class SalleBase(BaseModel):
     nom: str
@@ -13,8 +14,20 @@ class SalleCreate(SalleBase):
 class SalleUpdate(SalleBase):
     pass
 
+class SallePatch(BaseModel):
+    nom: Optional[str] = None
+    capacite: Optional[int] = None
+    localisation: Optional[str] = None
+    disponible: Optional[bool] = None
+
 class SalleRead(SalleBase):
     id: str
 
     class Config:
         orm_mode = True
+
+class SalleCreneau(BaseModel):
+    salle: SalleRead
+    jour: date
+    debut: time
+    fin: time
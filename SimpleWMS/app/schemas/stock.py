@@ -0,0 +1,57 @@
+from pydantic import BaseModel
+from enum import Enum
+from typing import Optional
+from datetime import datetime
+from app.schemas.emplacement import TypeEmplacement
+
+class TypeMouvement(str, Enum):
+    RECEPTION = "Réception"
+    MISSION = "Mission"
+    AJUSTEMENT = "Ajustement"
+    INVENTAIRE = "Inventaire"
+
+class StockArticle(BaseModel):
+    article_id: str
+    sku: str
+    designation: str
+    quantite_totale: int
+    nb_emplacements: int
+
+class StockEmplacement(BaseModel):
+    emplacement_id: str
+    code: str
+    type: TypeEmplacement
+    quantite_totale: int
+    nb_articles: int
+
+class ImplantationSousSeuil(BaseModel):
+    implantation_id: str
+    article_id: str
+    sku: str
+    emplacement_id: str
+    code: str
+    quantite: int
+    seuil_minimum: int
+    manque: int
+
+class MouvementRead(BaseModel):
+    id: int
+    article_id: str
+    emplacement_id: str
+    quantite: int
+    type: TypeMouvement
+    reference: Optional[str] = None
+    date_mouvement: datetime
+
+class StockPosition(BaseModel):
+    article_id: str
+    emplacement_id: str
+    quantite: int
+
+class SnapshotRead(BaseModel):
+    id: int
+    date_snapshot: datetime
+    mouvement_id: int
+
+    class Config:
+        orm_mode = True
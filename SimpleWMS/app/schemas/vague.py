@@ -0,0 +1,30 @@
+from pydantic import BaseModel
+from enum import Enum
+from typing import List
+from datetime import datetime
+
+class StrategieVague(str, Enum):
+    ARTICLES = "Articles communs"
+    ZONE = "Zone"
+    TAILLE = "Taille"
+
+class ArticleNonServi(BaseModel):
+    article_id: str
+    manque: int
+
+class VaguePlanifiee(BaseModel):
+    vague_id: str
+    strategie: StrategieVague
+    commande_ids: List[str]
+    nb_lignes: int
+    nb_missions: int
+    distance: int
+    articles_non_servis: List[ArticleNonServi]
+
+class VagueRead(BaseModel):
+    id: str
+    strategie: StrategieVague
+    date_creation: datetime
+
+    class Config:
+        orm_mode = True
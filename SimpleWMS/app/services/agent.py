@@ -1,35 +1,63 @@
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from app.models import Agent as AgentModel
-from app.schemas.agent import AgentCreate, AgentUpdate
+from app.schemas.agent import AgentCreate, AgentUpdate, AgentPatch
+from app.services.pagination import paginate
+from app.services.patch import patch_row
+from app.services.cache import cache, cache_key
+from app.services.export import export_statement, stream_rows
+from app.schemas.export import ExportFormat
+from typing import Optional
 
 def get_agent(db: Session, agent_id: str):
     return db.query(AgentModel).filter(AgentModel.id == agent_id).first()
 
 def get_agent_by_email(db: Session, email: str):
-    return db.query(AgentModel).filter(AgentModel.email == email).first()
+    return cache.get(db, cache_key("agent:email", email), AgentModel,
+                     lambda: db.query(AgentModel).filter(AgentModel.email == email).first())
 
 def list_agents(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(AgentModel).offset(skip).limit(limit).all()
+    return db.query(AgentModel).order_by(AgentModel.id).offset(skip).limit(limit).all()
+
+def list_agents_page(db: Session, cursor: Optional[str] = None, limit: int = 100):
+    return paginate(db.query(AgentModel), AgentModel.id, cursor, limit)
 
 def create_agent(db: Session, agent: AgentCreate):
     db_agent = AgentModel(**agent.dict())
     db.add(db_agent)
     db.commit()
-    db.refresh(db_agent)
     return db_agent
 
 def update_agent(db: Session, agent_id: str, agent_data: AgentUpdate):
-    db_agent = get_agent(db, agent_id)
+    db_agent = db.get(AgentModel, agent_id, populate_existing=True)
     if db_agent:
+        ancien_email = db_agent.email
         for key, value in agent_data.dict().items():
             setattr(db_agent, key, value)
         db.commit()
+        cache.invalidate(cache_key("agent:email", ancien_email), cache_key("agent:email", agent_data.email))
         db.refresh(db_agent)
     return db_agent
 
+def patch_agent(db: Session, agent_id: str, agent_data: AgentPatch):
+    changes = agent_data.dict(exclude_unset=True)
+    # The old email is only read when it changes, to evict it from the cache
+    cles = []
+    if "email" in changes:
+        cles.append(cache_key("agent:email", db.scalar(select(AgentModel.email).where(AgentModel.id == agent_id))))
+    db_agent = patch_row(db, AgentModel, agent_id, changes)
+    db.commit()
+    if db_agent is not None:
+        cache.invalidate(*cles, cache_key("agent:email", db_agent["email"]))
+    return db_agent
+
 def delete_agent(db: Session, agent_id: str):
-    db_agent = get_agent(db, agent_id)
+    db_agent = db.get(AgentModel, agent_id, populate_existing=True)
     if db_agent:
         db.delete(db_agent)
         db.commit()
+        cache.invalidate(cache_key("agent:email", db_agent.email))
     return db_agent
+
+def export_agents(db: Session, format: ExportFormat, actif: Optional[bool] = None):
+    return stream_rows(db, export_statement(AgentModel, actif=actif), format)
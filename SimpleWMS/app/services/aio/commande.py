@@ -0,0 +1,68 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Commande as CommandeModel, LigneCommande as LigneModel
+from app.schemas.commande import CommandeCreate, CommandeUpdate, CommandeRead, EtatCommande
+from app.services.allocation import release_allocations, transition_commande
+from app.services.loading import loader_options
+from app.services.pagination import keyset, build_page
+from app.services.export import export_statement, astream_rows
+from app.schemas.export import ExportFormat
+from typing import Optional
+
+# Lazy loads are not possible on an AsyncSession: lignes are always loaded up front
+_read_options = loader_options(CommandeModel, CommandeRead)
+
+async def get_commande(db: AsyncSession, commande_id: str):
+    return await db.scalar(select(CommandeModel).options(*_read_options).where(CommandeModel.id == commande_id))
+
+async def get_commande_by_reference(db: AsyncSession, reference: str):
+    return await db.scalar(select(CommandeModel).where(CommandeModel.reference == reference))
+
+async def list_commandes(db: AsyncSession, skip: int = 0, limit: int = 100):
+    query = select(CommandeModel).options(*_read_options).order_by(CommandeModel.id)
+    return (await db.scalars(query.offset(skip).limit(limit))).all()
+
+async def list_commandes_page(db: AsyncSession, cursor: Optional[str] = None, limit: int = 100):
+    query = keyset(select(CommandeModel).options(*_read_options), CommandeModel.id, cursor, limit)
+    return build_page((await db.scalars(query)).all(), CommandeModel.id, limit)
+
+async def create_commande(db: AsyncSession, commande: CommandeCreate):
+    etat = EtatCommande(commande.etat)
+    db_commande = CommandeModel(
+        reference=commande.reference,
+        etat=EtatCommande.BROUILLON if etat == EtatCommande.RESERVEE else etat,
+        lignes=[
+            LigneModel(article_id=ligne.article_id, quantite=ligne.quantite)
+            for ligne in commande.lignes
+        ]
+    )
+    db.add(db_commande)
+    if etat == EtatCommande.RESERVEE:
+        await db.flush()
+        await db.run_sync(transition_commande, db_commande.id, EtatCommande.BROUILLON, etat)
+        await db.refresh(db_commande, ["etat"])
+        return db_commande
+    await db.commit()
+    return db_commande
+
+async def update_commande(db: AsyncSession, commande_id: str, commande_data: CommandeUpdate):
+    db_commande = await get_commande(db, commande_id)
+    if db_commande:
+        # The reservation runs on the synchronous session underneath, in the same transaction
+        await db.run_sync(transition_commande, commande_id, db_commande.etat, commande_data.etat)
+        for key, value in commande_data.dict().items():
+            setattr(db_commande, key, value)
+        await db.commit()
+    return db_commande
+
+async def delete_commande(db: AsyncSession, commande_id: str):
+    db_commande = await get_commande(db, commande_id)
+    if db_commande:
+        await db.run_sync(release_allocations, commande_id)
+        await db.delete(db_commande)
+        await db.commit()
+    return db_commande
+
+def export_commandes(db: AsyncSession, format: ExportFormat, etat: Optional[EtatCommande] = None):
+    statement = export_statement(CommandeModel, etat=etat)
+    return astream_rows(db, statement, format)
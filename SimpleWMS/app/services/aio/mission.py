@@ -0,0 +1,47 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Mission as MissionModel
+from app.schemas.mission import MissionCreate, MissionUpdate, MissionPatch, TypeMission, EtatMission
+from app.services import mission as mission_service
+from app.services.pagination import keyset, build_page
+from app.services.export import export_statement, astream_rows
+from app.schemas.export import ExportFormat
+from datetime import datetime
+from typing import Optional
+
+async def get_mission(db: AsyncSession, mission_id: str):
+    return await db.scalar(select(MissionModel).where(MissionModel.id == mission_id))
+
+async def list_missions(db: AsyncSession, skip: int = 0, limit: int = 100):
+    return (await db.scalars(select(MissionModel).order_by(MissionModel.id).offset(skip).limit(limit))).all()
+
+async def list_missions_page(db: AsyncSession, cursor: Optional[str] = None, limit: int = 100):
+    rows = (await db.scalars(keyset(select(MissionModel), MissionModel.id, cursor, limit))).all()
+    return build_page(rows, MissionModel.id, limit)
+
+async def create_mission(db: AsyncSession, mission: MissionCreate):
+    db_mission = MissionModel(**mission.dict())
+    db.add(db_mission)
+    await db.commit()
+    return db_mission
+
+async def update_mission(db: AsyncSession, mission_id: str, mission_data: MissionUpdate):
+    return await db.run_sync(mission_service.update_mission, mission_id, mission_data)
+
+async def patch_mission(db: AsyncSession, mission_id: str, mission_data: MissionPatch):
+    return await db.run_sync(mission_service.patch_mission, mission_id, mission_data)
+
+async def delete_mission(db: AsyncSession, mission_id: str):
+    db_mission = await get_mission(db, mission_id)
+    if db_mission:
+        await db.delete(db_mission)
+        await db.commit()
+    return db_mission
+
+def export_missions(db: AsyncSession, format: ExportFormat, type: Optional[TypeMission] = None,
+                    etat: Optional[EtatMission] = None, agent_id: Optional[str] = None,
+                    article_id: Optional[str] = None, depuis: Optional[datetime] = None,
+                    jusqu_a: Optional[datetime] = None):
+    statement = export_statement(MissionModel, "date_creation", depuis, jusqu_a,
+                                 type=type, etat=etat, agent_id=agent_id, article_id=article_id)
+    return astream_rows(db, statement, format)
@@ -0,0 +1,93 @@
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.reservation import Reservation
+from app.schemas.reservation import ReservationCreate, ReservationUpdate
+from app.services import reservation as reservation_service
+from app.services.availability import index as availability_index
+from app.services.pagination import keyset, build_page
+from app.services.export import export_statement, astream_rows
+from app.schemas.export import ExportFormat
+from datetime import date, time
+from typing import Optional
+
+async def get_reservation(db: AsyncSession, reservation_id: str):
+    return await db.scalar(select(Reservation).where(Reservation.id == reservation_id))
+
+async def list_reservations(db: AsyncSession, skip: int = 0, limit: int = 100):
+    return (await db.scalars(select(Reservation).order_by(Reservation.id).offset(skip).limit(limit))).all()
+
+async def list_reservations_page(db: AsyncSession, cursor: Optional[str] = None, limit: int = 100):
+    rows = (await db.scalars(keyset(select(Reservation), Reservation.id, cursor, limit))).all()
+    return build_page(rows, Reservation.id, limit)
+
+async def check_availability(db: AsyncSession, salle_id: str, date_reservation: date, heure_reservation: time,
+                             duree_minutes: int = 60, exclude_id: Optional[str] = None):
+    """Check if a room is available at the given date and time"""
+    # The index loads missing days through a sync session bound to the same connection
+    return await db.run_sync(
+        reservation_service.check_availability, salle_id, date_reservation, heure_reservation, duree_minutes, exclude_id
+    )
+
+async def _commit_slot(db: AsyncSession, reservation: Reservation):
+    try:
+        await db.flush()
+        conflit = bool(await db.run_sync(
+            reservation_service.find_overlaps, reservation.salle_id, [reservation.date], reservation.heure,
+            reservation.duree_minutes, [reservation.id]
+        ))
+        if not conflit:
+            await db.commit()
+    except IntegrityError:
+        conflit = True
+    if conflit:
+        await db.rollback()
+        availability_index.invalidate(reservation.salle_id, reservation.date)
+        raise ValueError("Cette salle est déjà réservée à ce créneau")
+
+async def create_reservation(db: AsyncSession, reservation: ReservationCreate):
+    reservation_service.validate_duree(reservation.heure, reservation.duree_minutes)
+    if not await check_availability(db, reservation.salle_id, reservation.date, reservation.heure, reservation.duree_minutes):
+        raise ValueError("Cette salle est déjà réservée à ce créneau")
+
+    db_reservation = Reservation(**reservation.dict())
+    db.add(db_reservation)
+    await _commit_slot(db, db_reservation)
+    availability_index.add(db_reservation)
+    return db_reservation
+
+async def update_reservation(db: AsyncSession, reservation_id: str, reservation_data: ReservationUpdate):
+    db_reservation = await get_reservation(db, reservation_id)
+    if db_reservation:
+        donnees = reservation_service.updated_fields(reservation_data, db_reservation)
+        reservation_service.validate_duree(donnees["heure"], donnees["duree_minutes"])
+        if (donnees["salle_id"] != db_reservation.salle_id or
+            donnees["date"] != db_reservation.date or
+            donnees["heure"] != db_reservation.heure or
+            donnees["duree_minutes"] != db_reservation.duree_minutes):
+            if not await check_availability(db, donnees["salle_id"], donnees["date"], donnees["heure"],
+                                            donnees["duree_minutes"], exclude_id=reservation_id):
+                raise ValueError("Cette salle est déjà réservée à ce créneau")
+
+        ancien_creneau = (db_reservation.salle_id, db_reservation.date, db_reservation.heure)
+        for key, value in donnees.items():
+            setattr(db_reservation, key, value)
+        await _commit_slot(db, db_reservation)
+        await db.refresh(db_reservation)
+        availability_index.remove(reservation_id, *ancien_creneau)
+        availability_index.add(db_reservation)
+    return db_reservation
+
+async def delete_reservation(db: AsyncSession, reservation_id: str):
+    db_reservation = await get_reservation(db, reservation_id)
+    if db_reservation:
+        creneau = (db_reservation.salle_id, db_reservation.date, db_reservation.heure)
+        await db.delete(db_reservation)
+        await db.commit()
+        availability_index.remove(reservation_id, *creneau)
+    return db_reservation
+
+def export_reservations(db: AsyncSession, format: ExportFormat, salle_id: Optional[str] = None,
+                        depuis: Optional[date] = None, jusqu_a: Optional[date] = None):
+    statement = export_statement(Reservation, "date", depuis, jusqu_a, salle_id=salle_id)
+    return astream_rows(db, statement, format)
@@ -0,0 +1,89 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.salle import Salle
+from app.schemas.salle import SalleCreate, SalleUpdate, SallePatch
+from app.services.availability import index as availability_index
+from app.services.pagination import keyset, build_page
+from app.services.patch import apatch_row
+from app.services.cache import cache, cache_key
+from app.services.export import export_statement, astream_rows
+from app.schemas.export import ExportFormat
+from typing import Optional
+
+async def get_salle(db: AsyncSession, salle_id: str, version: Optional[int] = None):
+    key = cache_key("salle", salle_id)
+    cached = cache.cached(key, Salle)
+    if cached is not None and (version is None or cached.version == version):
+        return await db.merge(cached, load=False)
+    db_salle = await db.scalar(select(Salle).where(Salle.id == salle_id))
+    cache.store(db_salle, key)
+    return db_salle
+
+async def get_salle_version(db: AsyncSession, salle_id: str):
+    """Version and modification date of a room, without loading the row."""
+    return (await db.execute(select(Salle.version, Salle.date_modification).where(Salle.id == salle_id))).first()
+
+async def get_salle_by_nom(db: AsyncSession, nom: str):
+    return await db.scalar(select(Salle).where(Salle.nom == nom))
+
+async def list_salles(db: AsyncSession, skip: int = 0, limit: Optional[int] = 100, disponible: Optional[bool] = None,
+                      capacite_min: Optional[int] = None, localisation: Optional[str] = None):
+    query = select(Salle)
+    if disponible is not None:
+        query = query.where(Salle.disponible == disponible)
+    if capacite_min is not None:
+        query = query.where(Salle.capacite >= capacite_min)
+    if localisation:
+        query = query.where(Salle.localisation.ilike(f"%{localisation}%"))
+    return (await db.scalars(query.order_by(Salle.id).offset(skip).limit(limit))).all()
+
+async def list_salles_versions(db: AsyncSession, skip: int = 0, limit: Optional[int] = 100,
+                               disponible: Optional[bool] = None):
+    query = select(Salle.id, Salle.version, Salle.date_modification)
+    if disponible is not None:
+        query = query.where(Salle.disponible == disponible)
+    return (await db.execute(query.order_by(Salle.id).offset(skip).limit(limit))).all()
+
+async def list_salles_page(db: AsyncSession, cursor: Optional[str] = None, limit: int = 100,
+                           disponible: Optional[bool] = None):
+    query = select(Salle)
+    if disponible is not None:
+        query = query.where(Salle.disponible == disponible)
+    rows = (await db.scalars(keyset(query, Salle.id, cursor, limit))).all()
+    return build_page(rows, Salle.id, limit)
+
+async def create_salle(db: AsyncSession, salle: SalleCreate):
+    db_salle = Salle(**salle.dict())
+    db.add(db_salle)
+    await db.commit()
+    return db_salle
+
+async def update_salle(db: AsyncSession, salle_id: str, salle_data: SalleUpdate):
+    db_salle = await db.get(Salle, salle_id, populate_existing=True)
+    if db_salle:
+        for key, value in salle_data.dict().items():
+            setattr(db_salle, key, value)
+        await db.commit()
+        cache.invalidate(cache_key("salle", salle_id))
+        await db.refresh(db_salle)
+    return db_salle
+
+async def patch_salle(db: AsyncSession, salle_id: str, salle_data: SallePatch):
+    db_salle = await apatch_row(db, Salle, salle_id, salle_data.dict(exclude_unset=True))
+    await db.commit()
+    if db_salle is not None:
+        cache.invalidate(cache_key("salle", salle_id))
+    return db_salle
+
+async def delete_salle(db: AsyncSession, salle_id: str):
+    db_salle = await db.get(Salle, salle_id, populate_existing=True)
+    if db_salle:
+        await db.delete(db_salle)
+        await db.commit()
+        cache.invalidate(cache_key("salle", salle_id))
+        availability_index.forget_salle(salle_id)
+    return db_salle
+
+def export_salles(db: AsyncSession, format: ExportFormat, disponible: Optional[bool] = None):
+    statement = export_statement(Salle, disponible=disponible)
+    return astream_rows(db, statement, format)
@@ -0,0 +1,213 @@
+"""Stock reservation of a commande moving to RESERVEE, and its release.
+
+Reserved stock is held in ``Implantation.quantite_reservee``; the allocations
+table records what each line holds on which implantation, so that a release or
+a pick gives back exactly what was taken. Completing a PREPARATION mission
+consumes the allocations it picked; failing it hands them to the next
+preparation.
+
+Nothing is read under lock. The commande is claimed with an UPDATE guarded on
+its current state, so two confirmations of the same commande cannot both
+reserve. Each implantation is then incremented with an UPDATE guarded on
+``quantite - quantite_reservee >= :quantite``: only the rows touched are
+locked, always in id order so that concurrent confirmations cannot deadlock.
+A guard that fails because another order took the stock in the meantime only
+sends its lines to the next round, which re-reads the availability. Lines
+still short after that make the whole reservation roll back, unless a partial
+reservation is asked for.
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+from uuid import uuid4
+
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.models import (Allocation as AllocationModel, Commande as CommandeModel,
+                        Implantation as ImplantationModel, LigneCommande as LigneModel)
+from app.models.commande import EtatCommande
+
+# States a commande can be reserved from, and states in which it holds stock:
+# any move out of the latter (or a delete) gives back what is still held
+RESERVABLE = (EtatCommande.BROUILLON,)
+TENUS = (EtatCommande.RESERVEE, EtatCommande.PREPAREE)
+# Rounds of re-reading availability after guards lost to concurrent reservations
+TENTATIVES = 3
+
+def _claim(db: Session, commande_id: str, depuis: Iterable[EtatCommande], vers: EtatCommande) -> bool:
+    """Move a commande to ``vers`` if it is still in one of the ``depuis`` states."""
+    result = db.execute(
+        update(CommandeModel)
+        .where(CommandeModel.id == commande_id, CommandeModel.etat.in_(list(depuis)))
+        .values(etat=vers)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+def _available(db: Session, article_ids: Set[str]) -> Dict[str, List[list]]:
+    """[disponible, implantation_id] per article, largest first."""
+    disponible = (ImplantationModel.quantite - ImplantationModel.quantite_reservee).label("disponible")
+    rows = db.execute(
+        select(ImplantationModel.article_id, ImplantationModel.id, disponible)
+        .where(ImplantationModel.article_id.in_(article_ids), disponible > 0)
+        .order_by(disponible.desc(), ImplantationModel.id)
+    )
+    stock = defaultdict(list)
+    for article_id, implantation_id, quantite in rows:
+        stock[article_id].append([quantite, implantation_id])
+    return stock
+
+def _hold(db: Session, implantation_id: str, quantite: int) -> bool:
+    """Reserve ``quantite`` on an implantation if it still has that much available."""
+    result = db.execute(
+        update(ImplantationModel)
+        .where(
+            ImplantationModel.id == implantation_id,
+            ImplantationModel.quantite - ImplantationModel.quantite_reservee >= quantite,
+        )
+        .values(quantite_reservee=ImplantationModel.quantite_reservee + quantite)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+def _state(db: Session, commande_id: str):
+    return db.execute(
+        select(CommandeModel.reference, CommandeModel.etat).where(CommandeModel.id == commande_id)
+    ).first()
+
+def reserve_commande(db: Session, commande_id: str, partiel: bool = False) -> Optional[Dict]:
+    """Hold the stock of every line of a commande and move it to RESERVEE.
+
+    Returns None if the commande does not exist, otherwise a report of the
+    allocations made and of the quantities missing per line.
+    """
+    commande = _state(db, commande_id)
+    if commande is None:
+        return None
+    if commande.etat not in RESERVABLE:
+        raise ValueError(f"Commande {commande.reference} cannot be reserved from state {commande.etat.value}")
+    if not _claim(db, commande_id, RESERVABLE, EtatCommande.RESERVEE):
+        db.rollback()
+        raise ValueError(f"Commande {commande.reference} was modified concurrently")
+
+    lignes = db.execute(
+        select(LigneModel.id, LigneModel.article_id, LigneModel.quantite)
+        .where(LigneModel.commande_id == commande_id)
+        .order_by(LigneModel.id)
+    ).all()
+    articles = {ligne.id: ligne.article_id for ligne in lignes}
+    restes = {ligne.id: ligne.quantite for ligne in lignes}
+    tenues = defaultdict(int)
+
+    for _ in range(TENTATIVES):
+        stock = _available(db, {articles[l] for l, reste in restes.items() if reste > 0})
+        plan = defaultdict(list)
+        for ligne_id, reste in restes.items():
+            for source in stock.get(articles[ligne_id], ()):
+                if reste <= 0:
+                    break
+                prise = min(reste, source[0])
+                if prise > 0:
+                    source[0] -= prise
+                    reste -= prise
+                    plan[source[1]].append((ligne_id, prise))
+        if not plan:
+            break
+        for implantation_id in sorted(plan):
+            if _hold(db, implantation_id, sum(prise for _, prise in plan[implantation_id])):
+                for ligne_id, prise in plan[implantation_id]:
+                    tenues[ligne_id, implantation_id] += prise
+                    restes[ligne_id] -= prise
+        if not any(reste > 0 for reste in restes.values()):
+            break
+
+    manques = [{"ligne_id": ligne_id, "article_id": articles[ligne_id], "manque": reste}
+               for ligne_id, reste in restes.items() if reste > 0]
+    allocations = [{"ligne_id": ligne_id, "article_id": articles[ligne_id], "implantation_id": implantation_id,
+                    "quantite": quantite} for (ligne_id, implantation_id), quantite in tenues.items()]
+    if manques and not partiel:
+        db.rollback()
+        return {"commande_id": commande_id, "reservee": False, "allocations": [], "manques": manques}
+
+    if allocations:
+        db.execute(insert(AllocationModel), [
+            {"id": str(uuid4()), "ligne_id": a["ligne_id"], "implantation_id": a["implantation_id"],
+             "quantite": a["quantite"]}
+            for a in allocations
+        ])
+    db.commit()
+    return {"commande_id": commande_id, "reservee": True, "allocations": allocations, "manques": manques}
+
+def release_allocations(db: Session, commande_id: str):
+    """Give back what the allocations of a commande still hold, in the caller's transaction."""
+    lignes = select(LigneModel.id).where(LigneModel.commande_id == commande_id)
+    tenues = db.execute(
+        select(AllocationModel.implantation_id, func.sum(AllocationModel.quantite))
+        .where(AllocationModel.ligne_id.in_(lignes))
+        .group_by(AllocationModel.implantation_id)
+        .order_by(AllocationModel.implantation_id)
+    ).all()
+    for implantation_id, quantite in tenues:
+        db.execute(
+            update(ImplantationModel)
+            .where(ImplantationModel.id == implantation_id)
+            .values(quantite_reservee=ImplantationModel.quantite_reservee - quantite)
+            .execution_options(synchronize_session=False)
+        )
+    db.execute(delete(AllocationModel).where(AllocationModel.ligne_id.in_(lignes))
+               .execution_options(synchronize_session=False))
+
+def release_commande(db: Session, commande_id: str, vers: EtatCommande = EtatCommande.BROUILLON) -> bool:
+    """Give back the stock held by a reserved or prepared commande and move it to ``vers``."""
+    if vers in TENUS:
+        raise ValueError(f"Releasing a commande cannot move it to {vers.value}")
+    if not _claim(db, commande_id, TENUS, vers):
+        db.rollback()
+        return False
+    release_allocations(db, commande_id)
+    db.commit()
+    return True
+
+def transition_commande(db: Session, commande_id: str, ancien: EtatCommande, nouveau: EtatCommande):
+    """Reserve or release stock for a state change made through update_commande."""
+    ancien, nouveau = EtatCommande(ancien), EtatCommande(nouveau)
+    if nouveau == ancien:
+        return
+    if nouveau == EtatCommande.RESERVEE:
+        rapport = reserve_commande(db, commande_id)
+        if rapport and not rapport["reservee"]:
+            raise ValueError("Insufficient stock: " + ", ".join(
+                f"{m['article_id']} ({m['manque']} missing)" for m in rapport["manques"]))
+    elif ancien in TENUS and nouveau not in TENUS:
+        # RESERVEE -> PREPAREE keeps the stock held until it is picked; any other exit gives it back
+        if not release_commande(db, commande_id, nouveau):
+            raise ValueError("Commande was modified concurrently")
+
+def consume_allocations(db: Session, mission_ids: List[str]):
+    """Drop the reservations picked by completed missions, in the caller's transaction."""
+    if not mission_ids:
+        return
+    tenues = db.execute(
+        select(AllocationModel.implantation_id, func.sum(AllocationModel.quantite))
+        .where(AllocationModel.mission_id.in_(mission_ids))
+        .group_by(AllocationModel.implantation_id)
+        .order_by(AllocationModel.implantation_id)
+    ).all()
+    if tenues:
+        table = ImplantationModel.__table__
+        db.execute(
+            update(table)
+            .where(table.c.id == bindparam("implantation"))
+            .values(quantite_reservee=table.c.quantite_reservee - bindparam("tenue")),
+            [{"implantation": implantation_id, "tenue": quantite} for implantation_id, quantite in tenues],
+        )
+        db.execute(delete(AllocationModel).where(AllocationModel.mission_id.in_(mission_ids))
+                   .execution_options(synchronize_session=False))
+
+def detach_allocations(db: Session, mission_ids: List[str]):
+    """Give the reservations of failed missions back to the next preparation, in the caller's transaction."""
+    if mission_ids:
+        db.execute(
+            update(AllocationModel).where(AllocationModel.mission_id.in_(mission_ids)).values(mission_id=None)
+            .execution_options(synchronize_session=False)
+        )
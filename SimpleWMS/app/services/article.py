@@ -1,35 +1,78 @@
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from app.models import Article as ArticleModel
-from app.schemas.article import ArticleCreate, ArticleUpdate
+from app.schemas.article import ArticleCreate, ArticleUpdate, ArticlePatch, CategorieArticle
+from app.services.pagination import paginate
+from app.services.patch import patch_row
+from app.services.cache import cache, cache_key
+from app.services.export import export_statement, stream_rows
+from app.services.putaway import capacity_index
+from app.schemas.export import ExportFormat
+from typing import Optional
 
 def get_article(db: Session, article_id: str):
     return db.query(ArticleModel).filter(ArticleModel.id == article_id).first()
 
+def get_article_version(db: Session, article_id: str):
+    """Version and modification date of an article, without loading the row."""
+    return db.query(ArticleModel.version, ArticleModel.date_modification).filter(ArticleModel.id == article_id).first()
+
 def get_article_by_sku(db: Session, sku: str):
-    return db.query(ArticleModel).filter(ArticleModel.sku == sku).first()
+    return cache.get(db, cache_key("article:sku", sku), ArticleModel,
+                     lambda: db.query(ArticleModel).filter(ArticleModel.sku == sku).first())
 
 def list_articles(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(ArticleModel).offset(skip).limit(limit).all()
+    return db.query(ArticleModel).order_by(ArticleModel.id).offset(skip).limit(limit).all()
+
+def list_articles_versions(db: Session, skip: int = 0, limit: int = 100):
+    query = db.query(ArticleModel.id, ArticleModel.version, ArticleModel.date_modification)
+    return query.order_by(ArticleModel.id).offset(skip).limit(limit).all()
+
+def list_articles_page(db: Session, cursor: Optional[str] = None, limit: int = 100):
+    return paginate(db.query(ArticleModel), ArticleModel.id, cursor, limit)
 
 def create_article(db: Session, article: ArticleCreate):
     db_article = ArticleModel(**article.dict())
     db.add(db_article)
     db.commit()
-    db.refresh(db_article)
     return db_article
 
 def update_article(db: Session, article_id: str, article_data: ArticleUpdate):
-    db_article = get_article(db, article_id)
+    db_article = db.get(ArticleModel, article_id, populate_existing=True)
     if db_article:
+        ancien_sku = db_article.sku
+        ancien_encombrement = (db_article.poids_kg, db_article.volume_m3)
         for key, value in article_data.dict().items():
             setattr(db_article, key, value)
         db.commit()
+        cache.invalidate(cache_key("article:sku", ancien_sku), cache_key("article:sku", article_data.sku))
+        if (article_data.poids_kg, article_data.volume_m3) != ancien_encombrement:
+            # Weight and volume feed the load of every location holding the article
+            capacity_index.clear()
         db.refresh(db_article)
     return db_article
 
+def patch_article(db: Session, article_id: str, article_data: ArticlePatch):
+    changes = article_data.dict(exclude_unset=True)
+    # The old sku is only read when it changes, to evict it from the cache
+    cles = []
+    if "sku" in changes:
+        cles.append(cache_key("article:sku", db.scalar(select(ArticleModel.sku).where(ArticleModel.id == article_id))))
+    db_article = patch_row(db, ArticleModel, article_id, changes)
+    db.commit()
+    if db_article is not None:
+        cache.invalidate(*cles, cache_key("article:sku", db_article["sku"]))
+        if changes.keys() & {"poids_kg", "volume_m3"}:
+            capacity_index.clear()
+    return db_article
+
 def delete_article(db: Session, article_id: str):
-    db_article = get_article(db, article_id)
+    db_article = db.get(ArticleModel, article_id, populate_existing=True)
     if db_article:
         db.delete(db_article)
         db.commit()
+        cache.invalidate(cache_key("article:sku", db_article.sku))
     return db_article
+
+def export_articles(db: Session, format: ExportFormat, categorie: Optional[CategorieArticle] = None):
+    return stream_rows(db, export_statement(ArticleModel, categorie=categorie), format)
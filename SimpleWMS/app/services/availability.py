@@ -0,0 +1,213 @@
+"""In-process interval index of booked slots, per salle and per day.
+
+Each (salle_id, date) bucket keeps the bookings of that day as parallel lists
+sorted by start minute. Bookings of a salle never overlap, so the end minutes
+are sorted too and an overlap check is a single bisect. Buckets are loaded
+from the database on first use, then kept in step by the reservation service.
+The index is local to the worker process: the database stays the source of
+truth, and the insert re-checks overlaps in SQL.
+
+Bookings made by other workers only reach this one by reloading, so a bucket
+expires ``AVAILABILITY_TTL`` seconds (30) after it was loaded. At most
+``AVAILABILITY_MAXSIZE`` buckets (10000) are kept, least recently used first
+out, so preloading wide ranges cannot grow the index without bound.
+"""
+import os
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import date, time, timedelta
+from time import monotonic
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.reservation import Reservation
+
+MINUTES_PAR_JOUR = 24 * 60
+
+
+def to_minutes(value: time) -> int:
+    return value.hour * 60 + value.minute
+
+
+def from_minutes(minutes: int) -> time:
+    return time(minutes // 60, minutes % 60)
+
+
+class _Journee:
+    """Bookings of one salle on one day, sorted by start minute."""
+
+    __slots__ = ("debuts", "fins", "ids")
+
+    def __init__(self):
+        self.debuts: List[int] = []
+        self.fins: List[int] = []
+        self.ids: List[str] = []
+
+    def add(self, reservation_id: str, debut: int, fin: int):
+        i = bisect_right(self.debuts, debut)
+        self.debuts.insert(i, debut)
+        self.fins.insert(i, fin)
+        self.ids.insert(i, reservation_id)
+
+    def remove(self, reservation_id: str, debut: int):
+        i = bisect_left(self.debuts, debut)
+        while i < len(self.debuts) and self.debuts[i] == debut:
+            if self.ids[i] == reservation_id:
+                del self.debuts[i], self.fins[i], self.ids[i]
+                return
+            i += 1
+
+    def conflict(self, debut: int, fin: int, exclude_id: Optional[str] = None) -> Optional[str]:
+        """Return the id of a booking overlapping [debut, fin), if any."""
+        j = bisect_left(self.debuts, fin) - 1
+        while j >= 0 and self.fins[j] > debut:
+            if self.ids[j] != exclude_id:
+                return self.ids[j]
+            j -= 1
+        return None
+
+    def gaps(self, debut: int, fin: int, duree_min: int = 1) -> List[Tuple[int, int]]:
+        """Free intervals of at least ``duree_min`` minutes inside [debut, fin)."""
+        result = []
+        curseur = debut
+        j = max(bisect_left(self.debuts, debut) - 1, 0)
+        while j < len(self.debuts) and self.debuts[j] < fin:
+            if self.fins[j] > curseur:
+                if self.debuts[j] - curseur >= duree_min:
+                    result.append((curseur, self.debuts[j]))
+                curseur = self.fins[j]
+            j += 1
+        if fin - curseur >= duree_min:
+            result.append((curseur, fin))
+        return result
+
+
+class AvailabilityIndex:
+    def __init__(self, ttl: float = 30.0, maxsize: int = 10000, clock: Callable[[], float] = monotonic):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._clock = clock
+        self._lock = threading.Lock()
+        # (salle_id, date) -> (expiry, bookings), least recently used first
+        self._journees: "OrderedDict[Tuple[str, date], Tuple[float, _Journee]]" = OrderedDict()
+
+    def _get(self, key: Tuple[str, date]) -> Optional[_Journee]:
+        """Fresh bucket of ``key``, if indexed. Call with the lock held."""
+        entry = self._journees.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= self._clock():
+            del self._journees[key]
+            return None
+        self._journees.move_to_end(key)
+        return entry[1]
+
+    def _store(self, key: Tuple[str, date], journee: _Journee) -> _Journee:
+        """Keep a freshly loaded bucket, unless another thread got there first. Call with the lock held."""
+        existing = self._get(key)
+        if existing is not None:
+            return existing
+        self._journees[key] = (self._clock() + self.ttl, journee)
+        while len(self._journees) > self.maxsize:
+            self._journees.popitem(last=False)
+        return journee
+
+    def _journee(self, db: Session, salle_id: str, jour: date) -> _Journee:
+        key = (salle_id, jour)
+        with self._lock:
+            journee = self._get(key)
+        if journee is not None:
+            return journee
+
+        rows = db.query(Reservation.id, Reservation.heure, Reservation.duree_minutes).filter(
+            Reservation.salle_id == salle_id,
+            Reservation.date == jour
+        ).all()
+        journee = _Journee()
+        for reservation_id, heure, duree in rows:
+            debut = to_minutes(heure)
+            journee.add(reservation_id, debut, debut + duree)
+        with self._lock:
+            return self._store(key, journee)
+
+    def preload(self, db: Session, salle_ids: Iterable[str], date_debut: date, date_fin: date):
+        """Load every missing (salle, day) bucket of the range with a single query."""
+        salle_ids = list(salle_ids)
+        jours = [date_debut + timedelta(days=n) for n in range((date_fin - date_debut).days + 1)]
+        if len(salle_ids) * len(jours) > self.maxsize:
+            # The range would evict itself: buckets are loaded one by one on use instead
+            return
+        with self._lock:
+            missing = {(s, j) for s in salle_ids for j in jours if self._get((s, j)) is None}
+        if not missing:
+            return
+
+        rows = db.query(
+            Reservation.id, Reservation.salle_id, Reservation.date, Reservation.heure, Reservation.duree_minutes
+        ).filter(
+            Reservation.salle_id.in_(salle_ids),
+            Reservation.date >= date_debut,
+            Reservation.date <= date_fin
+        ).all()
+        journees = {key: _Journee() for key in missing}
+        for reservation_id, salle_id, jour, heure, duree in rows:
+            journee = journees.get((salle_id, jour))
+            if journee is not None:
+                debut = to_minutes(heure)
+                journee.add(reservation_id, debut, debut + duree)
+        with self._lock:
+            for key, journee in journees.items():
+                self._store(key, journee)
+
+    def conflict(self, db: Session, salle_id: str, jour: date, heure: time,
+                 duree_minutes: int = 60, exclude_id: Optional[str] = None) -> Optional[str]:
+        """Id of a booking overlapping the slot, if any."""
+        journee = self._journee(db, salle_id, jour)
+        debut = to_minutes(heure)
+        with self._lock:
+            return journee.conflict(debut, debut + duree_minutes, exclude_id)
+
+    def is_free(self, db: Session, salle_id: str, jour: date, heure: time,
+                duree_minutes: int = 60, exclude_id: Optional[str] = None) -> bool:
+        return self.conflict(db, salle_id, jour, heure, duree_minutes, exclude_id) is None
+
+    def free_slots(self, db: Session, salle_id: str, jour: date, debut: time, fin: time,
+                   duree_minutes: int = 1) -> List[Tuple[time, time]]:
+        journee = self._journee(db, salle_id, jour)
+        with self._lock:
+            gaps = journee.gaps(to_minutes(debut), to_minutes(fin), duree_minutes)
+        return [(from_minutes(a), from_minutes(b)) for a, b in gaps]
+
+    def add(self, reservation: Reservation):
+        """Record a committed booking, if its day is already indexed."""
+        debut = to_minutes(reservation.heure)
+        with self._lock:
+            journee = self._get((reservation.salle_id, reservation.date))
+            if journee is not None:
+                journee.add(reservation.id, debut, debut + reservation.duree_minutes)
+
+    def remove(self, reservation_id: str, salle_id: str, jour: date, heure: time):
+        with self._lock:
+            journee = self._get((salle_id, jour))
+            if journee is not None:
+                journee.remove(reservation_id, to_minutes(heure))
+
+    def invalidate(self, salle_id: str, jour: date):
+        """Drop one bucket so that it is reloaded from the database."""
+        with self._lock:
+            self._journees.pop((salle_id, jour), None)
+
+    def forget_salle(self, salle_id: str):
+        with self._lock:
+            for key in [key for key in self._journees if key[0] == salle_id]:
+                del self._journees[key]
+
+    def clear(self):
+        with self._lock:
+            self._journees.clear()
+
+
+index = AvailabilityIndex(ttl=float(os.environ.get("AVAILABILITY_TTL", 30)),
+                          maxsize=int(os.environ.get("AVAILABILITY_MAXSIZE", 10000)))
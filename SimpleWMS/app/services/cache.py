@@ -0,0 +1,238 @@
+"""Read-through cache for reference data looked up on nearly every request.
+
+Rooms, articles, locations and agents change rarely. Their lookups by id or
+natural key go through ``cache``: a hit rebuilds the row from a snapshot of its
+columns and attaches it to the caller's session with ``merge(load=False)``,
+without a SELECT. update_*/delete_* never write through a cached row: they load
+it from the database, then invalidate the keys of the rows they touch.
+
+Backends are pluggable and chosen from the environment:
+
+- ``CACHE_BACKEND``: ``memory`` (default, per process, LRU), ``redis`` (shared,
+  needs the ``cache`` extra; eviction follows the server's maxmemory-policy) or
+  ``none``;
+- ``CACHE_TTL``: lifetime of an entry in seconds (300);
+- ``CACHE_MAXSIZE``: entries kept by the memory backend (10000);
+- ``CACHE_REDIS_URL``: ``redis://localhost:6379/0``.
+
+Misses are not cached, so a row created by another process is never hidden.
+"""
+import enum
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Mapping, Optional
+
+from sqlalchemy import Date, DateTime, Enum, inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+BACKENDS = ("memory", "redis", "none")
+
+@dataclass(frozen=True)
+class CacheSettings:
+    backend: str = "memory"
+    ttl: float = 300.0
+    maxsize: int = 10000
+    redis_url: str = "redis://localhost:6379/0"
+
+    @classmethod
+    def from_env(cls, environ: Optional[Mapping[str, str]] = None) -> "CacheSettings":
+        environ = os.environ if environ is None else environ
+        settings = cls(
+            backend=environ.get("CACHE_BACKEND", cls.backend).lower(),
+            ttl=float(environ.get("CACHE_TTL", cls.ttl)),
+            maxsize=int(environ.get("CACHE_MAXSIZE", cls.maxsize)),
+            redis_url=environ.get("CACHE_REDIS_URL", cls.redis_url),
+        )
+        if settings.backend not in BACKENDS:
+            raise ValueError(f"CACHE_BACKEND must be one of {', '.join(BACKENDS)}")
+        return settings
+
+class MemoryBackend:
+    """In-process LRU with a per-entry time to live."""
+
+    def __init__(self, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= self._clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value) -> None:
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class RedisBackend:
+    """Entries shared by every worker through a Redis-compatible server."""
+
+    def __init__(self, url: str, ttl: float, prefix: str = "simplewms:"):
+        import redis  # optional dependency, installed with the "cache" extra
+
+        self._client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self._prefix = prefix
+
+    def get(self, key: str):
+        raw = self._client.get(self._prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key: str, value) -> None:
+        self._client.set(self._prefix + key, json.dumps(value), ex=max(1, int(self.ttl)))
+
+    def delete(self, *keys: str) -> None:
+        if keys:
+            self._client.delete(*(self._prefix + key for key in keys))
+
+    def clear(self) -> None:
+        for key in self._client.scan_iter(match=self._prefix + "*"):
+            self._client.delete(key)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self._client.scan_iter(match=self._prefix + "*"))
+
+class NullBackend:
+    """Caching disabled: every lookup is a miss."""
+
+    def get(self, key: str):
+        return None
+
+    def set(self, key: str, value) -> None:
+        pass
+
+    def delete(self, *keys: str) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+    def __len__(self) -> int:
+        return 0
+
+def _snapshot(obj) -> Dict[str, Any]:
+    """Column values of ``obj`` as JSON-compatible data."""
+    data = {}
+    for column in inspect(obj).mapper.column_attrs:
+        value = getattr(obj, column.key)
+        if isinstance(value, enum.Enum):
+            value = value.name
+        elif isinstance(value, (date, datetime)):
+            value = value.isoformat()
+        data[column.key] = value
+    return data
+
+def _restore(model, data: Dict[str, Any]):
+    """Detached instance of ``model`` rebuilt from a snapshot."""
+    values = {}
+    for column in inspect(model).column_attrs:
+        value = data.get(column.key)
+        column_type = column.columns[0].type
+        if value is not None:
+            if isinstance(column_type, Enum) and column_type.enum_class is not None:
+                value = column_type.enum_class[value]
+            elif isinstance(column_type, DateTime):
+                value = datetime.fromisoformat(value)
+            elif isinstance(column_type, Date):
+                value = date.fromisoformat(value)
+        values[column.key] = value
+    obj = model(**values)
+    make_transient_to_detached(obj)
+    return obj
+
+def cache_key(namespace: str, value: Any) -> str:
+    return f"{namespace}:{value}"
+
+class ReadThroughCache:
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def cached(self, key: str, model):
+        """Detached copy of the row cached under ``key``, or None on a miss."""
+        data = self.backend.get(key)
+        self._count(data is not None)
+        return None if data is None else _restore(model, data)
+
+    def store(self, obj, *keys: str) -> None:
+        if obj is not None:
+            data = _snapshot(obj)
+            for key in keys:
+                self.backend.set(key, data)
+
+    def get(self, db, key: str, model, load: Callable[[], Any], valid: Optional[Callable[[Any], bool]] = None):
+        """Return the row cached under ``key`` attached to ``db``, loading and caching it on a miss.
+
+        ``valid`` can reject a cached copy known to be stale (an older row version).
+        """
+        obj = self.cached(key, model)
+        if obj is not None and (valid is None or valid(obj)):
+            return db.merge(obj, load=False)
+        obj = load()
+        self.store(obj, key)
+        return obj
+
+    def invalidate(self, *keys: str) -> None:
+        self.backend.delete(*keys)
+
+    def clear(self) -> None:
+        self.backend.clear()
+        with self._lock:
+            self.hits = self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "size": len(self.backend),
+        }
+
+def build_cache(settings: CacheSettings) -> ReadThroughCache:
+    if settings.backend == "redis":
+        return ReadThroughCache(RedisBackend(settings.redis_url, settings.ttl))
+    if settings.backend == "none":
+        return ReadThroughCache(NullBackend())
+    return ReadThroughCache(MemoryBackend(settings.maxsize, settings.ttl))
+
+cache = build_cache(CacheSettings.from_env())
@@ -1,20 +1,40 @@
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from app.models import Commande as CommandeModel, LigneCommande as LigneModel
-from app.schemas.commande import CommandeCreate, CommandeUpdate
+from app.models import Article as ArticleModel, Commande as CommandeModel, LigneCommande as LigneModel
+from app.schemas.commande import CommandeCreate, CommandeUpdate, CommandeRead, BulkStatus, EtatCommande
+from app.services.allocation import release_allocations, transition_commande
+from app.services.loading import loader_options
+from app.services.pagination import paginate
+from app.services.export import export_statement, stream_rows
+from app.schemas.export import ExportFormat
+from typing import Iterable, List, Optional, Set
+from uuid import uuid4
+
+# Bound parameters per IN (...) clause, well under the SQLite and PostgreSQL limits
+BULK_IN_CHUNK = 5000
+
+# Relationships embedded in CommandeRead, loaded in one query per page
+_read_options = loader_options(CommandeModel, CommandeRead)
 
 def get_commande(db: Session, commande_id: str):
-    return db.query(CommandeModel).filter(CommandeModel.id == commande_id).first()
+    return db.query(CommandeModel).options(*_read_options).filter(CommandeModel.id == commande_id).first()
 
 def get_commande_by_reference(db: Session, reference: str):
     return db.query(CommandeModel).filter(CommandeModel.reference == reference).first()
 
 def list_commandes(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(CommandeModel).offset(skip).limit(limit).all()
+    return db.query(CommandeModel).options(*_read_options).order_by(CommandeModel.id).offset(skip).limit(limit).all()
+
+def list_commandes_page(db: Session, cursor: Optional[str] = None, limit: int = 100):
+    return paginate(db.query(CommandeModel).options(*_read_options), CommandeModel.id, cursor, limit)
 
 def create_commande(db: Session, commande: CommandeCreate):
+    """Create a commande; one created as RESERVEE holds its stock, or is not created at all."""
+    etat = EtatCommande(commande.etat)
     db_commande = CommandeModel(
         reference=commande.reference,
-        etat=commande.etat
+        etat=EtatCommande.BROUILLON if etat == EtatCommande.RESERVEE else etat
     )
     db.add(db_commande)
     db.flush()  # pour récupérer l'id
@@ -27,13 +47,72 @@ def create_commande(db: Session, commande: CommandeCreate):
         )
         db.add(db_ligne)
 
+    if etat == EtatCommande.RESERVEE:
+        # A shortage rolls the whole creation back
+        db.flush()
+        transition_commande(db, db_commande.id, EtatCommande.BROUILLON, etat)
+        db.refresh(db_commande)
+        return db_commande
     db.commit()
-    db.refresh(db_commande)
     return db_commande
 
+def _existing(db: Session, column, values: Iterable[str]) -> Set[str]:
+    """Return the subset of ``values`` already present in ``column``, one query per chunk."""
+    values = list(set(values))
+    found = set()
+    for start in range(0, len(values), BULK_IN_CHUNK):
+        found.update(db.scalars(select(column).where(column.in_(values[start:start + BULK_IN_CHUNK]))))
+    return found
+
+def create_commandes_bulk(db: Session, commandes: List[CommandeCreate]):
+    """Insert many commandes and their lignes in one transaction, reporting a status per item."""
+    references_prises = _existing(db, CommandeModel.reference, (c.reference for c in commandes))
+    articles_connus = _existing(db, ArticleModel.id, (l.article_id for c in commandes for l in c.lignes))
+
+    results, commande_rows, ligne_rows = [], [], []
+    for index, commande in enumerate(commandes):
+        manquants = sorted({l.article_id for l in commande.lignes} - articles_connus)
+        if commande.reference in references_prises:
+            detail = "Commande with this reference already exists."
+        elif manquants:
+            detail = f"Unknown article(s): {', '.join(manquants)}"
+        elif commande.etat == EtatCommande.RESERVEE:
+            # Reservations are made one commande at a time, through POST /commandes/{id}/reservation
+            detail = "Bulk import cannot create reserved commandes"
+        else:
+            detail = None
+        if detail:
+            results.append({"index": index, "reference": commande.reference,
+                            "status": BulkStatus.REJECTED, "detail": detail})
+            continue
+
+        references_prises.add(commande.reference)
+        commande_id = str(uuid4())
+        commande_rows.append({"id": commande_id, "reference": commande.reference, "etat": commande.etat})
+        ligne_rows.extend(
+            {"id": str(uuid4()), "commande_id": commande_id, "article_id": l.article_id, "quantite": l.quantite}
+            for l in commande.lignes
+        )
+        results.append({"index": index, "reference": commande.reference,
+                        "status": BulkStatus.CREATED, "id": commande_id})
+
+    if commande_rows:
+        try:
+            db.execute(insert(CommandeModel), commande_rows)
+            if ligne_rows:
+                db.execute(insert(LigneModel), ligne_rows)
+            db.commit()
+        except IntegrityError:
+            # A concurrent import took one of the references between the check and the insert
+            db.rollback()
+            raise ValueError("Bulk import conflicts with concurrently created commandes, nothing was inserted")
+    return results
+
 def update_commande(db: Session, commande_id: str, commande_data: CommandeUpdate):
     db_commande = get_commande(db, commande_id)
     if db_commande:
+        # Reserves or releases the stock, and commits the new state on its own
+        transition_commande(db, commande_id, db_commande.etat, commande_data.etat)
         for key, value in commande_data.dict().items():
             setattr(db_commande, key, value)
         db.commit()
@@ -43,6 +122,10 @@ def update_commande(db: Session, commande_id: str, commande_data: CommandeUpdate
 def delete_commande(db: Session, commande_id: str):
     db_commande = get_commande(db, commande_id)
     if db_commande:
+        release_allocations(db, commande_id)
         db.delete(db_commande)
         db.commit()
     return db_commande
+
+def export_commandes(db: Session, format: ExportFormat, etat: Optional[EtatCommande] = None):
+    return stream_rows(db, export_statement(CommandeModel, etat=etat), format)
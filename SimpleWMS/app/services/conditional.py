@@ -0,0 +1,50 @@
+"""HTTP conditional requests (ETag / If-None-Match, Last-Modified / If-Modified-Since).
+
+Validators are computed from the ``version`` and ``date_modification`` columns
+only, so a 304 is answered without loading or serializing the full rows.
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterable, Optional, Tuple
+
+from fastapi import Request, Response
+
+def row_etag(version: int) -> str:
+    return f'"v{version}"'
+
+def list_etag(versions: Iterable[Tuple[str, int]]) -> str:
+    """ETag of a page: changes when a row of the page is added, removed or updated."""
+    digest = hashlib.blake2b(digest_size=16)
+    for row_id, version in versions:
+        digest.update(f"{row_id}:{version};".encode())
+    return f'"{digest.hexdigest()}"'
+
+def _utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+def is_not_modified(if_none_match: Optional[str], if_modified_since: Optional[str],
+                    etag: str, last_modified: Optional[datetime]) -> bool:
+    # If-None-Match takes precedence over If-Modified-Since (RFC 9110, 13.2.2)
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or etag in tags
+    if if_modified_since and last_modified is not None:
+        try:
+            since = _utc(parsedate_to_datetime(if_modified_since))
+        except (TypeError, ValueError):
+            return False
+        return _utc(last_modified).replace(microsecond=0) <= since
+    return False
+
+def conditional_response(request: Request, response: Response, etag: str,
+                         last_modified: Optional[datetime]) -> Optional[Response]:
+    """Set the validators on ``response``; return a 304 if the client copy is still fresh."""
+    headers = {"ETag": etag}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(_utc(last_modified), usegmt=True)
+    response.headers.update(headers)
+    if is_not_modified(request.headers.get("if-none-match"), request.headers.get("if-modified-since"),
+                       etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    return None
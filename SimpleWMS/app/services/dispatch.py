@@ -0,0 +1,112 @@
+"""Mission scheduler: assigns the unassigned A_FAIRE backlog to active agents.
+
+Missions are served from a priority queue keyed on their type and their age:
+every ``vieillissement`` spent waiting promotes a mission by one type rank, so
+old low-priority missions are not starved. Each one goes to the least loaded
+active agent (open missions already assigned), taken from a second heap.
+Assignments are written by chunks of ``lot``, each as a single executemany
+UPDATE guarded on ``agent_id IS NULL`` and committed at once, so a mission
+assigned meanwhile by someone else is left untouched.
+"""
+import heapq
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.orm import Session
+
+from app.models import Agent as AgentModel, Mission as MissionModel
+from app.models.mission import EtatMission, TypeMission
+from app.services.reappro import OPEN_STATES
+
+# Rank of each mission type, most urgent first
+PRIORITES = {
+    TypeMission.PREPARATION: 0,
+    TypeMission.REAPPRO: 1,
+    TypeMission.RECEPTION: 2,
+    TypeMission.DEPLACEMENT: 3,
+    TypeMission.INVENTAIRE: 4,
+}
+VIEILLISSEMENT = timedelta(minutes=30)
+LOT = 1000
+
+def _backlog(db: Session, types: Optional[Iterable[TypeMission]] = None):
+    """(id, type, date_creation) of the A_FAIRE missions without an agent."""
+    statement = select(MissionModel.id, MissionModel.type, MissionModel.date_creation).where(
+        MissionModel.etat == EtatMission.A_FAIRE,
+        MissionModel.agent_id.is_(None),
+    )
+    if types:
+        statement = statement.where(MissionModel.type.in_(list(types)))
+    return db.execute(statement).all()
+
+def _agents(db: Session):
+    """(id, open missions) of every active agent."""
+    charge = (
+        select(MissionModel.agent_id, func.count().label("missions"))
+        .where(MissionModel.etat.in_(OPEN_STATES), MissionModel.agent_id.is_not(None))
+        .group_by(MissionModel.agent_id)
+        .subquery()
+    )
+    return db.execute(
+        select(AgentModel.id, func.coalesce(charge.c.missions, 0))
+        .outerjoin(charge, charge.c.agent_id == AgentModel.id)
+        .where(AgentModel.actif.is_(True))
+    ).all()
+
+def plan_assignments(backlog, agents, maintenant: datetime,
+                     vieillissement: timedelta = VIEILLISSEMENT,
+                     max_par_agent: Optional[int] = None) -> List[Tuple[str, str]]:
+    """(mission_id, agent_id) pairs, most urgent mission first, each to the least loaded agent."""
+    rang_max = max(PRIORITES.values()) + 1
+    missions = []
+    for mission_id, type, date_creation in backlog:
+        date_creation = date_creation or maintenant
+        promotion = int((maintenant - date_creation) / vieillissement) if vieillissement else 0
+        missions.append((PRIORITES.get(type, rang_max) - promotion, date_creation, mission_id))
+    heapq.heapify(missions)
+
+    charges = [(charge, agent_id) for agent_id, charge in agents
+               if max_par_agent is None or charge < max_par_agent]
+    heapq.heapify(charges)
+
+    plan = []
+    while missions and charges:
+        _, _, mission_id = heapq.heappop(missions)
+        charge, agent_id = heapq.heappop(charges)
+        plan.append((mission_id, agent_id))
+        if max_par_agent is None or charge + 1 < max_par_agent:
+            heapq.heappush(charges, (charge + 1, agent_id))
+    return plan
+
+def dispatch_missions(db: Session, lot: int = LOT, max_par_agent: Optional[int] = None,
+                      types: Optional[Iterable[TypeMission]] = None,
+                      vieillissement: timedelta = VIEILLISSEMENT,
+                      maintenant: Optional[datetime] = None) -> Dict[str, int]:
+    """Assign the unassigned backlog to active agents, committing ``lot`` assignments at a time."""
+    backlog = _backlog(db, types)
+    agents = _agents(db)
+    plan = plan_assignments(backlog, agents, maintenant or datetime.utcnow(), vieillissement, max_par_agent)
+
+    table = MissionModel.__table__
+    statement = (
+        update(table)
+        .where(table.c.id == bindparam("mission_id"))
+        .where(table.c.agent_id.is_(None))
+        .where(table.c.etat == EtatMission.A_FAIRE)
+        .values(agent_id=bindparam("assigne_a"))
+    )
+    assignees = 0
+    for debut in range(0, len(plan), lot):
+        result = db.execute(statement, [
+            {"mission_id": mission_id, "assigne_a": agent_id} for mission_id, agent_id in plan[debut:debut + lot]
+        ])
+        db.commit()
+        assignees += result.rowcount
+
+    return {
+        "missions_en_attente": len(backlog),
+        "agents_actifs": len(agents),
+        "missions_assignees": assignees,
+        "missions_non_assignees": len(backlog) - assignees,
+    }
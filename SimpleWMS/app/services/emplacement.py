@@ -1,35 +1,70 @@
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from app.models import Emplacement as EmplacementModel
-from app.schemas.emplacement import EmplacementCreate, EmplacementUpdate
+from app.schemas.emplacement import EmplacementCreate, EmplacementUpdate, EmplacementPatch, TypeEmplacement
+from app.services.pagination import paginate
+from app.services.patch import patch_row
+from app.services.cache import cache, cache_key
+from app.services.export import export_statement, stream_rows
+from app.services.putaway import capacity_index
+from app.schemas.export import ExportFormat
+from typing import Optional
 
 def get_emplacement(db: Session, emplacement_id: str):
     return db.query(EmplacementModel).filter(EmplacementModel.id == emplacement_id).first()
 
 def get_emplacement_by_code(db: Session, code: str):
-    return db.query(EmplacementModel).filter(EmplacementModel.code == code).first()
+    return cache.get(db, cache_key("emplacement:code", code), EmplacementModel,
+                     lambda: db.query(EmplacementModel).filter(EmplacementModel.code == code).first())
 
 def list_emplacements(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(EmplacementModel).offset(skip).limit(limit).all()
+    return db.query(EmplacementModel).order_by(EmplacementModel.id).offset(skip).limit(limit).all()
+
+def list_emplacements_page(db: Session, cursor: Optional[str] = None, limit: int = 100):
+    return paginate(db.query(EmplacementModel), EmplacementModel.id, cursor, limit)
 
 def create_emplacement(db: Session, emplacement: EmplacementCreate):
     db_emplacement = EmplacementModel(**emplacement.dict())
     db.add(db_emplacement)
     db.commit()
-    db.refresh(db_emplacement)
+    capacity_index.invalidate(db_emplacement.id)
     return db_emplacement
 
 def update_emplacement(db: Session, emplacement_id: str, emplacement_data: EmplacementUpdate):
-    db_emplacement = get_emplacement(db, emplacement_id)
+    db_emplacement = db.get(EmplacementModel, emplacement_id, populate_existing=True)
     if db_emplacement:
+        ancien_code = db_emplacement.code
         for key, value in emplacement_data.dict().items():
             setattr(db_emplacement, key, value)
         db.commit()
+        cache.invalidate(cache_key("emplacement:code", ancien_code),
+                         cache_key("emplacement:code", emplacement_data.code))
+        capacity_index.invalidate(emplacement_id)
         db.refresh(db_emplacement)
     return db_emplacement
 
+def patch_emplacement(db: Session, emplacement_id: str, emplacement_data: EmplacementPatch):
+    changes = emplacement_data.dict(exclude_unset=True)
+    # The old code is only read when it changes, to evict it from the cache
+    cles = []
+    if "code" in changes:
+        cles.append(cache_key("emplacement:code",
+                              db.scalar(select(EmplacementModel.code).where(EmplacementModel.id == emplacement_id))))
+    db_emplacement = patch_row(db, EmplacementModel, emplacement_id, changes)
+    db.commit()
+    if db_emplacement is not None:
+        cache.invalidate(*cles, cache_key("emplacement:code", db_emplacement["code"]))
+        capacity_index.invalidate(emplacement_id)
+    return db_emplacement
+
 def delete_emplacement(db: Session, emplacement_id: str):
-    db_emplacement = get_emplacement(db, emplacement_id)
+    db_emplacement = db.get(EmplacementModel, emplacement_id, populate_existing=True)
     if db_emplacement:
         db.delete(db_emplacement)
         db.commit()
+        cache.invalidate(cache_key("emplacement:code", db_emplacement.code))
+        capacity_index.invalidate(emplacement_id)
     return db_emplacement
+
+def export_emplacements(db: Session, format: ExportFormat, type: Optional[TypeEmplacement] = None):
+    return stream_rows(db, export_statement(EmplacementModel, type=type), format)
@@ -0,0 +1,118 @@
+"""Streaming exports shared by the export_* services.
+
+Rows are read as plain table rows (no ORM objects, no identity map) through a
+server-side cursor with ``yield_per`` and formatted one batch at a time, so an
+export holds a single batch in memory whatever the size of the table.
+"""
+import csv
+import enum
+import io
+import json
+from datetime import date, datetime, time
+from itertools import islice
+from typing import AsyncIterator, Iterable, Iterator, List, Optional
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.schemas.export import ExportFormat
+
+# Rows fetched from the cursor and formatted per chunk sent to the client
+EXPORT_BATCH_SIZE = 1000
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv; charset=utf-8",
+}
+
+def export_statement(model, date_column: Optional[str] = None, depuis: Optional[datetime] = None,
+                     jusqu_a: Optional[datetime] = None, **filters):
+    """Select every column of ``model``, filtered on the non-None ``filters`` and an optional date range."""
+    table = model.__table__
+    statement = select(table).order_by(table.c.id)
+    for name, value in filters.items():
+        if value is not None:
+            statement = statement.where(table.c[name] == value)
+    if depuis is not None:
+        statement = statement.where(table.c[date_column] >= depuis)
+    if jusqu_a is not None:
+        statement = statement.where(table.c[date_column] <= jusqu_a)
+    return statement.execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+def _plain(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    return value
+
+def _format(rows, columns, format: ExportFormat) -> str:
+    if format == ExportFormat.NDJSON:
+        return "".join(
+            json.dumps({c: _plain(v) for c, v in zip(columns, row)}, ensure_ascii=False) + "\n" for row in rows
+        )
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows([_plain(v) for v in row] for row in rows)
+    return buffer.getvalue()
+
+def _header(columns, format: ExportFormat) -> Optional[str]:
+    if format == ExportFormat.CSV:
+        return _format([columns], columns, format)
+    return None
+
+def stream_rows(db: Session, statement, format: ExportFormat) -> Iterator[str]:
+    """Yield the formatted rows of ``statement``, one chunk per batch."""
+    # The request session may already be closed by the time the response is
+    # streamed: the generator runs its own query and releases the connection
+    try:
+        result = db.execute(statement)
+        columns = list(result.keys())
+        header = _header(columns, format)
+        if header:
+            yield header
+        for batch in result.partitions():
+            yield _format(batch, columns, format)
+    finally:
+        db.close()
+
+def stream_tuples(db: Session, rows: Iterable[tuple], columns: List[str], format: ExportFormat,
+                  batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[str]:
+    """Yield computed ``rows`` formatted like ``stream_rows``, ``batch_size`` rows per chunk.
+
+    ``rows`` is consumed lazily: a generator reading ``db`` runs as the
+    response is streamed, and the session is closed at the end.
+    """
+    try:
+        header = _header(columns, format)
+        if header:
+            yield header
+        rows = iter(rows)
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            yield _format(batch, columns, format)
+    finally:
+        db.close()
+
+async def astream_rows(db: AsyncSession, statement, format: ExportFormat) -> AsyncIterator[str]:
+    """Async counterpart of ``stream_rows``."""
+    try:
+        result = await db.stream(statement)
+        columns = list(result.keys())
+        header = _header(columns, format)
+        if header:
+            yield header
+        async for batch in result.partitions():
+            yield _format(batch, columns, format)
+    finally:
+        await db.close()
+
+def export_response(chunks, format: ExportFormat, name: str) -> StreamingResponse:
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{format.value}"'},
+    )
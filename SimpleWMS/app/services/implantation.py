@@ -1,32 +1,119 @@
+from sqlalchemy import delete, exists, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from app.models import Implantation as ImplantationModel
-from app.schemas.implantation import ImplantationCreate, ImplantationUpdate
+from app.models import Allocation as AllocationModel, Implantation as ImplantationModel
+from app.schemas.implantation import ImplantationCreate, ImplantationUpdate, ImplantationRead
+from app.services.loading import loader_options
+from app.services.pagination import paginate
+from app.services.export import export_statement, stream_rows
+from app.models.mouvement import TypeMouvement
+from app.services.mouvement import append_movements
+from app.services.putaway import capacity_index
+from app.schemas.export import ExportFormat
+from typing import Optional
+from uuid import uuid4
+
+# Relationships embedded in ImplantationRead, loaded in one query per page
+_read_options = loader_options(ImplantationModel, ImplantationRead)
+
+DOUBLON = "An implantation already exists for this article at this location"
+# An implantation may only move or go away when it holds no reservation
+SANS_RESERVATION = (ImplantationModel.quantite_reservee == 0,
+                    ~exists().where(AllocationModel.implantation_id == ImplantationModel.id))
 
 def get_implantation(db: Session, implantation_id: str):
-    return db.query(ImplantationModel).filter(ImplantationModel.id == implantation_id).first()
+    return db.query(ImplantationModel).options(*_read_options).filter(ImplantationModel.id == implantation_id).first()
 
 def list_implantations(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(ImplantationModel).offset(skip).limit(limit).all()
+    return db.query(ImplantationModel).options(*_read_options).order_by(ImplantationModel.id).offset(skip).limit(limit).all()
+
+def list_implantations_page(db: Session, cursor: Optional[str] = None, limit: int = 100):
+    return paginate(db.query(ImplantationModel).options(*_read_options), ImplantationModel.id, cursor, limit)
 
 def create_implantation(db: Session, implantation: ImplantationCreate):
-    db_implantation = ImplantationModel(**implantation.dict())
+    db_implantation = ImplantationModel(id=str(uuid4()), **implantation.dict())
     db.add(db_implantation)
-    db.commit()
-    db.refresh(db_implantation)
+    append_movements(db, TypeMouvement.AJUSTEMENT, [(implantation.article_id, implantation.emplacement_id,
+                                                     implantation.quantite)], db_implantation.id)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise ValueError(DOUBLON)
+    capacity_index.invalidate(db_implantation.emplacement_id)
     return db_implantation
 
+def _move(db: Session, implantation_id: str, ancienne, nouvelle):
+    """Move an implantation holding no reservation to another position, with all its stock."""
+    try:
+        quantite = db.scalar(
+            update(ImplantationModel)
+            .where(ImplantationModel.id == implantation_id, *SANS_RESERVATION)
+            .values(article_id=nouvelle[0], emplacement_id=nouvelle[1])
+            .returning(ImplantationModel.quantite)
+            .execution_options(synchronize_session=False)
+        )
+    except IntegrityError:
+        db.rollback()
+        raise ValueError(DOUBLON)
+    if quantite is None:
+        db.rollback()
+        raise ValueError("Implantation holds reserved stock: its article and location cannot change")
+    append_movements(db, TypeMouvement.AJUSTEMENT, [(*ancienne, -quantite), (*nouvelle, quantite)], implantation_id)
+
 def update_implantation(db: Session, implantation_id: str, implantation_data: ImplantationUpdate):
+    """Write the implantation; its quantity only ever moves by the difference with the row read.
+
+    The change is applied as an increment, so movements committed meanwhile by
+    missions or receptions are kept, and the quantity never goes below what
+    is reserved.
+    """
     db_implantation = get_implantation(db, implantation_id)
     if db_implantation:
-        for key, value in implantation_data.dict().items():
+        ancien_emplacement_id = db_implantation.emplacement_id
+        ancienne = db_implantation.article_id, db_implantation.emplacement_id
+        nouvelle = implantation_data.article_id, implantation_data.emplacement_id
+        variation = implantation_data.quantite - db_implantation.quantite
+        if nouvelle != ancienne:
+            _move(db, implantation_id, ancienne, nouvelle)
+        if variation:
+            ajuste = db.execute(
+                update(ImplantationModel)
+                .where(ImplantationModel.id == implantation_id,
+                       ImplantationModel.quantite + variation >= ImplantationModel.quantite_reservee)
+                .values(quantite=ImplantationModel.quantite + variation)
+                .execution_options(synchronize_session=False)
+            )
+            if ajuste.rowcount != 1:
+                db.rollback()
+                raise ValueError("Quantity cannot go below the reserved quantity")
+            append_movements(db, TypeMouvement.AJUSTEMENT, [(*nouvelle, variation)], implantation_id)
+        for key, value in implantation_data.dict(exclude={"article_id", "emplacement_id", "quantite"}).items():
             setattr(db_implantation, key, value)
         db.commit()
+        capacity_index.invalidate(ancien_emplacement_id, implantation_data.emplacement_id)
         db.refresh(db_implantation)
     return db_implantation
 
 def delete_implantation(db: Session, implantation_id: str):
+    """Delete an implantation holding no reservation; its stock leaves the ledger."""
     db_implantation = get_implantation(db, implantation_id)
     if db_implantation:
-        db.delete(db_implantation)
+        supprime = db.execute(
+            delete(ImplantationModel)
+            .where(ImplantationModel.id == implantation_id, *SANS_RESERVATION)
+            .execution_options(synchronize_session=False)
+        )
+        if supprime.rowcount != 1:
+            db.rollback()
+            raise ValueError("Implantation holds reserved stock: it cannot be deleted")
+        append_movements(db, TypeMouvement.AJUSTEMENT, [(db_implantation.article_id, db_implantation.emplacement_id,
+                                                         -db_implantation.quantite)], implantation_id)
         db.commit()
+        capacity_index.invalidate(db_implantation.emplacement_id)
     return db_implantation
+
+def export_implantations(db: Session, format: ExportFormat, article_id: Optional[str] = None,
+                         emplacement_id: Optional[str] = None):
+    statement = export_statement(ImplantationModel, article_id=article_id, emplacement_id=emplacement_id)
+    return stream_rows(db, statement, format)
@@ -0,0 +1,288 @@
+"""INVENTAIRE counting sessions: snapshot, streamed scans and delta reconciliation.
+
+Opening a session copies the implantations of a zone into ``inventaires_stock``
+with a single INSERT ... SELECT run by the database. Handhelds then upload their
+scans in batches, appended to ``inventaires_comptages`` with one bulk INSERT per
+batch.
+
+Reconciliation is a hash join done in memory: the scans, summed per location and
+article by the database, are loaded into a dict; the snapshot is streamed through
+``yield_per`` as plain rows and probed against it. A location scanned without an
+article of the snapshot counts it as 0; locations never scanned are left as they
+are. Counted articles missing from the snapshot are found stock. Only the
+difference with the snapshot is applied (``quantite = quantite + ecart``), in
+executemany batches inside one transaction, so movements recorded after the
+count are kept; the deltas are appended to the movement ledger.
+
+Deltas are checked against the current implantations one LOT at a time. A line
+whose implantation was deleted after the snapshot, or whose new quantity would
+fall below the reserved quantity, is a conflict: it is reported and left for the
+operator instead of being applied. The report only carries totals and the
+conflicts; the lines themselves are streamed by ``export_ecarts``.
+"""
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from uuid import uuid4
+
+from sqlalchemy import bindparam, func, insert, literal, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.models import (Article as ArticleModel, Comptage as ComptageModel, Emplacement as EmplacementModel,
+                        Implantation as ImplantationModel, Inventaire as InventaireModel,
+                        InventaireStock as InventaireStockModel)
+from app.models.emplacement import TypeEmplacement
+from app.models.inventaire import EtatInventaire
+from app.models.mouvement import TypeMouvement
+from app.schemas.export import ExportFormat
+from app.schemas.inventaire import ComptageCreate
+from app.services.commande import BULK_IN_CHUNK
+from app.services.export import stream_tuples
+from app.services.mouvement import append_movements
+from app.services.putaway import capacity_index
+
+# Rows streamed from the cursor, and adjustments sent per executemany batch
+LOT = 1000
+# Columns of the exported deltas
+COLONNES_ECART = ["implantation_id", "article_id", "emplacement_id", "quantite_theorique", "quantite_comptee", "ecart"]
+
+Position = Tuple[str, str]
+
+def get_inventaire(db: Session, inventaire_id: str):
+    return db.query(InventaireModel).filter(InventaireModel.id == inventaire_id).first()
+
+def open_inventaire(db: Session, zone: Optional[TypeEmplacement] = None):
+    """Open a counting session and snapshot the implantations of the zone (all of them if None)."""
+    en_cours = select(InventaireModel.id).where(InventaireModel.etat == EtatInventaire.EN_COURS)
+    if zone is not None:
+        en_cours = en_cours.where(or_(InventaireModel.zone.is_(None), InventaireModel.zone == zone))
+    if db.execute(en_cours.limit(1)).first():
+        raise ValueError("An inventory of this zone is already in progress")
+
+    db_inventaire = InventaireModel(zone=zone, etat=EtatInventaire.EN_COURS)
+    db.add(db_inventaire)
+    db.flush()
+    source = select(literal(db_inventaire.id), ImplantationModel.id, ImplantationModel.article_id,
+                    ImplantationModel.emplacement_id, ImplantationModel.quantite)
+    if zone is not None:
+        source = (source.join(EmplacementModel, EmplacementModel.id == ImplantationModel.emplacement_id)
+                  .where(EmplacementModel.type == zone))
+    db.execute(insert(InventaireStockModel).from_select(
+        ["inventaire_id", "implantation_id", "article_id", "emplacement_id", "quantite"], source
+    ))
+    db.commit()
+    return db_inventaire
+
+def _existing(db: Session, column, ids: Set[str]):
+    """Plain rows of ``column``'s table whose ``column`` is in ``ids``."""
+    ids = list(ids)
+    rows = []
+    for debut in range(0, len(ids), BULK_IN_CHUNK):
+        rows.extend(db.execute(select(column.table).where(column.in_(ids[debut:debut + BULK_IN_CHUNK]))))
+    return rows
+
+def record_counts(db: Session, inventaire_id: str, comptages: List[ComptageCreate]) -> Optional[int]:
+    """Append a batch of scans to an open session; returns the number recorded, or None if not found."""
+    db_inventaire = get_inventaire(db, inventaire_id)
+    if db_inventaire is None:
+        return None
+    if db_inventaire.etat != EtatInventaire.EN_COURS:
+        raise ValueError(f"Inventory is {db_inventaire.etat.value}, counts are closed")
+    if not comptages:
+        return 0
+
+    emplacements = {row.id: row.type for row in _existing(
+        db, EmplacementModel.id, {c.emplacement_id for c in comptages})}
+    for comptage in comptages:
+        if comptage.emplacement_id not in emplacements:
+            raise ValueError(f"Emplacement {comptage.emplacement_id} not found")
+        if db_inventaire.zone is not None and emplacements[comptage.emplacement_id] != db_inventaire.zone:
+            raise ValueError(f"Emplacement {comptage.emplacement_id} is outside the inventoried zone")
+    articles = {row.id for row in _existing(db, ArticleModel.id, {c.article_id for c in comptages})}
+    inconnus = sorted({c.article_id for c in comptages} - articles)
+    if inconnus:
+        raise ValueError(f"Article {inconnus[0]} not found")
+
+    maintenant = datetime.utcnow()
+    db.execute(insert(ComptageModel), [
+        {"id": str(uuid4()), "inventaire_id": inventaire_id, "emplacement_id": c.emplacement_id,
+         "article_id": c.article_id, "quantite": c.quantite, "date_comptage": maintenant}
+        for c in comptages
+    ])
+    db.commit()
+    return len(comptages)
+
+def _counted(db: Session, inventaire_id: str) -> Dict[Position, int]:
+    """Build side of the join: quantity counted per (emplacement_id, article_id)."""
+    rows = db.execute(
+        select(ComptageModel.emplacement_id, ComptageModel.article_id, func.sum(ComptageModel.quantite))
+        .where(ComptageModel.inventaire_id == inventaire_id)
+        .group_by(ComptageModel.emplacement_id, ComptageModel.article_id)
+        .execution_options(yield_per=LOT)
+    )
+    return {(emplacement_id, article_id): quantite for emplacement_id, article_id, quantite in rows}
+
+def _deltas(db: Session, inventaire_id: str, comptes: Dict[Position, int]) -> Iterable[tuple]:
+    """Probe side: stream the snapshot against the counts.
+
+    Yields (implantation_id, article_id, emplacement_id, theorique, compte) with
+    compte None for locations never scanned, then the found stock with no
+    implantation_id. ``comptes`` is consumed.
+    """
+    scannes = {emplacement_id for emplacement_id, _ in comptes}
+    rows = db.execute(
+        select(InventaireStockModel.implantation_id, InventaireStockModel.article_id,
+               InventaireStockModel.emplacement_id, InventaireStockModel.quantite)
+        .where(InventaireStockModel.inventaire_id == inventaire_id)
+        .execution_options(yield_per=LOT)
+    )
+    for implantation_id, article_id, emplacement_id, theorique in rows:
+        compte = comptes.pop((emplacement_id, article_id), None)
+        if compte is None and emplacement_id in scannes:
+            compte = 0
+        yield implantation_id, article_id, emplacement_id, theorique, compte
+    for (emplacement_id, article_id), compte in sorted(comptes.items()):
+        yield None, article_id, emplacement_id, 0, compte
+
+def _implantations(db: Session, positions: Iterable[Position]) -> Dict[Position, str]:
+    """Current implantation id of (emplacement_id, article_id) positions that have one."""
+    positions = set(positions)
+    return {(row.emplacement_id, row.article_id): row.id
+            for row in _existing(db, ImplantationModel.emplacement_id, {e for e, _ in positions})
+            if (row.emplacement_id, row.article_id) in positions}
+
+def _place(db: Session, inventaire_id: str, trouvees: List[Dict], appliquer: bool) -> List[Dict]:
+    """Found stock goes onto the implantation created since the snapshot, or a new one.
+
+    New implantations are inserted with their movements when ``appliquer``;
+    the lines landing on an existing implantation are returned, to be adjusted.
+    """
+    actuelles = _implantations(db, ((e["emplacement_id"], e["article_id"]) for e in trouvees))
+    existantes, nouvelles = [], []
+    for ecart in trouvees:
+        position = ecart["emplacement_id"], ecart["article_id"]
+        if position in actuelles:
+            existantes.append(dict(ecart, implantation_id=actuelles[position]))
+        else:
+            nouvelles.append(ecart)
+    if appliquer and nouvelles:
+        db.execute(insert(ImplantationModel), [
+            {"id": str(uuid4()), "article_id": e["article_id"], "emplacement_id": e["emplacement_id"],
+             "quantite": e["quantite_comptee"], "seuil_minimum": 0, "quantite_reservee": 0} for e in nouvelles
+        ])
+        append_movements(db, TypeMouvement.INVENTAIRE,
+                         ((e["article_id"], e["emplacement_id"], e["ecart"]) for e in nouvelles), inventaire_id)
+    return existantes
+
+def _adjust(db: Session, inventaire_id: str, lot: List[Dict], appliquer: bool) -> List[Dict]:
+    """Check a batch of deltas against the current implantations and, with ``appliquer``, apply them.
+
+    A delta is added to the current quantity, so movements recorded after the
+    count are kept. Lines whose implantation was deleted since the snapshot, or
+    whose new quantity would fall below the reserved quantity, are left out and
+    returned as conflicts; they move no stock and record no movement.
+    """
+    actuelles = {row.id: row for row in _existing(db, ImplantationModel.id, {e["implantation_id"] for e in lot})}
+    ajustements, conflits = [], []
+    for ecart in lot:
+        implantation = actuelles.get(ecart["implantation_id"])
+        if implantation is None:
+            conflits.append(dict(ecart, motif="Implantation was deleted after the snapshot"))
+        elif implantation.quantite + ecart["ecart"] < implantation.quantite_reservee:
+            conflits.append(dict(ecart, motif="Counted quantity is below the reserved quantity"))
+        else:
+            ajustements.append(ecart)
+    if appliquer and ajustements:
+        table = ImplantationModel.__table__
+        result = db.execute(
+            update(table)
+            .where(table.c.id == bindparam("implantation"),
+                   table.c.quantite + bindparam("ecart") >= table.c.quantite_reservee)
+            .values(quantite=table.c.quantite + bindparam("ecart")),
+            [{"implantation": e["implantation_id"], "ecart": e["ecart"]} for e in ajustements],
+        )
+        if result.rowcount != len(ajustements):
+            db.rollback()
+            raise ValueError("Implantations changed while the inventory was applied, nothing was changed")
+        append_movements(db, TypeMouvement.INVENTAIRE,
+                         ((e["article_id"], e["emplacement_id"], e["ecart"]) for e in ajustements), inventaire_id)
+    return conflits
+
+def reconcile(db: Session, inventaire_id: str, appliquer: bool = False) -> Optional[Dict]:
+    """Totals of the deltas between the counts and the snapshot; with ``appliquer``, adjust the stock and close the session."""
+    db_inventaire = get_inventaire(db, inventaire_id)
+    if db_inventaire is None:
+        return None
+    if db_inventaire.etat != EtatInventaire.EN_COURS:
+        raise ValueError(f"Inventory is {db_inventaire.etat.value}")
+    if appliquer:
+        claim = db.execute(
+            update(InventaireModel)
+            .where(InventaireModel.id == inventaire_id, InventaireModel.etat == EtatInventaire.EN_COURS)
+            .values(etat=EtatInventaire.APPLIQUE, date_application=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        if claim.rowcount != 1:
+            db.rollback()
+            raise ValueError("Inventory was applied or cancelled concurrently")
+
+    lot, trouvees, conflits, touches = [], [], [], set()
+    nb_positions = nb_comptees = nb_non_comptees = nb_ecarts = 0
+    for implantation_id, article_id, emplacement_id, theorique, compte in _deltas(
+            db, inventaire_id, _counted(db, inventaire_id)):
+        if implantation_id is not None:
+            nb_positions += 1
+        if compte is None:
+            nb_non_comptees += 1
+            continue
+        nb_comptees += 1
+        if compte == theorique:
+            continue
+        nb_ecarts += 1
+        touches.add(emplacement_id)
+        ecart = {"implantation_id": implantation_id, "article_id": article_id, "emplacement_id": emplacement_id,
+                 "quantite_theorique": theorique, "quantite_comptee": compte, "ecart": compte - theorique}
+        (lot if implantation_id is not None else trouvees).append(ecart)
+        if len(trouvees) >= LOT:
+            lot.extend(_place(db, inventaire_id, trouvees, appliquer))
+            trouvees = []
+        if len(lot) >= LOT:
+            conflits.extend(_adjust(db, inventaire_id, lot, appliquer))
+            lot = []
+    if trouvees:
+        lot.extend(_place(db, inventaire_id, trouvees, appliquer))
+    if lot:
+        conflits.extend(_adjust(db, inventaire_id, lot, appliquer))
+
+    if appliquer:
+        db.commit()
+        capacity_index.invalidate(*touches)
+    return {
+        "inventaire_id": inventaire_id,
+        "etat": EtatInventaire.APPLIQUE if appliquer else EtatInventaire.EN_COURS,
+        "nb_positions": nb_positions,
+        "nb_comptees": nb_comptees,
+        "nb_non_comptees": nb_non_comptees,
+        "nb_ecarts": nb_ecarts,
+        "nb_conflits": len(conflits),
+        "conflits": conflits,
+    }
+
+def export_ecarts(db: Session, inventaire_id: str, format: ExportFormat) -> Iterator[str]:
+    """Stream the lines that differ from the snapshot, one chunk per LOT."""
+    def lignes():
+        for implantation_id, article_id, emplacement_id, theorique, compte in _deltas(
+                db, inventaire_id, _counted(db, inventaire_id)):
+            if compte is not None and compte != theorique:
+                yield implantation_id, article_id, emplacement_id, theorique, compte, compte - theorique
+    return stream_tuples(db, lignes(), COLONNES_ECART, format, LOT)
+
+def cancel_inventaire(db: Session, inventaire_id: str):
+    """Close a session without touching the stock."""
+    db_inventaire = get_inventaire(db, inventaire_id)
+    if db_inventaire:
+        if db_inventaire.etat != EtatInventaire.EN_COURS:
+            raise ValueError(f"Inventory is {db_inventaire.etat.value}")
+        db_inventaire.etat = EtatInventaire.ANNULE
+        db.commit()
+        db.refresh(db_inventaire)
+    return db_inventaire
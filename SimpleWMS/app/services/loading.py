@@ -0,0 +1,40 @@
+"""Eager-loading options derived from the read schemas.
+
+A read schema that embeds a relationship (``CommandeRead.lignes``) makes the
+serializer lazy load it once per row. ``loader_options`` turns every schema
+field named after a relationship of the model into a ``selectinload``, nested
+schemas included, so a page costs one query per relationship instead of one
+per row.
+"""
+from functools import lru_cache
+from typing import Optional, Tuple, Type, get_args
+
+from pydantic import BaseModel
+from sqlalchemy import inspect
+from sqlalchemy.orm import selectinload
+
+def _nested_schema(annotation) -> Optional[Type[BaseModel]]:
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    for arg in get_args(annotation):
+        nested = _nested_schema(arg)
+        if nested is not None:
+            return nested
+    return None
+
+@lru_cache(maxsize=None)
+def loader_options(model, schema: Type[BaseModel]) -> Tuple:
+    """selectinload() every relationship of ``model`` serialized by ``schema``."""
+    relationships = inspect(model).relationships
+    options = []
+    for name, field in schema.model_fields.items():
+        if name not in relationships:
+            continue
+        option = selectinload(getattr(model, name))
+        nested = _nested_schema(field.annotation)
+        if nested is not None:
+            children = loader_options(relationships[name].mapper.class_, nested)
+            if children:
+                option = option.options(*children)
+        options.append(option)
+    return tuple(options)
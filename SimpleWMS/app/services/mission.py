@@ -1,32 +1,258 @@
+from sqlalchemy import DateTime, and_, bindparam, func, or_, select, update
 from sqlalchemy.orm import Session
-from app.models import Mission as MissionModel
-from app.schemas.mission import MissionCreate, MissionUpdate
+from app.models import Allocation as AllocationModel, Implantation as ImplantationModel, Mission as MissionModel
+from app.models.mouvement import TypeMouvement
+from app.schemas.mission import (MissionCreate, MissionUpdate, MissionPatch, MissionRead, MissionTransition,
+                                 TransitionStatus, TypeMission, EtatMission)
+from app.services.allocation import consume_allocations, detach_allocations
+from app.services.commande import BULK_IN_CHUNK
+from app.services.loading import loader_options
+from app.services.mouvement import apply_movements
+from app.services.pagination import paginate
+from app.services.patch import patch_row
+from app.services.export import export_statement, stream_rows
+from app.services.putaway import capacity_index
+from app.schemas.export import ExportFormat
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Relationships embedded in MissionRead, loaded in one query per page
+_read_options = loader_options(MissionModel, MissionRead)
+
+# States a mission can move to from each state; TERMINE is final.
+# A_FAIRE -> TERMINE records a mission confirmed in one scan, without a start;
+# EN_COURS -> A_FAIRE hands an unfinished mission back to the pool, and
+# ECHOUE -> A_FAIRE plans a failed one again. None of the three moves stock.
+TRANSITIONS = {
+    EtatMission.A_FAIRE: {EtatMission.EN_COURS, EtatMission.TERMINE, EtatMission.ECHOUE},
+    EtatMission.EN_COURS: {EtatMission.A_FAIRE, EtatMission.TERMINE, EtatMission.ECHOUE},
+    EtatMission.ECHOUE: {EtatMission.A_FAIRE},
+}
+# States that date the execution of the mission
+FINAUX = {EtatMission.TERMINE, EtatMission.ECHOUE}
+# Fields behind the stock movements of a completed mission: they are frozen once it is TERMINE
+CHAMPS_STOCK = ("type", "article_id", "source_id", "destination_id", "quantite")
+FIGEE = "A completed mission cannot change its type, article, locations or quantity"
 
 def get_mission(db: Session, mission_id: str):
-    return db.query(MissionModel).filter(MissionModel.id == mission_id).first()
+    return db.query(MissionModel).options(*_read_options).filter(MissionModel.id == mission_id).first()
 
 def list_missions(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(MissionModel).offset(skip).limit(limit).all()
+    return db.query(MissionModel).options(*_read_options).order_by(MissionModel.id).offset(skip).limit(limit).all()
+
+def list_missions_page(db: Session, cursor: Optional[str] = None, limit: int = 100):
+    return paginate(db.query(MissionModel).options(*_read_options), MissionModel.id, cursor, limit)
 
 def create_mission(db: Session, mission: MissionCreate):
     db_mission = MissionModel(**mission.dict())
     db.add(db_mission)
     db.commit()
-    db.refresh(db_mission)
     return db_mission
 
 def update_mission(db: Session, mission_id: str, mission_data: MissionUpdate):
+    """Write the mission and apply its state change in one transaction."""
     db_mission = get_mission(db, mission_id)
     if db_mission:
-        for key, value in mission_data.dict().items():
+        if db_mission.etat == EtatMission.TERMINE and any(
+                getattr(db_mission, champ) != getattr(mission_data, champ) for champ in CHAMPS_STOCK):
+            raise ValueError(FIGEE)
+        # State changes go through the state machine, which also dates them; date_creation is never rewritten
+        exclude = {"etat", "date_creation"}
+        transition = mission_data.etat != db_mission.etat
+        if transition:
+            exclude.add("date_execution")
+        for key, value in mission_data.dict(exclude=exclude).items():
             setattr(db_mission, key, value)
+        if transition:
+            # The other fields are written first, so a completion moves the new quantity
+            db.flush()
+            resultat = transition_missions(db, [MissionTransition(
+                mission_id=mission_id, etat=mission_data.etat, date=mission_data.date_execution
+            )], commit=False)[0]
+            if resultat["status"] == TransitionStatus.REJECTED:
+                db.rollback()
+                raise ValueError(resultat["detail"])
         db.commit()
         db.refresh(db_mission)
     return db_mission
 
+def patch_mission(db: Session, mission_id: str, mission_data: MissionPatch):
+    """Write the sent fields; a state change is one UPDATE guarded on the states it can come from.
+
+    Completion moves stock, so it goes through transition_missions, after the
+    other fields and in the same transaction. The stock fields of a completed
+    mission only accept their current value.
+    """
+    changes = mission_data.dict(exclude_unset=True)
+    nouveau = changes.pop("etat", None)
+    garde = []
+    stock = {champ: changes[champ] for champ in CHAMPS_STOCK if champ in changes}
+    if stock:
+        garde.append(or_(MissionModel.etat != EtatMission.TERMINE,
+                         and_(*(getattr(MissionModel, champ) == valeur for champ, valeur in stock.items()))))
+    date = None
+    if nouveau is not None:
+        nouveau = EtatMission(nouveau)
+        if nouveau == EtatMission.TERMINE:
+            date = changes.pop("date_execution", None)
+        else:
+            changes["etat"] = nouveau
+            garde.append(MissionModel.etat.in_(
+                [etat for etat, suivants in TRANSITIONS.items() if nouveau in suivants] + [nouveau]))
+            if nouveau in FINAUX:
+                changes.setdefault("date_execution", datetime.utcnow())
+
+    db_mission = patch_row(db, MissionModel, mission_id, changes, *garde)
+    if db_mission is None:
+        # Cold path: tell a missing mission from a refused change
+        etat = db.scalar(select(MissionModel.etat).where(MissionModel.id == mission_id))
+        db.rollback()
+        if etat is None:
+            return None
+        if etat == EtatMission.TERMINE and stock:
+            raise ValueError(FIGEE)
+        raise ValueError(f"Mission cannot go from {etat.value} to {nouveau.value}")
+    if nouveau == EtatMission.TERMINE:
+        resultat = transition_missions(db, [MissionTransition(mission_id=mission_id, etat=nouveau, date=date)],
+                                       commit=False)[0]
+        if resultat["status"] == TransitionStatus.REJECTED and resultat["etat"] != nouveau:
+            db.rollback()
+            raise ValueError(resultat["detail"])
+        db_mission = patch_row(db, MissionModel, mission_id, {})
+    elif nouveau == EtatMission.ECHOUE:
+        detach_allocations(db, [mission_id])
+    db.commit()
+    return db_mission
+
 def delete_mission(db: Session, mission_id: str):
     db_mission = get_mission(db, mission_id)
     if db_mission:
         db.delete(db_mission)
         db.commit()
     return db_mission
+
+def _missions(db: Session, mission_ids: List[str]):
+    mission_ids = list(set(mission_ids))
+    missions = {}
+    for debut in range(0, len(mission_ids), BULK_IN_CHUNK):
+        missions.update((row.id, row) for row in db.execute(
+            select(MissionModel.id, MissionModel.type, MissionModel.etat, MissionModel.article_id,
+                   MissionModel.source_id, MissionModel.destination_id, MissionModel.quantite)
+            .where(MissionModel.id.in_(mission_ids[debut:debut + BULK_IN_CHUNK]))
+        ))
+    return missions
+
+def _stock(db: Session, positions):
+    """[quantite, quantite not reserved] per (article_id, emplacement_id) of the given positions."""
+    stock = {}
+    emplacement_ids = list({emplacement_id for _, emplacement_id in positions})
+    for debut in range(0, len(emplacement_ids), BULK_IN_CHUNK):
+        for article_id, emplacement_id, quantite, reservee in db.execute(
+            select(ImplantationModel.article_id, ImplantationModel.emplacement_id, ImplantationModel.quantite,
+                   ImplantationModel.quantite_reservee)
+            .where(ImplantationModel.emplacement_id.in_(emplacement_ids[debut:debut + BULK_IN_CHUNK]))
+        ):
+            if (article_id, emplacement_id) in positions:
+                stock[article_id, emplacement_id] = [quantite, quantite - reservee]
+    return stock
+
+def _holds(db: Session, mission_ids: List[str]) -> Dict[str, int]:
+    """Reserved quantity each mission picks, from the allocations linked to it."""
+    holds = {}
+    for debut in range(0, len(mission_ids), BULK_IN_CHUNK):
+        holds.update(db.execute(
+            select(AllocationModel.mission_id, func.sum(AllocationModel.quantite))
+            .where(AllocationModel.mission_id.in_(mission_ids[debut:debut + BULK_IN_CHUNK]))
+            .group_by(AllocationModel.mission_id)
+        ).all())
+    return holds
+
+def transition_missions(db: Session, transitions: List[MissionTransition], commit: bool = True) -> List[Dict]:
+    """Apply a batch of state changes in one transaction, in order; invalid ones are rejected, not fatal.
+
+    A mission reaching TERMINE moves its quantity from source_id to
+    destination_id and, for PREPARATION, consumes the reservations it picked.
+    Only the part it picks from its own reservations may come out of reserved
+    stock: the rest must be free at the source. With ``commit`` False the
+    changes are left in the caller's transaction.
+    """
+    missions = _missions(db, [t.mission_id for t in transitions])
+    etats = {mission_id: mission.etat for mission_id, mission in missions.items()}
+    stock = _stock(db, {(m.article_id, m.source_id) for m in missions.values() if m.source_id})
+    holds = _holds(db, [mission_id for mission_id, mission in missions.items()
+                        if mission.type == TypeMission.PREPARATION and mission.source_id])
+    maintenant = datetime.utcnow()
+    resultats, changements, mouvements = [], [], []
+    terminees, echouees, touches = [], [], set()
+
+    for index, transition in enumerate(transitions):
+        mission = missions.get(transition.mission_id)
+        nouveau = EtatMission(transition.etat)
+        detail = None
+        if mission is None:
+            detail = "Mission not found"
+        elif nouveau not in TRANSITIONS.get(etats[mission.id], ()):
+            detail = f"Mission cannot go from {etats[mission.id].value} to {nouveau.value}"
+        elif nouveau == EtatMission.TERMINE and mission.source_id:
+            quantite, libre = stock.get((mission.article_id, mission.source_id), (0, 0))
+            hors_reservation = mission.quantite - min(holds.get(mission.id, 0), mission.quantite)
+            if quantite < mission.quantite or libre < hors_reservation:
+                detail = "Not enough stock at the source location"
+            else:
+                stock[mission.article_id, mission.source_id] = [quantite - mission.quantite, libre - hors_reservation]
+        if detail:
+            resultats.append({"index": index, "mission_id": transition.mission_id,
+                              "status": TransitionStatus.REJECTED, "etat": etats.get(transition.mission_id),
+                              "detail": detail})
+            continue
+
+        changements.append({"mission": mission.id, "ancien": etats[mission.id], "nouveau": nouveau,
+                            "date": (transition.date or maintenant) if nouveau in FINAUX else None})
+        etats[mission.id] = nouveau
+        if nouveau == EtatMission.TERMINE:
+            terminees.append(mission.id)
+            if mission.source_id:
+                mouvements.append((mission.article_id, mission.source_id, -mission.quantite, mission.id))
+            if mission.destination_id:
+                mouvements.append((mission.article_id, mission.destination_id, mission.quantite, mission.id))
+                destination = stock.get((mission.article_id, mission.destination_id))
+                if destination is not None:
+                    destination[0] += mission.quantite
+                    destination[1] += mission.quantite
+            touches.update(e for e in (mission.source_id, mission.destination_id) if e)
+        elif nouveau == EtatMission.ECHOUE:
+            echouees.append(mission.id)
+        resultats.append({"index": index, "mission_id": mission.id, "status": TransitionStatus.APPLIED,
+                          "etat": nouveau, "detail": None})
+
+    if changements:
+        table = MissionModel.__table__
+        result = db.execute(
+            update(table)
+            .where(table.c.id == bindparam("mission"), table.c.etat == bindparam("ancien"))
+            .values(etat=bindparam("nouveau"),
+                    date_execution=func.coalesce(bindparam("date", type_=DateTime), table.c.date_execution)),
+            changements,
+        )
+        if result.rowcount != len(changements):
+            db.rollback()
+            raise ValueError("Missions changed while the batch was applied, nothing was changed")
+        try:
+            apply_movements(db, TypeMouvement.MISSION, mouvements)
+        except ValueError:
+            db.rollback()
+            raise
+        consume_allocations(db, terminees)
+        detach_allocations(db, echouees)
+        if commit:
+            db.commit()
+        capacity_index.invalidate(*touches)
+    return resultats
+
+def export_missions(db: Session, format: ExportFormat, type: Optional[TypeMission] = None,
+                    etat: Optional[EtatMission] = None, agent_id: Optional[str] = None,
+                    article_id: Optional[str] = None, depuis: Optional[datetime] = None,
+                    jusqu_a: Optional[datetime] = None):
+    statement = export_statement(MissionModel, "date_creation", depuis, jusqu_a,
+                                 type=type, etat=etat, agent_id=agent_id, article_id=article_id)
+    return stream_rows(db, statement, format)
@@ -0,0 +1,154 @@
+"""Append-only stock movement ledger, compacted into periodic snapshots.
+
+Every change of stock is appended to ``mouvements`` as a signed quantity on an
+(article, location) position, in the transaction of the change itself: one
+bulk INSERT, no read of the current stock. ``Implantation.quantite`` stays the
+current projection read by picking and reservation, and is only ever moved by
+increments (``quantite = quantite + :delta``).
+
+Compaction folds the previous snapshot and the movements appended since into a
+new snapshot with one INSERT ... SELECT, so the stock at any time T is the
+nearest snapshot taken before T plus the short tail of movements after it.
+Movements younger than ``MARGE`` are left to the next compaction: ids are given
+at insert time, so a transaction still open could commit a smaller id after the
+snapshot was cut.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import uuid4
+
+from sqlalchemy import bindparam, func, insert, literal, select, union_all, update
+from sqlalchemy.orm import Session
+
+from app.models import Implantation as ImplantationModel, Mouvement as MouvementModel
+from app.models.mouvement import StockSnapshot as SnapshotModel, StockSnapshotLigne as LigneModel, TypeMouvement
+
+# Movements newer than this are not compacted yet
+MARGE = timedelta(seconds=60)
+
+# (article_id, emplacement_id, quantite)
+Variation = Tuple[str, str, int]
+
+def append_movements(db: Session, type: TypeMouvement, variations: Iterable[Variation],
+                     reference: Optional[str] = None, date: Optional[datetime] = None):
+    """Append movements in the caller's transaction; zero quantities are skipped."""
+    _append(db, type, ((*variation, reference) for variation in variations), date)
+
+def _append(db: Session, type: TypeMouvement, mouvements: Iterable[Tuple[str, str, int, Optional[str]]],
+            date: Optional[datetime] = None):
+    date = date or datetime.utcnow()
+    rows = [{"article_id": article_id, "emplacement_id": emplacement_id, "quantite": quantite, "type": type,
+             "reference": reference, "date_mouvement": date}
+            for article_id, emplacement_id, quantite, reference in mouvements if quantite]
+    if rows:
+        db.execute(insert(MouvementModel), rows)
+
+def apply_movements(db: Session, type: TypeMouvement, mouvements: List[Tuple[str, str, int, Optional[str]]]):
+    """Append (article_id, emplacement_id, quantite, reference) movements and add them to the implantations.
+
+    Runs in the caller's transaction: missing implantations are created empty,
+    each touched position is updated once with its net variation, and a
+    ValueError is raised (for the caller to roll back) if one would go negative.
+    """
+    nettes = defaultdict(int)
+    for article_id, emplacement_id, quantite, _ in mouvements:
+        nettes[article_id, emplacement_id] += quantite
+    nettes = {position: quantite for position, quantite in nettes.items() if quantite}
+    if nettes:
+        existantes = {(article_id, emplacement_id) for article_id, emplacement_id in db.execute(
+            select(ImplantationModel.article_id, ImplantationModel.emplacement_id)
+            .where(ImplantationModel.emplacement_id.in_({emplacement_id for _, emplacement_id in nettes}))
+        )}
+        manquantes = sorted(p for p, quantite in nettes.items() if quantite > 0 and p not in existantes)
+        if manquantes:
+            db.execute(insert(ImplantationModel), [
+                {"id": str(uuid4()), "article_id": article_id, "emplacement_id": emplacement_id, "quantite": 0,
+                 "seuil_minimum": 0, "quantite_reservee": 0} for article_id, emplacement_id in manquantes
+            ])
+        table = ImplantationModel.__table__
+        variation = bindparam("variation")
+        result = db.execute(
+            update(table)
+            .where(table.c.article_id == bindparam("article"), table.c.emplacement_id == bindparam("emplacement"))
+            .where(table.c.quantite + variation >= 0)
+            .values(quantite=table.c.quantite + variation),
+            [{"article": a, "emplacement": e, "variation": q} for (a, e), q in sorted(nettes.items())],
+        )
+        if result.rowcount != len(nettes):
+            raise ValueError("Not enough stock to apply the movements")
+    _append(db, type, mouvements)
+
+def list_movements(db: Session, article_id: Optional[str] = None, emplacement_id: Optional[str] = None,
+                   apres: Optional[int] = None, limit: int = 100):
+    """Movements in ledger order, after the ``apres`` movement id."""
+    query = select(MouvementModel.__table__).order_by(MouvementModel.id).limit(limit)
+    if article_id is not None:
+        query = query.where(MouvementModel.article_id == article_id)
+    if emplacement_id is not None:
+        query = query.where(MouvementModel.emplacement_id == emplacement_id)
+    if apres is not None:
+        query = query.where(MouvementModel.id > apres)
+    return db.execute(query).mappings().all()
+
+def _snapshot(db: Session, date: Optional[datetime] = None):
+    """Latest snapshot taken at or before ``date``."""
+    query = select(SnapshotModel.id, SnapshotModel.mouvement_id).order_by(SnapshotModel.id.desc()).limit(1)
+    if date is not None:
+        query = query.where(SnapshotModel.date_snapshot <= date)
+    return db.execute(query).first()
+
+def _positions(snapshot, jusqu_a: Optional[int] = None, date: Optional[datetime] = None,
+               article_id: Optional[str] = None, emplacement_id: Optional[str] = None):
+    """Snapshot lines and tail movements as one UNION ALL of (article_id, emplacement_id, quantite)."""
+    queue = select(MouvementModel.article_id, MouvementModel.emplacement_id, MouvementModel.quantite)
+    parties = []
+    if snapshot is not None:
+        queue = queue.where(MouvementModel.id > snapshot.mouvement_id)
+        parties.append(select(LigneModel.article_id, LigneModel.emplacement_id, LigneModel.quantite)
+                       .where(LigneModel.snapshot_id == snapshot.id))
+    if jusqu_a is not None:
+        queue = queue.where(MouvementModel.id <= jusqu_a)
+    if date is not None:
+        queue = queue.where(MouvementModel.date_mouvement <= date)
+    parties.append(queue)
+    if article_id is not None:
+        parties = [p.where(p.selected_columns.article_id == article_id) for p in parties]
+    if emplacement_id is not None:
+        parties = [p.where(p.selected_columns.emplacement_id == emplacement_id) for p in parties]
+    return union_all(*parties).subquery()
+
+def stock_at(db: Session, date: Optional[datetime] = None, article_id: Optional[str] = None,
+             emplacement_id: Optional[str] = None) -> List[Dict]:
+    """Stock per position at ``date`` (now if None): nearest snapshot plus the movements after it."""
+    positions = _positions(_snapshot(db, date), date=date, article_id=article_id, emplacement_id=emplacement_id)
+    quantite = func.sum(positions.c.quantite)
+    return db.execute(
+        select(positions.c.article_id, positions.c.emplacement_id, quantite.label("quantite"))
+        .group_by(positions.c.article_id, positions.c.emplacement_id)
+        .having(quantite != 0)
+        .order_by(positions.c.article_id, positions.c.emplacement_id)
+    ).mappings().all()
+
+def compact(db: Session, maintenant: Optional[datetime] = None):
+    """Fold the movements older than MARGE into a new snapshot; None if there is nothing new."""
+    limite = (maintenant or datetime.utcnow()) - MARGE
+    dernier = db.scalar(select(func.max(MouvementModel.id)).where(MouvementModel.date_mouvement <= limite))
+    precedent = _snapshot(db)
+    if dernier is None or (precedent is not None and dernier <= precedent.mouvement_id):
+        return None
+
+    db_snapshot = SnapshotModel(date_snapshot=limite, mouvement_id=dernier)
+    db.add(db_snapshot)
+    db.flush()
+    positions = _positions(precedent, jusqu_a=dernier)
+    quantite = func.sum(positions.c.quantite)
+    db.execute(insert(LigneModel).from_select(
+        ["snapshot_id", "article_id", "emplacement_id", "quantite"],
+        select(literal(db_snapshot.id), positions.c.article_id, positions.c.emplacement_id, quantite)
+        .group_by(positions.c.article_id, positions.c.emplacement_id)
+        .having(quantite != 0)
+    ))
+    db.commit()
+    db.refresh(db_snapshot)
+    return db_snapshot
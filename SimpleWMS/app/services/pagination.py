@@ -0,0 +1,51 @@
+"""Keyset (cursor) pagination shared by the list_*_page services.
+
+Pages are ordered on a unique column and continue after the last key of the
+previous page, so the database seeks straight to the next row instead of
+skipping ``offset`` rows. The cursor handed to clients is opaque: the last key,
+JSON encoded then base64url encoded. Keys are string ids; a cursor decoding to
+anything else is rejected before it reaches a query.
+"""
+import base64
+import binascii
+import json
+from typing import Any, List, Optional, Sequence, Tuple
+
+
+def encode_cursor(value: Any) -> str:
+    return base64.urlsafe_b64encode(json.dumps([value]).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Any:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        decoded = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError, TypeError, UnicodeDecodeError):
+        decoded = None
+    if not isinstance(decoded, list) or len(decoded) != 1 or not isinstance(decoded[0], str):
+        raise ValueError("Curseur de pagination invalide")
+    return decoded[0]
+
+
+def keyset(query, column, cursor: Optional[str], limit: int):
+    """Restrict ``query`` (a Query or a select()) to the page after ``cursor``.
+
+    One extra row is fetched to tell whether another page follows.
+    """
+    query = query.order_by(column)
+    if cursor:
+        query = query.filter(column > decode_cursor(cursor))
+    return query.limit(limit + 1)
+
+
+def build_page(rows: Sequence, column, limit: int) -> Tuple[List, Optional[str]]:
+    """Split the rows fetched by ``keyset`` into the page and the next cursor."""
+    items = list(rows[:limit])
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor(getattr(items[-1], column.key))
+    return items, next_cursor
+
+
+def paginate(query, column, cursor: Optional[str], limit: int) -> Tuple[List, Optional[str]]:
+    return build_page(keyset(query, column, cursor, limit).all(), column, limit)
@@ -0,0 +1,37 @@
+"""Partial updates shared by the patch_* services.
+
+A PATCH writes only the fields the client sent (``exclude_unset``) with one
+``UPDATE ... WHERE id = :id RETURNING *``: no SELECT before, no refresh after,
+and the returned row is what the endpoint serializes. Column ``onupdate``
+defaults still apply, so ``version`` and ``date_modification`` move exactly as
+with a PUT. Services read the current row only when they need an old value
+(a natural key to evict from the cache), and only when that field is patched.
+"""
+from typing import Any, Dict, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+def patch_statement(model, row_id: str, changes: Dict[str, Any], *where):
+    """UPDATE of the ``changes`` columns of one row, returning the whole row.
+
+    Extra ``where`` clauses guard the write (a row in another state is left
+    untouched and nothing is returned). With no changes, the row is selected.
+    """
+    table = model.__table__
+    for name, value in changes.items():
+        if value is None and not table.c[name].nullable:
+            raise ValueError(f"{name} cannot be null")
+    if not changes:
+        return select(table).where(table.c.id == row_id, *where)
+    return update(table).where(table.c.id == row_id, *where).values(**changes).returning(*table.c)
+
+def patch_row(db: Session, model, row_id: str, changes: Dict[str, Any], *where) -> Optional[Dict[str, Any]]:
+    """Apply a patch in the caller's transaction; None if no row matched."""
+    row = db.execute(patch_statement(model, row_id, changes, *where)).mappings().first()
+    return None if row is None else dict(row)
+
+async def apatch_row(db: AsyncSession, model, row_id: str, changes: Dict[str, Any], *where) -> Optional[Dict[str, Any]]:
+    row = (await db.execute(patch_statement(model, row_id, changes, *where))).mappings().first()
+    return None if row is None else dict(row)
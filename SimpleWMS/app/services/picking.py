@@ -0,0 +1,361 @@
+"""Pick-path optimisation for the PREPARATION missions of one or more commandes.
+
+Locations are placed on a grid parsed from their code (``A-01-02``: aisle A,
+bay 1). Aisles are parallel and joined by a cross-aisle at both ends, so going
+from one aisle to another means leaving by the front or the back, whichever is
+shorter. The route starts at the depot (front of the first aisle), is built
+nearest neighbour first and then shortened by 2-opt until no reversal helps or
+the time budget is spent. Codes that cannot be parsed are visited last, in code
+order.
+
+Lines of a commande whose stock was reserved are picked from the implantations
+held by their allocations, which are then linked to the missions created. The
+rest is allocated from the implantations of each article, net of the reserved
+stock and of what open missions already take from them: a location that holds
+the whole line and sits next to a stop already on the route is preferred,
+otherwise the fullest locations are used first to keep the number of stops low.
+
+Preparing a commande moves it from RESERVEE to PREPAREE, with an UPDATE guarded
+on its state in the transaction creating the missions, so two preparations of
+the same commande cannot both plan it. A prepared commande (or one already
+planned in a wave) can be prepared again: only its allocations not linked to a
+mission, such as those handed back by a failed pick, are planned.
+"""
+import re
+import time
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from uuid import uuid4
+
+from sqlalchemy import and_, bindparam, exists, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.models import (Allocation as AllocationModel, Commande as CommandeModel,
+                        Emplacement as EmplacementModel, Implantation as ImplantationModel,
+                        LigneCommande as LigneModel, Mission as MissionModel)
+from app.models.commande import EtatCommande
+from app.models.emplacement import TypeEmplacement
+from app.models.mission import EtatMission, TypeMission
+from app.services.commande import BULK_IN_CHUNK
+from app.services.reappro import OPEN_STATES
+
+# Bays walked to cross from one aisle to the next one
+ECART_ALLEES = 3
+# Time budget of the 2-opt improvement, in seconds
+BUDGET_2OPT = 0.05
+_CODE = re.compile(r"^\s*([A-Za-z]+|\d+)[^A-Za-z0-9]+(\d+)")
+
+Position = Tuple[int, int]
+
+def parse_code(code: str) -> Optional[Position]:
+    """(aisle, bay) of a location code such as ``A-01-02`` or ``12-004``, or None."""
+    match = _CODE.match(code or "")
+    if not match:
+        return None
+    allee, travee = match.groups()
+    if allee.isdigit():
+        return int(allee), int(travee)
+    rang = 0
+    for lettre in allee.upper():
+        rang = rang * 26 + ord(lettre) - ord("A") + 1
+    return rang - 1, int(travee)
+
+def distances(p: Position, points: Sequence[Position], longueur: int) -> List[int]:
+    """Walking distance from ``p`` to each of ``points``, in aisles ``longueur`` bays long."""
+    allee, travee = p
+    # Leaving by the front walks travee + b bays, by the back the rest of both aisles
+    devant, derriere = travee, 2 * longueur - travee
+    return [abs(travee - b) if a == allee else abs(allee - a) * ECART_ALLEES + min(devant + b, derriere - b)
+            for a, b in points]
+
+def distance(p: Position, q: Position, longueur: int) -> int:
+    """Walking distance between two positions of aisles ``longueur`` bays long."""
+    return distances(p, [q], longueur)[0]
+
+def plan_route(positions: Sequence[Position], depart: Position = (0, 0),
+               budget: float = BUDGET_2OPT) -> Tuple[List[int], int]:
+    """Visiting order of ``positions`` from ``depart`` and its length: nearest neighbour, then 2-opt."""
+    if not positions:
+        return [], 0
+    points = [depart, *positions]
+    longueur = max(p[1] for p in points) + 1
+    n = len(points)
+    d = [distances(p, points, longueur) for p in points]
+
+    route, restants = [0], set(range(1, n))
+    while restants:
+        ligne = d[route[-1]]
+        suivant = min(restants, key=lambda k: (ligne[k], k))
+        route.append(suivant)
+        restants.remove(suivant)
+
+    # 2-opt on an open path: reverse route[i..j] when it shortens the walk
+    limite = time.perf_counter() + budget
+    ameliore = True
+    while ameliore and time.perf_counter() < limite:
+        ameliore = False
+        for i in range(1, n - 1):
+            da = d[route[i - 1]]
+            b = route[i]
+            for j in range(i + 1, n):
+                c = route[j]
+                if j + 1 < n:
+                    e = route[j + 1]
+                    gain = da[b] + d[c][e] - da[c] - d[b][e]
+                else:
+                    gain = da[b] - da[c]
+                if gain > 0:
+                    route[i:j + 1] = route[j:i - 1:-1]
+                    b = route[i]
+                    ameliore = True
+
+    longueur_totale = sum(d[route[k]][route[k + 1]] for k in range(n - 1))
+    return [k - 1 for k in route[1:]], longueur_totale
+
+def _commandes(db: Session, commande_ids: Sequence[str]) -> List[str]:
+    """Check the commandes can be prepared; return those never planned yet."""
+    trouvees = db.execute(
+        select(CommandeModel.id, CommandeModel.reference, CommandeModel.etat, CommandeModel.vague_id)
+        .where(CommandeModel.id.in_(commande_ids))
+    ).all()
+    if len(trouvees) != len(set(commande_ids)):
+        raise ValueError("Commande not found")
+    for commande in trouvees:
+        if commande.etat not in (EtatCommande.RESERVEE, EtatCommande.PREPAREE):
+            raise ValueError(f"Commande {commande.reference} is not reserved")
+    return [commande.id for commande in trouvees
+            if commande.etat == EtatCommande.RESERVEE and commande.vague_id is None]
+
+def available_sources(db: Session, article_ids: Iterable[str]):
+    """(article_id, emplacement_id, code, type, disponible) of the locations holding the articles."""
+    # Missions picking reserved stock are already counted in quantite_reservee
+    engagee = (
+        select(MissionModel.article_id, MissionModel.source_id, func.sum(MissionModel.quantite).label("quantite"))
+        .where(MissionModel.etat.in_(OPEN_STATES), MissionModel.source_id.is_not(None))
+        .where(~exists().where(AllocationModel.mission_id == MissionModel.id))
+        .group_by(MissionModel.article_id, MissionModel.source_id)
+        .subquery()
+    )
+    disponible = (ImplantationModel.quantite - ImplantationModel.quantite_reservee
+                  - func.coalesce(engagee.c.quantite, 0)).label("disponible")
+    statement = (
+        select(ImplantationModel.article_id, ImplantationModel.emplacement_id, EmplacementModel.code,
+               EmplacementModel.type, disponible)
+        .join(EmplacementModel, EmplacementModel.id == ImplantationModel.emplacement_id)
+        .outerjoin(engagee, and_(
+            engagee.c.article_id == ImplantationModel.article_id,
+            engagee.c.source_id == ImplantationModel.emplacement_id,
+        ))
+        .where(disponible > 0)
+    )
+    article_ids = list(set(article_ids))
+    rows = []
+    for debut in range(0, len(article_ids), BULK_IN_CHUNK):
+        rows.extend(db.execute(
+            statement.where(ImplantationModel.article_id.in_(article_ids[debut:debut + BULK_IN_CHUNK]))
+        ))
+    return rows
+
+def reserved_stock(db: Session, commande_ids: Iterable[str]):
+    """Allocations of the lines of the commandes, with the location they hold stock on."""
+    statement = (
+        select(AllocationModel.id, AllocationModel.ligne_id, AllocationModel.quantite, AllocationModel.mission_id,
+               LigneModel.commande_id, LigneModel.article_id, ImplantationModel.emplacement_id,
+               EmplacementModel.code, EmplacementModel.type)
+        .join(LigneModel, LigneModel.id == AllocationModel.ligne_id)
+        .join(ImplantationModel, ImplantationModel.id == AllocationModel.implantation_id)
+        .join(EmplacementModel, EmplacementModel.id == ImplantationModel.emplacement_id)
+        .order_by(AllocationModel.id)
+    )
+    commande_ids = list(set(commande_ids))
+    rows = []
+    for debut in range(0, len(commande_ids), BULK_IN_CHUNK):
+        rows.extend(db.execute(
+            statement.where(LigneModel.commande_id.in_(commande_ids[debut:debut + BULK_IN_CHUNK]))
+        ))
+    return rows
+
+def reserved_picks(reservees, stock: "Stock", key=lambda reservee: reservee.commande_id):
+    """Picks of the allocations not linked to a mission yet, and the quantity allocated per line."""
+    picks, allouees = [], Counter()
+    for reservee in reservees:
+        allouees[reservee.ligne_id] += reservee.quantite
+        if reservee.mission_id is None:
+            stock.place(reservee.emplacement_id, reservee.code, reservee.type)
+            picks.append((key(reservee), reservee.article_id, reservee.emplacement_id, reservee.quantite,
+                          (reservee.id,)))
+    return picks, allouees
+
+def link_allocations(db: Session, liens: List[Dict[str, str]]):
+    """Attach allocations to the missions picking them; fails if one was picked meanwhile."""
+    if not liens:
+        return
+    table = AllocationModel.__table__
+    result = db.execute(
+        update(table)
+        .where(table.c.id == bindparam("allocation"))
+        .where(table.c.mission_id.is_(None))
+        .values(mission_id=bindparam("mission")),
+        liens,
+    )
+    if result.rowcount != len(liens):
+        db.rollback()
+        raise ValueError("Reserved stock was picked concurrently, nothing was created")
+
+class Stock:
+    """Quantities left per article and location while picks are allocated, and location positions."""
+
+    def __init__(self, sources):
+        self.disponible: Dict[str, List[list]] = defaultdict(list)
+        self.positions: Dict[str, Optional[Position]] = {}
+        self.zones: Dict[str, TypeEmplacement] = {}
+        for article_id, emplacement_id, code, type, disponible in sources:
+            self.disponible[article_id].append([disponible, emplacement_id])
+            self.positions[emplacement_id] = parse_code(code)
+            self.zones[emplacement_id] = type
+        self.longueur = max((p[1] for p in self.positions.values() if p), default=0) + 1
+
+    def place(self, emplacement_id: str, code: str, type: TypeEmplacement):
+        """Register a location picked from without being available, such as reserved stock."""
+        if emplacement_id not in self.positions:
+            self.positions[emplacement_id] = parse_code(code)
+            self.zones[emplacement_id] = type
+            if self.positions[emplacement_id]:
+                self.longueur = max(self.longueur, self.positions[emplacement_id][1] + 1)
+
+    def zone(self, article_id: str) -> Optional[TypeEmplacement]:
+        """Zone of the location holding most of the article."""
+        sources = self.disponible.get(article_id)
+        return self.zones[max(sources)[1]] if sources else None
+
+def allocate_sources(lignes, stock: Stock, depart: Position = (0, 0)):
+    """Split (key, article_id, quantite) lines over the stock; return the picks and the shortfalls.
+
+    A pick is (key, article_id, emplacement_id, quantite, allocation_ids), a shortfall
+    (key, article_id, manque).
+    """
+    positions = stock.positions
+    # Bays of the stops already chosen, per aisle, and the aisles visited: nearest stop by bisect
+    baies: Dict[int, List[int]] = {}
+    allees: List[int] = []
+
+    def arreter(position: Position):
+        if position[0] not in baies:
+            insort(allees, position[0])
+        insort(baies.setdefault(position[0], []), position[1])
+
+    def proximite(emplacement_id):
+        position = positions[emplacement_id]
+        if position is None:
+            return float("inf")
+        voisines = baies.get(position[0])
+        if voisines:
+            i = bisect_left(voisines, position[1])
+            return min(abs(voisines[k] - position[1]) for k in (i - 1, i) if 0 <= k < len(voisines))
+        # Entering a new aisle: walk to it and down its length
+        i = bisect_left(allees, position[0])
+        ecart = min(abs(allees[k] - position[0]) for k in (i - 1, i) if 0 <= k < len(allees))
+        return ecart * ECART_ALLEES + stock.longueur
+
+    arreter(depart)
+
+    # Articles with a single location first: their stops are forced and attract the others
+    lignes = sorted(lignes, key=lambda ligne: len(stock.disponible.get(ligne[1], ())) != 1)
+    picks, manques = [], []
+    for key, article_id, quantite in lignes:
+        candidats = [source for source in stock.disponible.get(article_id, []) if source[0] > 0]
+        couvrants = [source for source in candidats if source[0] >= quantite]
+        if couvrants:
+            choix = [min(couvrants, key=lambda source: (proximite(source[1]), source[1]))]
+        else:
+            choix = sorted(candidats, key=lambda source: (-source[0], source[1]))
+        for source in choix:
+            if quantite <= 0:
+                break
+            prise = min(quantite, source[0])
+            source[0] -= prise
+            quantite -= prise
+            picks.append((key, article_id, source[1], prise, ()))
+            if positions[source[1]] is not None:
+                arreter(positions[source[1]])
+        if quantite > 0:
+            manques.append((key, article_id, quantite))
+    return picks, manques
+
+def order_picks(picks, positions: Dict[str, Optional[Position]], depart: Position = (0, 0)):
+    """Picks in route order, grouped by location, and the route length."""
+    par_emplacement = defaultdict(list)
+    for pick in picks:
+        par_emplacement[pick[2]].append(pick)
+    places = sorted(e for e in par_emplacement if positions.get(e) is not None)
+    hors_plan = sorted((e for e in par_emplacement if positions.get(e) is None))
+    ordre, longueur = plan_route([positions[e] for e in places], depart)
+    ordonnes = []
+    for emplacement_id in [places[k] for k in ordre] + hors_plan:
+        ordonnes.extend(par_emplacement[emplacement_id])
+    return ordonnes, longueur
+
+def merge_picks(picks):
+    """One pick per article and location, keyed on the article."""
+    fusion = {}
+    for _, article_id, emplacement_id, quantite, allocation_ids in picks:
+        cle = article_id, emplacement_id
+        if cle in fusion:
+            quantite += fusion[cle][3]
+            allocation_ids = fusion[cle][4] + allocation_ids
+        fusion[cle] = (article_id, article_id, emplacement_id, quantite, allocation_ids)
+    return list(fusion.values())
+
+def prepare_commandes(db: Session, commande_ids: Sequence[str], destination_id: Optional[str] = None,
+                      depart: Position = (0, 0)):
+    """Create the PREPARATION missions of reserved commandes as one ordered picking route."""
+    if not commande_ids:
+        raise ValueError("No commande to prepare")
+    nouvelles = _commandes(db, commande_ids)
+    # Lines not held by allocations are only planned the first time
+    lignes = db.execute(
+        select(LigneModel.id, LigneModel.commande_id, LigneModel.article_id, LigneModel.quantite)
+        .where(LigneModel.commande_id.in_(nouvelles))
+    ).all()
+    stock = Stock(available_sources(db, (l.article_id for l in lignes)))
+    picks, allouees = reserved_picks(reserved_stock(db, commande_ids), stock)
+    libres = [(l.commande_id, l.article_id, l.quantite - allouees[l.id]) for l in lignes
+              if l.quantite > allouees[l.id]]
+    libres, manques = allocate_sources(libres, stock, depart)
+    ordonnes, longueur = order_picks(picks + libres, stock.positions, depart)
+
+    tournee_id, maintenant = str(uuid4()), datetime.utcnow()
+    missions = [
+        {"id": str(uuid4()), "type": TypeMission.PREPARATION, "etat": EtatMission.A_FAIRE,
+         "article_id": article_id, "source_id": source_id, "destination_id": destination_id,
+         "quantite": quantite, "agent_id": None, "date_creation": maintenant, "date_execution": None,
+         "tournee_id": tournee_id, "ordre": rang}
+        for rang, (_, article_id, source_id, quantite, _) in enumerate(ordonnes, start=1)
+    ]
+    if missions:
+        if nouvelles:
+            result = db.execute(
+                update(CommandeModel)
+                .where(CommandeModel.id.in_(nouvelles), CommandeModel.etat == EtatCommande.RESERVEE,
+                       CommandeModel.vague_id.is_(None))
+                .values(etat=EtatCommande.PREPAREE)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount != len(nouvelles):
+                db.rollback()
+                raise ValueError("Commandes were prepared concurrently, nothing was created")
+        db.execute(insert(MissionModel), missions)
+        link_allocations(db, [{"allocation": allocation_id, "mission": mission["id"]}
+                              for mission, pick in zip(missions, ordonnes) for allocation_id in pick[4]])
+        db.commit()
+    return {
+        "tournee_id": tournee_id if missions else None,
+        "distance": longueur,
+        "missions": missions,
+        "lignes_non_servies": [
+            {"commande_id": commande_id, "article_id": article_id, "manque": manque}
+            for commande_id, article_id, manque in manques
+        ],
+    }
@@ -0,0 +1,209 @@
+"""Capacity-aware putaway: best-fit RECEPTION / STOCKAGE location for a pallet.
+
+The remaining weight and volume of every putaway location are computed once,
+with a single GROUP BY over implantations (quantite x article weight and
+volume), then kept per location type in a list sorted by remaining volume. A
+suggestion is a bisect on the volume needed followed by a short forward walk
+to the first location that also has the weight left: the tightest fit, without
+scanning the emplacements. Writers mark the locations they touch as stale;
+stale entries are reloaded together, in one query, before the next suggestion.
+The index is local to the worker process, so an assignment re-checks its
+location against the database before storing anything.
+"""
+import threading
+from bisect import bisect_left, insort
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Collection, Dict, Iterable, List, Optional, Set, Tuple
+from uuid import uuid4
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models import (Article as ArticleModel, Emplacement as EmplacementModel,
+                        Implantation as ImplantationModel, Reception as ReceptionModel)
+from app.models.emplacement import TypeEmplacement
+from app.models.mouvement import TypeMouvement
+from app.services.mouvement import append_movements
+
+PUTAWAY_TYPES = (TypeEmplacement.RECEPTION, TypeEmplacement.STOCKAGE)
+# Tolerance on float capacities (a pallet filling a location exactly fits)
+EPSILON = 1e-9
+# Above this many stale locations, reloading everything is cheaper than an IN list
+FULL_RELOAD = 500
+# Locations tried by assign_putaway when the index turns out to be stale
+ASSIGN_ATTEMPTS = 5
+
+@dataclass(frozen=True)
+class Place:
+    emplacement_id: str
+    code: str
+    type: TypeEmplacement
+    volume_restant_m3: float
+    poids_restant_kg: float
+
+    def fits(self, volume: float, poids: float) -> bool:
+        return self.volume_restant_m3 >= volume - EPSILON and self.poids_restant_kg >= poids - EPSILON
+
+def remaining_capacity(db: Session, emplacement_ids: Optional[Collection[str]] = None) -> List[Place]:
+    """Remaining capacity of every putaway location, or of ``emplacement_ids`` only."""
+    charge = (
+        select(
+            ImplantationModel.emplacement_id,
+            func.sum(ImplantationModel.quantite * ArticleModel.poids_kg).label("poids"),
+            func.sum(ImplantationModel.quantite * ArticleModel.volume_m3).label("volume"),
+        )
+        .join(ArticleModel, ArticleModel.id == ImplantationModel.article_id)
+        .group_by(ImplantationModel.emplacement_id)
+    )
+    if emplacement_ids is not None:
+        charge = charge.where(ImplantationModel.emplacement_id.in_(emplacement_ids))
+    charge = charge.subquery()
+    statement = (
+        select(
+            EmplacementModel.id,
+            EmplacementModel.code,
+            EmplacementModel.type,
+            EmplacementModel.capacite_volume_m3 - func.coalesce(charge.c.volume, 0),
+            EmplacementModel.capacite_poids_kg - func.coalesce(charge.c.poids, 0),
+        )
+        .outerjoin(charge, charge.c.emplacement_id == EmplacementModel.id)
+        .where(EmplacementModel.type.in_(PUTAWAY_TYPES))
+    )
+    if emplacement_ids is not None:
+        statement = statement.where(EmplacementModel.id.in_(emplacement_ids))
+    return [Place(*row) for row in db.execute(statement)]
+
+def _key(place: Place) -> Tuple[float, float, str]:
+    return place.volume_restant_m3, place.poids_restant_kg, place.emplacement_id
+
+class CapacityIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._places: Optional[Dict[str, Place]] = None
+        self._sorted: Dict[TypeEmplacement, List[Tuple[float, float, str]]] = {}
+        self._stale: Set[str] = set()
+
+    def _insert(self, place: Place):
+        self._places[place.emplacement_id] = place
+        insort(self._sorted.setdefault(place.type, []), _key(place))
+
+    def _discard(self, emplacement_id: str):
+        place = self._places.pop(emplacement_id, None)
+        if place is not None:
+            keys = self._sorted[place.type]
+            del keys[bisect_left(keys, _key(place))]
+
+    def _sync(self, db: Session):
+        """Load the index on first use, then reload the stale locations."""
+        with self._lock:
+            loaded = self._places is not None
+            stale = set(self._stale)
+        if loaded and not stale:
+            return
+
+        full = not loaded or len(stale) > FULL_RELOAD
+        places = remaining_capacity(db, None if full else stale)
+        with self._lock:
+            if full:
+                self._places, self._sorted = {}, {}
+            else:
+                for emplacement_id in stale:
+                    self._discard(emplacement_id)
+            self._stale -= stale
+            for place in places:
+                self._insert(place)
+
+    def best_fit(self, db: Session, volume: float, poids: float,
+                 types: Iterable[TypeEmplacement] = PUTAWAY_TYPES,
+                 exclude: Collection[str] = ()) -> Optional[Place]:
+        """Location of ``types`` left with the least free volume once the pallet is stored."""
+        self._sync(db)
+        best = None
+        with self._lock:
+            for type in types:
+                keys = self._sorted.get(type, [])
+                # Locations with enough volume, tightest first; skip those short on weight
+                for i in range(bisect_left(keys, (volume - EPSILON,)), len(keys)):
+                    key = keys[i]
+                    if key[1] >= poids - EPSILON and key[2] not in exclude:
+                        if best is None or key < best:
+                            best = key
+                        break
+            return None if best is None else self._places[best[2]]
+
+    def put(self, place: Place):
+        """Record the remaining capacity of a location, e.g. after a committed putaway."""
+        with self._lock:
+            if self._places is not None:
+                self._discard(place.emplacement_id)
+                self._insert(place)
+
+    def invalidate(self, *emplacement_ids: str):
+        """Mark locations whose stock or capacity changed so that they are reloaded."""
+        with self._lock:
+            self._stale.update(emplacement_id for emplacement_id in emplacement_ids if emplacement_id)
+
+    def clear(self):
+        with self._lock:
+            self._places, self._sorted = None, {}
+            self._stale.clear()
+
+
+capacity_index = CapacityIndex()
+
+def _pallet(db: Session, article_id: str, quantite: int,
+            types: Optional[Iterable[TypeEmplacement]]) -> Tuple[float, float, Tuple[TypeEmplacement, ...]]:
+    """Volume and weight of ``quantite`` units of an article, and the location types to search."""
+    if quantite <= 0:
+        raise ValueError("Quantity must be positive")
+    types = tuple(TypeEmplacement(type) for type in types) if types else PUTAWAY_TYPES
+    if any(type not in PUTAWAY_TYPES for type in types):
+        raise ValueError("Putaway locations must be of type RECEPTION or STOCKAGE")
+    article = db.query(ArticleModel.volume_m3, ArticleModel.poids_kg).filter(ArticleModel.id == article_id).first()
+    if article is None:
+        raise ValueError("Article not found")
+    return article.volume_m3 * quantite, article.poids_kg * quantite, types
+
+def suggest_putaway(db: Session, article_id: str, quantite: int,
+                    types: Optional[Iterable[TypeEmplacement]] = None) -> Optional[Place]:
+    """Best-fit location for ``quantite`` units of an article, or None if none can hold them."""
+    volume, poids, types = _pallet(db, article_id, quantite, types)
+    return capacity_index.best_fit(db, volume, poids, types)
+
+def _store(db: Session, article_id: str, emplacement_id: str, quantite: int, reception_id: str):
+    """Add received stock to the implantation of the article at the location, creating it if needed."""
+    updated = db.query(ImplantationModel).filter(
+        ImplantationModel.article_id == article_id,
+        ImplantationModel.emplacement_id == emplacement_id,
+    ).update({ImplantationModel.quantite: ImplantationModel.quantite + quantite}, synchronize_session=False)
+    if not updated:
+        db.add(ImplantationModel(article_id=article_id, emplacement_id=emplacement_id,
+                                 quantite=quantite, seuil_minimum=0))
+    append_movements(db, TypeMouvement.RECEPTION, [(article_id, emplacement_id, quantite)], reception_id)
+
+def assign_putaway(db: Session, article_id: str, quantite: int, fournisseur: str,
+                   date_reception: Optional[datetime] = None,
+                   types: Optional[Iterable[TypeEmplacement]] = None):
+    """Receive goods at the best-fit location and add them to its stock."""
+    volume, poids, types = _pallet(db, article_id, quantite, types)
+    ecartes = set()
+    for _ in range(ASSIGN_ATTEMPTS):
+        place = capacity_index.best_fit(db, volume, poids, types, ecartes)
+        if place is None:
+            break
+        actuelle = remaining_capacity(db, [place.emplacement_id])
+        if actuelle and actuelle[0].fits(volume, poids):
+            db_reception = ReceptionModel(id=str(uuid4()), article_id=article_id, quantite=quantite,
+                                          fournisseur=fournisseur, date_reception=date_reception or datetime.utcnow(),
+                                          emplacement_id=place.emplacement_id)
+            db.add(db_reception)
+            _store(db, article_id, place.emplacement_id, quantite, db_reception.id)
+            db.commit()
+            capacity_index.put(replace(actuelle[0], volume_restant_m3=actuelle[0].volume_restant_m3 - volume,
+                                       poids_restant_kg=actuelle[0].poids_restant_kg - poids))
+            return db_reception
+        # Another worker filled it: reload that location and try the next one
+        capacity_index.invalidate(place.emplacement_id)
+        ecartes.add(place.emplacement_id)
+    raise ValueError("No putaway location can hold this quantity")
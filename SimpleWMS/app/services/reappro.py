@@ -0,0 +1,125 @@
+"""Replenishment (REAPPRO) mission generator.
+
+One query lists the implantations below their minimum that have no open
+REAPPRO mission yet, a second one lists the surplus of every other location
+holding the same articles, net of the stock reserved for commandes and of what
+open missions already take from it. A preparation picking reserved stock is
+only counted once: its allocations are part of ``quantite_reservee``.
+Missions are planned in memory, largest shortfall first, and inserted with a
+single executemany; running the job twice creates nothing the second time.
+"""
+import heapq
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List
+from uuid import uuid4
+
+from sqlalchemy import and_, exists, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.models import Allocation as AllocationModel, Implantation as ImplantationModel, Mission as MissionModel
+from app.models.mission import EtatMission, TypeMission
+
+OPEN_STATES = (EtatMission.A_FAIRE, EtatMission.EN_COURS)
+
+def _needs(db: Session):
+    """(article_id, emplacement_id, manque) of implantations below threshold without an open REAPPRO."""
+    open_reappro = exists().where(and_(
+        MissionModel.type == TypeMission.REAPPRO,
+        MissionModel.etat.in_(OPEN_STATES),
+        MissionModel.article_id == ImplantationModel.article_id,
+        MissionModel.destination_id == ImplantationModel.emplacement_id,
+    ))
+    return db.execute(
+        select(
+            ImplantationModel.article_id,
+            ImplantationModel.emplacement_id,
+            (ImplantationModel.seuil_minimum - ImplantationModel.quantite).label("manque"),
+        )
+        .where(ImplantationModel.quantite < ImplantationModel.seuil_minimum)
+        .where(~open_reappro)
+    ).all()
+
+def _surplus(db: Session):
+    """(article_id, emplacement_id, disponible) of locations holding more than their minimum, reservations aside."""
+    engagee = (
+        select(
+            MissionModel.article_id,
+            MissionModel.source_id,
+            func.sum(MissionModel.quantite).label("quantite"),
+        )
+        .where(MissionModel.etat.in_(OPEN_STATES), MissionModel.source_id.is_not(None))
+        .group_by(MissionModel.article_id, MissionModel.source_id)
+        .subquery()
+    )
+    # Reserved stock already picked by open missions, counted in both quantite_reservee and engagee
+    liee = (
+        select(AllocationModel.implantation_id, func.sum(AllocationModel.quantite).label("quantite"))
+        .where(AllocationModel.mission_id.is_not(None))
+        .group_by(AllocationModel.implantation_id)
+        .subquery()
+    )
+    disponible = (
+        ImplantationModel.quantite - ImplantationModel.quantite_reservee - ImplantationModel.seuil_minimum
+        - func.coalesce(engagee.c.quantite, 0) + func.coalesce(liee.c.quantite, 0)
+    ).label("disponible")
+    besoin = select(ImplantationModel.article_id).where(ImplantationModel.quantite < ImplantationModel.seuil_minimum)
+    return db.execute(
+        select(ImplantationModel.article_id, ImplantationModel.emplacement_id, disponible)
+        .outerjoin(engagee, and_(
+            engagee.c.article_id == ImplantationModel.article_id,
+            engagee.c.source_id == ImplantationModel.emplacement_id,
+        ))
+        .outerjoin(liee, liee.c.implantation_id == ImplantationModel.id)
+        .where(ImplantationModel.article_id.in_(besoin))
+        .where(disponible > 0)
+    ).all()
+
+def plan_replenishment(needs, surplus) -> List[Dict]:
+    """Assign sources to needs: largest shortfall first, each served from the fullest sources."""
+    sources = defaultdict(list)
+    for article_id, emplacement_id, disponible in surplus:
+        sources[article_id].append((-disponible, emplacement_id))
+    for tas in sources.values():
+        heapq.heapify(tas)
+
+    plan = []
+    for article_id, destination_id, manque in sorted(needs, key=lambda need: -need[2]):
+        tas = sources.get(article_id, [])
+        reportees = []
+        while manque > 0 and tas:
+            disponible, source_id = heapq.heappop(tas)
+            if source_id == destination_id:
+                reportees.append((disponible, source_id))
+                continue
+            quantite = min(manque, -disponible)
+            plan.append({"article_id": article_id, "source_id": source_id,
+                         "destination_id": destination_id, "quantite": quantite})
+            manque -= quantite
+            if quantite < -disponible:
+                heapq.heappush(tas, (disponible + quantite, source_id))
+        for source in reportees:
+            heapq.heappush(tas, source)
+    return plan
+
+def generate_replenishment_missions(db: Session, dry_run: bool = False) -> Dict[str, int]:
+    """Create the REAPPRO missions needed to bring implantations back to their minimum."""
+    needs = _needs(db)
+    plan = plan_replenishment(needs, _surplus(db)) if needs else []
+
+    if plan and not dry_run:
+        maintenant = datetime.utcnow()
+        db.execute(insert(MissionModel), [
+            dict(mission, id=str(uuid4()), type=TypeMission.REAPPRO, etat=EtatMission.A_FAIRE,
+                 date_creation=maintenant)
+            for mission in plan
+        ])
+        db.commit()
+
+    couvertes = {(m["article_id"], m["destination_id"]) for m in plan}
+    return {
+        "implantations_sous_seuil": len(needs),
+        "missions_creees": 0 if dry_run else len(plan),
+        "quantite_planifiee": sum(m["quantite"] for m in plan),
+        "sans_source": sum(1 for need in needs if (need[0], need[1]) not in couvertes),
+    }
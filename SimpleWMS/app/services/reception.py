@@ -1,18 +1,29 @@
 from sqlalchemy.orm import Session
 from app.models import Reception as ReceptionModel
-from app.schemas.reception import ReceptionCreate, ReceptionUpdate
+from app.schemas.reception import ReceptionCreate, ReceptionUpdate, ReceptionRead
+from app.services.loading import loader_options
+from app.services.pagination import paginate
+from app.services.export import export_statement, stream_rows
+from app.schemas.export import ExportFormat
+from datetime import datetime
+from typing import Optional
+
+# Relationships embedded in ReceptionRead, loaded in one query per page
+_read_options = loader_options(ReceptionModel, ReceptionRead)
 
 def get_reception(db: Session, reception_id: str):
-    return db.query(ReceptionModel).filter(ReceptionModel.id == reception_id).first()
+    return db.query(ReceptionModel).options(*_read_options).filter(ReceptionModel.id == reception_id).first()
 
 def list_receptions(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(ReceptionModel).offset(skip).limit(limit).all()
+    return db.query(ReceptionModel).options(*_read_options).order_by(ReceptionModel.id).offset(skip).limit(limit).all()
+
+def list_receptions_page(db: Session, cursor: Optional[str] = None, limit: int = 100):
+    return paginate(db.query(ReceptionModel).options(*_read_options), ReceptionModel.id, cursor, limit)
 
 def create_reception(db: Session, reception: ReceptionCreate):
     db_reception = ReceptionModel(**reception.dict())
     db.add(db_reception)
     db.commit()
-    db.refresh(db_reception)
     return db_reception
 
 def update_reception(db: Session, reception_id: str, reception_data: ReceptionUpdate):
@@ -30,3 +41,10 @@ def delete_reception(db: Session, reception_id: str):
         db.delete(db_reception)
         db.commit()
     return db_reception
+
+def export_receptions(db: Session, format: ExportFormat, article_id: Optional[str] = None,
+                      emplacement_id: Optional[str] = None, fournisseur: Optional[str] = None,
+                      depuis: Optional[datetime] = None, jusqu_a: Optional[datetime] = None):
+    statement = export_statement(ReceptionModel, "date_reception", depuis, jusqu_a,
+                                 article_id=article_id, emplacement_id=emplacement_id, fournisseur=fournisseur)
+    return stream_rows(db, statement, format)
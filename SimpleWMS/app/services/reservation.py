@@ -1,53 +1,256 @@
+from sqlalchemy import and_, delete, insert, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from app.models.reservation import Reservation
-from app.schemas.reservation import ReservationCreate, ReservationUpdate
-from datetime import date, time
+from app.models.salle import Salle
+from app.schemas.reservation import (ReservationCreate, ReservationUpdate, ReservationRecurrenteCreate, Recurrence,
+                                     Frequence)
+from app.services import salle as salle_service
+from app.services.pagination import paginate
+from app.services.export import export_statement, stream_rows
+from app.schemas.export import ExportFormat
+from app.services.availability import index as availability_index, to_minutes, from_minutes, MINUTES_PAR_JOUR
+from calendar import monthrange
+from datetime import date, time, timedelta
+from typing import Collection, Dict, List, Optional
+from uuid import uuid4
+import heapq
+
+# Occurrences a single recurring request can book
+MAX_OCCURRENCES = 366
 
 def get_reservation(db: Session, reservation_id: str):
     return db.query(Reservation).filter(Reservation.id == reservation_id).first()
 
 def list_reservations(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(Reservation).offset(skip).limit(limit).all()
+    return db.query(Reservation).order_by(Reservation.id).offset(skip).limit(limit).all()
+
+def list_reservations_page(db: Session, cursor: Optional[str] = None, limit: int = 100):
+    return paginate(db.query(Reservation), Reservation.id, cursor, limit)
 
-def check_availability(db: Session, salle_id: str, date_reservation: date, heure_reservation: time):
+def validate_duree(heure_reservation: time, duree_minutes: int):
+    if duree_minutes <= 0 or to_minutes(heure_reservation) + duree_minutes > MINUTES_PAR_JOUR:
+        raise ValueError("Une réservation doit durer au moins une minute et se terminer le jour même")
+
+def check_availability(db: Session, salle_id: str, date_reservation: date, heure_reservation: time,
+                       duree_minutes: int = 60, exclude_id: Optional[str] = None):
     """Check if a room is available at the given date and time"""
-    existing = db.query(Reservation).filter(
-        Reservation.salle_id == salle_id,
-        Reservation.date == date_reservation,
-        Reservation.heure == heure_reservation
-    ).first()
-    return existing is None
+    return availability_index.is_free(db, salle_id, date_reservation, heure_reservation, duree_minutes, exclude_id)
+
+def check_availability_between(db: Session, salle_id: str, jour: date, debut: time, fin: time):
+    """Check if a room is free over the whole [debut, fin) interval"""
+    return check_availability(db, salle_id, jour, debut, to_minutes(fin) - to_minutes(debut))
+
+def list_free_slots(db: Session, salle_id: str, jour: date, debut: time, fin: time, duree_minutes: int = 1):
+    """Free intervals of a room between ``debut`` and ``fin`` on the given day"""
+    return availability_index.free_slots(db, salle_id, jour, debut, fin, duree_minutes)
+
+def find_overlaps(db: Session, salle_id: str, jours: Collection[date], heure: time, duree_minutes: int,
+                  exclude_ids: Collection[str] = ()) -> Dict[date, str]:
+    """Id of a booking overlapping the slot, per day, read in the writing transaction.
+
+    Call it once the new rows are flushed: on SQLite the write lock is then
+    held, and on PostgreSQL the salle row is locked (FOR NO KEY UPDATE, which
+    does not conflict with the foreign key checks of the inserts), so two
+    bookings of one room are checked one after the other and overlapping slots
+    with different start times cannot both commit. The lock and the read are
+    one statement: the salle outer-joined to its bookings of those days.
+    """
+    debut = to_minutes(heure)
+    fin = debut + duree_minutes
+    rows = db.execute(
+        select(Reservation.id, Reservation.date, Reservation.heure, Reservation.duree_minutes)
+        .select_from(Salle)
+        .outerjoin(Reservation, and_(Reservation.salle_id == Salle.id, Reservation.date.in_(list(jours)),
+                                     Reservation.id.not_in(list(exclude_ids))))
+        .where(Salle.id == salle_id)
+        .with_for_update(of=Salle, key_share=True)
+    )
+    conflits = {}
+    for reservation_id, jour, autre_heure, autre_duree in rows:
+        if reservation_id is None:
+            continue
+        autre_debut = to_minutes(autre_heure)
+        if autre_debut < fin and autre_debut + autre_duree > debut:
+            conflits.setdefault(jour, reservation_id)
+    return conflits
+
+def _commit_slot(db: Session, reservation: Reservation):
+    """Commit a booking after checking it against the database, not only the index.
+
+    The in-memory index is local to the worker: when two workers race for
+    overlapping slots, find_overlaps in the writing transaction decides the
+    winner (and the unique (salle_id, date, heure) index for identical starts).
+    """
+    try:
+        db.flush()
+        conflit = bool(find_overlaps(db, reservation.salle_id, [reservation.date], reservation.heure,
+                                     reservation.duree_minutes, [reservation.id]))
+        if not conflit:
+            db.commit()
+    except IntegrityError:
+        conflit = True
+    if conflit:
+        db.rollback()
+        availability_index.invalidate(reservation.salle_id, reservation.date)
+        raise ValueError("Cette salle est déjà réservée à ce créneau")
 
 def create_reservation(db: Session, reservation: ReservationCreate):
-    # Check availability before creating
-    if not check_availability(db, reservation.salle_id, reservation.date, reservation.heure):
+    validate_duree(reservation.heure, reservation.duree_minutes)
+    # The index turns most conflicts away without a write; the database has the last word
+    if not check_availability(db, reservation.salle_id, reservation.date, reservation.heure, reservation.duree_minutes):
         raise ValueError("Cette salle est déjà réservée à ce créneau")
-    
+
     db_reservation = Reservation(**reservation.dict())
     db.add(db_reservation)
-    db.commit()
-    db.refresh(db_reservation)
+    _commit_slot(db, db_reservation)
+    availability_index.add(db_reservation)
     return db_reservation
 
+def expand_occurrences(debut: date, recurrence: Recurrence) -> List[date]:
+    """Days of a series starting on ``debut``; monthly series skip the months without that day."""
+    if (recurrence.jusqu_au is None) == (recurrence.nombre is None):
+        raise ValueError("Une récurrence se termine soit à une date (jusqu_au), soit après un nombre d'occurrences")
+    if recurrence.jusqu_au is not None and recurrence.jusqu_au < debut:
+        raise ValueError("La fin de la récurrence précède sa première occurrence")
+
+    jours, n = [], 0
+    while recurrence.nombre is None or len(jours) < recurrence.nombre:
+        if recurrence.frequence == Frequence.MENSUELLE:
+            mois = debut.month - 1 + n * recurrence.intervalle
+            annee, mois = debut.year + mois // 12, mois % 12 + 1
+            jour = date(annee, mois, debut.day) if debut.day <= monthrange(annee, mois)[1] else None
+            if recurrence.jusqu_au is not None and date(annee, mois, 1) > recurrence.jusqu_au:
+                break
+        else:
+            pas = 7 if recurrence.frequence == Frequence.HEBDOMADAIRE else 1
+            jour = debut + timedelta(days=n * pas * recurrence.intervalle)
+        n += 1
+        if jour is None:
+            continue
+        if recurrence.jusqu_au is not None and jour > recurrence.jusqu_au:
+            break
+        if len(jours) == MAX_OCCURRENCES:
+            raise ValueError(f"Une récurrence ne peut dépasser {MAX_OCCURRENCES} occurrences")
+        jours.append(jour)
+    return jours
+
+def create_recurring_reservation(db: Session, reservation: ReservationRecurrenteCreate) -> Dict[str, List]:
+    """Book every free occurrence of a series in one INSERT and report the others.
+
+    The bookings of the whole date range are loaded with one query into the
+    availability index, so each occurrence is checked in memory. Once inserted,
+    the series is checked again in the same transaction with find_overlaps:
+    occurrences booked meanwhile by another worker are dropped and reported.
+    """
+    validate_duree(reservation.heure, reservation.duree_minutes)
+    jours = expand_occurrences(reservation.date, reservation.recurrence)
+    availability_index.preload(db, [reservation.salle_id], jours[0], jours[-1])
+
+    donnees = reservation.dict(exclude={"recurrence", "date"})
+    reservations, conflits = [], []
+    for jour in jours:
+        occupee = availability_index.conflict(db, reservation.salle_id, jour, reservation.heure,
+                                              reservation.duree_minutes)
+        if occupee is None:
+            reservations.append(Reservation(id=str(uuid4()), date=jour, **donnees))
+        else:
+            conflits.append({"date": jour, "heure": reservation.heure, "reservation_id": occupee})
+
+    if reservations:
+        try:
+            db.execute(insert(Reservation), [
+                {column: getattr(r, column) for column in ("id", "date", *donnees)} for r in reservations
+            ])
+            prises = find_overlaps(db, reservation.salle_id, [r.date for r in reservations], reservation.heure,
+                                   reservation.duree_minutes, [r.id for r in reservations])
+            if prises:
+                perdues = [r for r in reservations if r.date in prises]
+                db.execute(delete(Reservation).where(Reservation.id.in_([r.id for r in perdues])))
+                reservations = [r for r in reservations if r.date not in prises]
+                conflits.extend({"date": r.date, "heure": r.heure, "reservation_id": prises[r.date]} for r in perdues)
+                conflits.sort(key=lambda conflit: conflit["date"])
+                for r in perdues:
+                    availability_index.invalidate(r.salle_id, r.date)
+            db.commit()
+        except IntegrityError:
+            # Another worker booked one of the slots meanwhile: nothing was inserted
+            db.rollback()
+            for r in reservations:
+                availability_index.invalidate(r.salle_id, r.date)
+            raise ValueError("Une des occurrences a été réservée entre-temps, aucune n'a été créée")
+        for r in reservations:
+            availability_index.add(r)
+    return {"reservations": reservations, "conflits": conflits}
+
 def update_reservation(db: Session, reservation_id: str, reservation_data: ReservationUpdate):
     db_reservation = get_reservation(db, reservation_id)
     if db_reservation:
+        donnees = updated_fields(reservation_data, db_reservation)
+        validate_duree(donnees["heure"], donnees["duree_minutes"])
         # Check availability for the new slot if date/time changed
-        if (reservation_data.salle_id != db_reservation.salle_id or 
-            reservation_data.date != db_reservation.date or 
-            reservation_data.heure != db_reservation.heure):
-            if not check_availability(db, reservation_data.salle_id, reservation_data.date, reservation_data.heure):
+        if (donnees["salle_id"] != db_reservation.salle_id or
+            donnees["date"] != db_reservation.date or
+            donnees["heure"] != db_reservation.heure or
+            donnees["duree_minutes"] != db_reservation.duree_minutes):
+            if not check_availability(db, donnees["salle_id"], donnees["date"], donnees["heure"],
+                                      donnees["duree_minutes"], exclude_id=reservation_id):
                 raise ValueError("Cette salle est déjà réservée à ce créneau")
-        
-        for key, value in reservation_data.dict().items():
+
+        ancien_creneau = (db_reservation.salle_id, db_reservation.date, db_reservation.heure)
+        for key, value in donnees.items():
             setattr(db_reservation, key, value)
-        db.commit()
+        _commit_slot(db, db_reservation)
         db.refresh(db_reservation)
+        availability_index.remove(reservation_id, *ancien_creneau)
+        availability_index.add(db_reservation)
     return db_reservation
 
+def updated_fields(reservation_data: ReservationUpdate, db_reservation: Reservation) -> Dict:
+    """Fields a PUT writes; an omitted duree_minutes keeps the current duration."""
+    donnees = reservation_data.dict()
+    if donnees["duree_minutes"] is None:
+        donnees["duree_minutes"] = db_reservation.duree_minutes
+    return donnees
+
 def delete_reservation(db: Session, reservation_id: str):
     db_reservation = get_reservation(db, reservation_id)
     if db_reservation:
+        creneau = (db_reservation.salle_id, db_reservation.date, db_reservation.heure)
         db.delete(db_reservation)
         db.commit()
-    return db_reservation
\ No newline at end of file
+        availability_index.remove(reservation_id, *creneau)
+    return db_reservation
+
+def search_free_salles(db: Session, capacite_min: int, date_debut: date, date_fin: date, duree_minutes: int = 60,
+                       localisation: Optional[str] = None, debut: time = time(8, 0), fin: time = time(20, 0),
+                       pas_minutes: int = 30, limit: int = 50):
+    """Ranked free (salle, slot) pairs over a date range.
+
+    Bookings of every candidate room are loaded with one range query; slots are
+    ranked by closest capacity fit, then by earliest start.
+    """
+    salles = salle_service.list_salles(
+        db, limit=None, disponible=True, capacite_min=capacite_min, localisation=localisation
+    )
+    availability_index.preload(db, (salle.id for salle in salles), date_debut, date_fin)
+
+    candidates = []
+    jours = [date_debut + timedelta(days=n) for n in range((date_fin - date_debut).days + 1)]
+    for salle in salles:
+        for jour in jours:
+            for gap_debut, gap_fin in availability_index.free_slots(db, salle.id, jour, debut, fin, duree_minutes):
+                start, end = to_minutes(gap_debut), to_minutes(gap_fin)
+                while start + duree_minutes <= end:
+                    candidates.append((salle.capacite - capacite_min, jour, start, salle.nom, salle))
+                    start += pas_minutes
+
+    best = heapq.nsmallest(limit, candidates, key=lambda candidate: candidate[:4])
+    return [
+        (salle, jour, from_minutes(start), from_minutes(start + duree_minutes))
+        for _, jour, start, _, salle in best
+    ]
+
+def export_reservations(db: Session, format: ExportFormat, salle_id: Optional[str] = None,
+                        depuis: Optional[date] = None, jusqu_a: Optional[date] = None):
+    return stream_rows(db, export_statement(Reservation, "date", depuis, jusqu_a, salle_id=salle_id), format)
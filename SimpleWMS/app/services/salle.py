@@ -1,39 +1,79 @@
 from sqlalchemy.orm import Session
 from app.models.salle import Salle
-from app.schemas.salle import SalleCreate, SalleUpdate
+from app.schemas.salle import SalleCreate, SalleUpdate, SallePatch
+from app.services.availability import index as availability_index
+from app.services.pagination import paginate
+from app.services.patch import patch_row
+from app.services.cache import cache, cache_key
+from app.services.export import export_statement, stream_rows
+from app.schemas.export import ExportFormat
 from typing import Optional
 
-def get_salle(db: Session, salle_id: str):
-    return db.query(Salle).filter(Salle.id == salle_id).first()
+def get_salle(db: Session, salle_id: str, version: Optional[int] = None):
+    return cache.get(db, cache_key("salle", salle_id), Salle,
+                     lambda: db.query(Salle).filter(Salle.id == salle_id).first(),
+                     valid=None if version is None else lambda salle: salle.version == version)
+
+def get_salle_version(db: Session, salle_id: str):
+    """Version and modification date of a room, without loading the row."""
+    return db.query(Salle.version, Salle.date_modification).filter(Salle.id == salle_id).first()
 
 def get_salle_by_nom(db: Session, nom: str):
     return db.query(Salle).filter(Salle.nom == nom).first()
 
-def list_salles(db: Session, skip: int = 0, limit: int = 100, disponible: Optional[bool] = None):
-    query = db.query(Salle)
+def _filter_salles(query, disponible: Optional[bool] = None, capacite_min: Optional[int] = None,
+                   localisation: Optional[str] = None):
     if disponible is not None:
         query = query.filter(Salle.disponible == disponible)
-    return query.offset(skip).limit(limit).all()
+    if capacite_min is not None:
+        query = query.filter(Salle.capacite >= capacite_min)
+    if localisation:
+        query = query.filter(Salle.localisation.ilike(f"%{localisation}%"))
+    return query
+
+def list_salles(db: Session, skip: int = 0, limit: Optional[int] = 100, disponible: Optional[bool] = None,
+                capacite_min: Optional[int] = None, localisation: Optional[str] = None):
+    query = _filter_salles(db.query(Salle), disponible, capacite_min, localisation)
+    return query.order_by(Salle.id).offset(skip).limit(limit).all()
+
+def list_salles_versions(db: Session, skip: int = 0, limit: Optional[int] = 100, disponible: Optional[bool] = None):
+    query = _filter_salles(db.query(Salle.id, Salle.version, Salle.date_modification), disponible)
+    return query.order_by(Salle.id).offset(skip).limit(limit).all()
+
+def list_salles_page(db: Session, cursor: Optional[str] = None, limit: int = 100, disponible: Optional[bool] = None):
+    return paginate(_filter_salles(db.query(Salle), disponible), Salle.id, cursor, limit)
 
 def create_salle(db: Session, salle: SalleCreate):
     db_salle = Salle(**salle.dict())
     db.add(db_salle)
     db.commit()
-    db.refresh(db_salle)
     return db_salle
 
 def update_salle(db: Session, salle_id: str, salle_data: SalleUpdate):
-    db_salle = get_salle(db, salle_id)
+    db_salle = db.get(Salle, salle_id, populate_existing=True)
     if db_salle:
         for key, value in salle_data.dict().items():
             setattr(db_salle, key, value)
         db.commit()
+        cache.invalidate(cache_key("salle", salle_id))
         db.refresh(db_salle)
     return db_salle
 
+def patch_salle(db: Session, salle_id: str, salle_data: SallePatch):
+    db_salle = patch_row(db, Salle, salle_id, salle_data.dict(exclude_unset=True))
+    db.commit()
+    if db_salle is not None:
+        cache.invalidate(cache_key("salle", salle_id))
+    return db_salle
+
 def delete_salle(db: Session, salle_id: str):
-    db_salle = get_salle(db, salle_id)
+    db_salle = db.get(Salle, salle_id, populate_existing=True)
     if db_salle:
         db.delete(db_salle)
         db.commit()
+        cache.invalidate(cache_key("salle", salle_id))
+        availability_index.forget_salle(salle_id)
     return db_salle
+
+def export_salles(db: Session, format: ExportFormat, disponible: Optional[bool] = None):
+    return stream_rows(db, export_statement(Salle, disponible=disponible), format)
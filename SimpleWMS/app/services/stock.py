@@ -0,0 +1,90 @@
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app.models import Article as ArticleModel, Emplacement as EmplacementModel, Implantation as ImplantationModel
+from app.schemas.emplacement import TypeEmplacement
+from typing import Optional
+
+# Aggregates are computed by the database on every call, so they never lag
+# behind the implantations; the per-article sum only reads the covering index
+# (article_id, emplacement_id, quantite).
+
+def _totaux_par_article(article_id: Optional[str] = None):
+    query = select(
+        ImplantationModel.article_id,
+        func.sum(ImplantationModel.quantite).label("quantite_totale"),
+        func.count().label("nb_emplacements"),
+    ).group_by(ImplantationModel.article_id)
+    if article_id is not None:
+        query = query.where(ImplantationModel.article_id == article_id)
+    return query.subquery()
+
+def list_stock_by_article(db: Session, skip: int = 0, limit: int = 100, article_id: Optional[str] = None):
+    """Total quantity and number of locations per article, zero for articles without stock."""
+    totaux = _totaux_par_article(article_id)
+    query = (
+        select(
+            ArticleModel.id.label("article_id"),
+            ArticleModel.sku,
+            ArticleModel.designation,
+            func.coalesce(totaux.c.quantite_totale, 0).label("quantite_totale"),
+            func.coalesce(totaux.c.nb_emplacements, 0).label("nb_emplacements"),
+        )
+        .outerjoin(totaux, totaux.c.article_id == ArticleModel.id)
+        .order_by(ArticleModel.sku)
+    )
+    if article_id is not None:
+        query = query.where(ArticleModel.id == article_id)
+    return db.execute(query.offset(skip).limit(limit)).mappings().all()
+
+def get_stock_for_article(db: Session, article_id: str):
+    rows = list_stock_by_article(db, limit=1, article_id=article_id)
+    return rows[0] if rows else None
+
+def list_stock_by_emplacement(db: Session, skip: int = 0, limit: int = 100,
+                              type: Optional[TypeEmplacement] = None):
+    """Total quantity and number of distinct articles per location."""
+    totaux = select(
+        ImplantationModel.emplacement_id,
+        func.sum(ImplantationModel.quantite).label("quantite_totale"),
+        func.count(ImplantationModel.article_id.distinct()).label("nb_articles"),
+    ).group_by(ImplantationModel.emplacement_id).subquery()
+    query = (
+        select(
+            EmplacementModel.id.label("emplacement_id"),
+            EmplacementModel.code,
+            EmplacementModel.type,
+            func.coalesce(totaux.c.quantite_totale, 0).label("quantite_totale"),
+            func.coalesce(totaux.c.nb_articles, 0).label("nb_articles"),
+        )
+        .outerjoin(totaux, totaux.c.emplacement_id == EmplacementModel.id)
+        .order_by(EmplacementModel.code)
+    )
+    if type is not None:
+        query = query.where(EmplacementModel.type == type)
+    return db.execute(query.offset(skip).limit(limit)).mappings().all()
+
+def list_below_threshold(db: Session, skip: int = 0, limit: int = 100, article_id: Optional[str] = None,
+                         emplacement_id: Optional[str] = None):
+    """Implantations whose quantity is below their minimum, largest shortfall first."""
+    manque = (ImplantationModel.seuil_minimum - ImplantationModel.quantite).label("manque")
+    query = (
+        select(
+            ImplantationModel.id.label("implantation_id"),
+            ImplantationModel.article_id,
+            ArticleModel.sku,
+            ImplantationModel.emplacement_id,
+            EmplacementModel.code,
+            ImplantationModel.quantite,
+            ImplantationModel.seuil_minimum,
+            manque,
+        )
+        .join(ArticleModel, ArticleModel.id == ImplantationModel.article_id)
+        .join(EmplacementModel, EmplacementModel.id == ImplantationModel.emplacement_id)
+        .where(ImplantationModel.quantite < ImplantationModel.seuil_minimum)
+        .order_by(manque.desc(), ImplantationModel.id)
+    )
+    if article_id is not None:
+        query = query.where(ImplantationModel.article_id == article_id)
+    if emplacement_id is not None:
+        query = query.where(ImplantationModel.emplacement_id == emplacement_id)
+    return db.execute(query.offset(skip).limit(limit)).mappings().all()
@@ -0,0 +1,224 @@
+"""Wave planning: groups reserved commandes into waves picked along one route.
+
+Open commandes (RESERVEE, not in a wave yet, with no picking mission) and their
+lines are read in one query, then grouped by a strategy built on dict and heap lookups rather than
+pairwise comparisons:
+
+- ARTICLES: a wave grows from its largest commande by adding the commande that
+  shares the most articles with it, found through an article -> commandes
+  index and a heap of overlap scores;
+- ZONE: commandes are keyed on the zone (``Emplacement.type``) holding most of
+  their articles, then cut into waves;
+- TAILLE: commandes are sorted by number of lines, then cut into waves.
+
+Inside a wave, the lines of an article are merged into a single pick per
+location. Reserved lines are picked where their allocations hold the stock;
+other sources and the route come from the picking service, against one stock
+shared by all the waves of a run. The missions of a wave carry its id as
+``tournee_id``; its commandes move to PREPAREE, as with prepare_commandes.
+"""
+import heapq
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from uuid import uuid4
+
+from sqlalchemy import bindparam, exists, insert, select, update
+from sqlalchemy.orm import Session, aliased
+
+from app.models import (Allocation as AllocationModel, Commande as CommandeModel, LigneCommande as LigneModel, Mission as MissionModel,
+                        Vague as VagueModel)
+from app.models.commande import EtatCommande
+from app.models.mission import EtatMission, TypeMission
+from app.models.vague import StrategieVague
+from app.services.picking import (Stock, allocate_sources, available_sources, link_allocations, merge_picks,
+                                  order_picks, reserved_picks, reserved_stock)
+
+MAX_COMMANDES = 50
+MAX_LIGNES = 500
+
+Commandes = Dict[str, Dict[str, int]]
+
+def get_vague(db: Session, vague_id: str):
+    return db.query(VagueModel).filter(VagueModel.id == vague_id).first()
+
+def list_wave_missions(db: Session, vague_id: str):
+    """Missions of a wave in route order."""
+    return db.query(MissionModel).filter(MissionModel.tournee_id == vague_id).order_by(MissionModel.ordre).all()
+
+def _open_commandes(db: Session) -> Commandes:
+    """Quantity per article of every reserved commande not in a wave yet and not being picked."""
+    autre = aliased(LigneModel)
+    en_preparation = exists().where(
+        autre.commande_id == CommandeModel.id,
+        AllocationModel.ligne_id == autre.id,
+        AllocationModel.mission_id.is_not(None),
+    )
+    rows = db.execute(
+        select(LigneModel.commande_id, LigneModel.article_id, LigneModel.quantite)
+        .join(CommandeModel, CommandeModel.id == LigneModel.commande_id)
+        .where(CommandeModel.etat == EtatCommande.RESERVEE, CommandeModel.vague_id.is_(None), ~en_preparation)
+        .order_by(LigneModel.commande_id)
+    )
+    commandes: Commandes = defaultdict(dict)
+    for commande_id, article_id, quantite in rows:
+        lignes = commandes[commande_id]
+        lignes[article_id] = lignes.get(article_id, 0) + quantite
+    return commandes
+
+def _cut(ordre: List[str], commandes: Commandes, max_commandes: int, max_lignes: int) -> List[List[str]]:
+    """Consecutive waves of ``ordre`` within the commande and line limits."""
+    vagues, vague, lignes = [], [], 0
+    for commande_id in ordre:
+        taille = len(commandes[commande_id])
+        if vague and (len(vague) >= max_commandes or lignes + taille > max_lignes):
+            vagues.append(vague)
+            vague, lignes = [], 0
+        vague.append(commande_id)
+        lignes += taille
+    if vague:
+        vagues.append(vague)
+    return vagues
+
+def group_by_articles(commandes: Commandes, max_commandes: int = MAX_COMMANDES,
+                      max_lignes: int = MAX_LIGNES) -> List[List[str]]:
+    """Waves of commandes sharing the most articles."""
+    index = defaultdict(list)
+    for commande_id, lignes in commandes.items():
+        for article_id in lignes:
+            index[article_id].append(commande_id)
+    graines = sorted(commandes, key=lambda c: (-len(commandes[c]), c))
+    restantes = set(commandes)
+    vagues, debut = [], 0
+
+    while restantes:
+        while graines[debut] not in restantes:
+            debut += 1
+        vague, articles, scores, tas = [], set(), {}, []
+        lignes = 0
+
+        def ajouter(commande_id):
+            nonlocal lignes
+            vague.append(commande_id)
+            restantes.discard(commande_id)
+            lignes += len(commandes[commande_id])
+            for article_id in commandes[commande_id]:
+                if article_id not in articles:
+                    articles.add(article_id)
+                    for autre in index[article_id]:
+                        if autre in restantes:
+                            scores[autre] = scores.get(autre, 0) + 1
+                            heapq.heappush(tas, (-scores[autre], autre))
+
+        ajouter(graines[debut])
+        remplissage = debut
+        while len(vague) < max_commandes:
+            candidat = None
+            while tas:
+                score, autre = heapq.heappop(tas)
+                if autre in restantes and -score == scores[autre] and lignes + len(commandes[autre]) <= max_lignes:
+                    candidat = autre
+                    break
+            # No overlap left: fill with the largest commande that still fits
+            while candidat is None and remplissage < len(graines):
+                autre = graines[remplissage]
+                remplissage += 1
+                if autre in restantes and lignes + len(commandes[autre]) <= max_lignes:
+                    candidat = autre
+            if candidat is None:
+                break
+            ajouter(candidat)
+        vagues.append(vague)
+    return vagues
+
+def group_by_zone(commandes: Commandes, zone: Callable[[str], Optional[str]],
+                  max_commandes: int = MAX_COMMANDES, max_lignes: int = MAX_LIGNES) -> List[List[str]]:
+    """Waves of commandes whose articles are mostly stored in the same zone."""
+    par_zone = defaultdict(list)
+    for commande_id, lignes in commandes.items():
+        zones = Counter(zone(article_id) for article_id in lignes)
+        principale = min(zones.items(), key=lambda item: (-item[1], item[0] is None, item[0] or ""))[0]
+        par_zone[principale.name if principale else ""].append(commande_id)
+    return [vague for cle in sorted(par_zone)
+            for vague in _cut(sorted(par_zone[cle]), commandes, max_commandes, max_lignes)]
+
+def group_by_size(commandes: Commandes, max_commandes: int = MAX_COMMANDES,
+                  max_lignes: int = MAX_LIGNES) -> List[List[str]]:
+    """Waves of commandes of similar size, smallest first."""
+    ordre = sorted(commandes, key=lambda c: (len(commandes[c]), sum(commandes[c].values()), c))
+    return _cut(ordre, commandes, max_commandes, max_lignes)
+
+def plan_waves(db: Session, strategie: StrategieVague = StrategieVague.ARTICLES,
+               max_commandes: int = MAX_COMMANDES, max_lignes: int = MAX_LIGNES,
+               destination_id: Optional[str] = None, simulation: bool = False) -> List[Dict]:
+    """Group the open reserved commandes into waves and create their consolidated missions."""
+    if max_commandes < 1 or max_lignes < 1:
+        raise ValueError("Wave limits must be positive")
+    commandes = _open_commandes(db)
+    if not commandes:
+        return []
+    stock = Stock(available_sources(db, {article_id for lignes in commandes.values() for article_id in lignes}))
+    strategie = StrategieVague(strategie)
+    if strategie == StrategieVague.ZONE:
+        groupes = group_by_zone(commandes, stock.zone, max_commandes, max_lignes)
+    elif strategie == StrategieVague.TAILLE:
+        groupes = group_by_size(commandes, max_commandes, max_lignes)
+    else:
+        groupes = group_by_articles(commandes, max_commandes, max_lignes)
+    reservees = defaultdict(list)
+    for reservee in reserved_stock(db, commandes):
+        reservees[reservee.commande_id].append(reservee)
+
+    maintenant = datetime.utcnow()
+    vagues, missions, rattachements, liens = [], [], [], []
+    for groupe in groupes:
+        vague_id = str(uuid4())
+        quantites, picks = Counter(), []
+        for commande_id in groupe:
+            quantites.update(commandes[commande_id])
+            picks.extend(reserved_picks(reservees[commande_id], stock)[0])
+            for reservee in reservees[commande_id]:
+                quantites[reservee.article_id] -= reservee.quantite
+        libres, manques = allocate_sources([(a, a, q) for a, q in sorted(quantites.items()) if q > 0], stock)
+        ordonnes, longueur = order_picks(merge_picks(picks + libres), stock.positions)
+        for rang, (_, article_id, source_id, quantite, allocation_ids) in enumerate(ordonnes, start=1):
+            mission_id = str(uuid4())
+            missions.append({
+                "id": mission_id, "type": TypeMission.PREPARATION, "etat": EtatMission.A_FAIRE,
+                "article_id": article_id, "source_id": source_id, "destination_id": destination_id,
+                "quantite": quantite, "agent_id": None, "date_creation": maintenant, "date_execution": None,
+                "tournee_id": vague_id, "ordre": rang,
+            })
+            liens.extend({"allocation": allocation_id, "mission": mission_id} for allocation_id in allocation_ids)
+        rattachements.extend({"commande": commande_id, "vague": vague_id} for commande_id in groupe)
+        vagues.append({
+            "vague_id": vague_id,
+            "strategie": strategie,
+            "commande_ids": groupe,
+            "nb_lignes": sum(len(commandes[commande_id]) for commande_id in groupe),
+            "nb_missions": len(ordonnes),
+            "distance": longueur,
+            "articles_non_servis": [{"article_id": article_id, "manque": manque} for _, article_id, manque in manques],
+        })
+
+    if not simulation:
+        db.execute(insert(VagueModel), [
+            {"id": vague["vague_id"], "strategie": strategie, "date_creation": maintenant} for vague in vagues
+        ])
+        table = CommandeModel.__table__
+        result = db.execute(
+            update(table)
+            .where(table.c.id == bindparam("commande"))
+            .where(table.c.vague_id.is_(None))
+            .where(table.c.etat == EtatCommande.RESERVEE)
+            .values(vague_id=bindparam("vague"), etat=EtatCommande.PREPAREE),
+            rattachements,
+        )
+        if result.rowcount != len(rattachements):
+            db.rollback()
+            raise ValueError("Commandes changed while the waves were planned, nothing was created")
+        if missions:
+            db.execute(insert(MissionModel), missions)
+        link_allocations(db, liens)
+        db.commit()
+    return vagues
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Compare query plans and timings of the hot lookups with and without the
+secondary indexes declared on the models.
+
+Usage: python scripts/benchmark_indexes.py [rows]
+"""
+import os
+import random
+import sys
+import time as clock
+from datetime import date, datetime, time, timedelta
+from uuid import uuid4
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, insert, text
+
+from app.database.database import Base
+from app.models import (
+    Agent, Article, Commande, Emplacement, Implantation, LigneCommande, Mission, Reception, Reservation, Salle
+)
+
+QUERIES = {
+    "reservations d'une salle/jour": "SELECT id, heure, duree_minutes FROM reservations WHERE salle_id = :salle_id AND date = :jour",
+    "lignes d'une commande": "SELECT * FROM lignes_commandes WHERE commande_id = :commande_id",
+    "stock d'un article": "SELECT emplacement_id, quantite FROM implantations WHERE article_id = :article_id",
+    "implantations d'un emplacement": "SELECT * FROM implantations WHERE emplacement_id = :emplacement_id",
+    "missions d'un agent": "SELECT * FROM missions WHERE agent_id = :agent_id",
+    "missions à faire par type": "SELECT id FROM missions WHERE etat = 'A_FAIRE' AND type = 'REAPPRO'",
+    "réceptions d'un article": "SELECT * FROM receptions WHERE article_id = :article_id",
+}
+
+
+def populate(connection, rows: int):
+    rng = random.Random(42)
+    ids = lambda n: [str(uuid4()) for _ in range(n)]
+    articles, emplacements, agents = ids(max(rows // 100, 1)), ids(max(rows // 50, 1)), ids(20)
+    salles, commandes = ids(50), ids(max(rows // 10, 1))
+
+    connection.execute(insert(Article), [
+        {"id": a, "sku": f"SKU{i}", "designation": f"Article {i}", "categorie": "PRODUIT",
+         "poids_kg": 1.0, "volume_m3": 0.1} for i, a in enumerate(articles)
+    ])
+    connection.execute(insert(Emplacement), [
+        {"id": e, "code": f"A{i:05d}", "type": "STOCKAGE", "capacite_poids_kg": 1000.0, "capacite_volume_m3": 10.0}
+        for i, e in enumerate(emplacements)
+    ])
+    connection.execute(insert(Agent), [{"id": a, "nom": f"Agent {i}", "email": f"agent{i}@example.com"}
+                                       for i, a in enumerate(agents)])
+    connection.execute(insert(Salle), [{"id": s, "nom": f"Salle {i}", "capacite": 10, "localisation": "RDC"}
+                                       for i, s in enumerate(salles)])
+    connection.execute(insert(Commande), [{"id": c, "reference": f"CMD{i}", "etat": "BROUILLON"}
+                                          for i, c in enumerate(commandes)])
+    connection.execute(insert(LigneCommande), [
+        {"id": str(uuid4()), "commande_id": rng.choice(commandes), "article_id": rng.choice(articles), "quantite": 1}
+        for _ in range(rows)
+    ])
+    connection.execute(insert(Implantation), [
+        {"id": str(uuid4()), "article_id": rng.choice(articles), "emplacement_id": rng.choice(emplacements),
+         "quantite": rng.randint(0, 100), "seuil_minimum": 10} for _ in range(rows)
+    ])
+    connection.execute(insert(Mission), [
+        {"id": str(uuid4()), "type": rng.choice(["REAPPRO", "PREPARATION", "DEPLACEMENT"]),
+         "etat": rng.choice(["A_FAIRE", "EN_COURS", "TERMINE"]), "article_id": rng.choice(articles),
+         "quantite": 1, "agent_id": rng.choice(agents), "date_creation": datetime(2025, 1, 1)} for _ in range(rows)
+    ])
+    connection.execute(insert(Reception), [
+        {"id": str(uuid4()), "article_id": rng.choice(articles), "quantite": 1, "fournisseur": "F",
+         "emplacement_id": rng.choice(emplacements), "date_reception": datetime(2025, 1, 1)} for _ in range(rows)
+    ])
+    slots = {(rng.choice(salles), date(2025, 1, 1) + timedelta(days=rng.randrange(365)), time(rng.randrange(8, 20)))
+             for _ in range(rows)}
+    connection.execute(insert(Reservation), [
+        {"id": str(uuid4()), "salle_id": s, "date": d, "heure": h, "utilisateur": "user@example.com"}
+        for s, d, h in slots
+    ])
+    return {
+        "salle_id": salles[0], "jour": date(2025, 6, 1), "commande_id": commandes[0],
+        "article_id": articles[0], "emplacement_id": emplacements[0], "agent_id": agents[0],
+    }
+
+
+def measure(connection, params, repeat: int = 50):
+    results = {}
+    for label, sql in QUERIES.items():
+        plan = connection.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params).fetchall()
+        start = clock.perf_counter()
+        for _ in range(repeat):
+            connection.execute(text(sql), params).fetchall()
+        elapsed = (clock.perf_counter() - start) / repeat * 1000
+        results[label] = (" | ".join(row[-1] for row in plan), elapsed)
+    return results
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+
+    indexes = [index for table in Base.metadata.sorted_tables for index in table.indexes]
+    with engine.begin() as connection:
+        for index in indexes:
+            index.drop(connection)
+        params = populate(connection, rows)
+        connection.execute(text("ANALYZE"))
+
+    with engine.connect() as connection:
+        before = measure(connection, params)
+    with engine.begin() as connection:
+        for index in indexes:
+            index.create(connection)
+        connection.execute(text("ANALYZE"))
+    with engine.connect() as connection:
+        after = measure(connection, params)
+
+    print(f"{rows} lignes par table\n")
+    for label in QUERIES:
+        (plan_before, ms_before), (plan_after, ms_after) = before[label], after[label]
+        print(label)
+        print(f"  avant : {ms_before:8.3f} ms  {plan_before}")
+        print(f"  après : {ms_after:8.3f} ms  {plan_after}")
+
+
+if __name__ == "__main__":
+    main()
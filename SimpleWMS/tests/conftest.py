@@ -1,11 +1,14 @@
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
 from app.main import app
 from app.database.database import Base, get_db
+from app.services.availability import index as availability_index
+from app.services.cache import cache
+from app.services.putaway import capacity_index
 
 # Create test database
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -14,7 +17,7 @@ engine = create_engine(
     connect_args={"check_same_thread": False},
     poolclass=StaticPool,
 )
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 def override_get_db():
     try:
@@ -42,9 +45,43 @@ def db_session(db_engine):
     connection.close()
 
 @pytest.fixture
-def client():
+def query_counter(db_engine):
+    """Collect the SQL statements sent to the test database."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db_engine, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    event.remove(db_engine, "before_cursor_execute", before_cursor_execute)
+
+@pytest.fixture(autouse=True)
+def reset_availability_index():
+    availability_index.clear()
+    yield
+    availability_index.clear()
+
+@pytest.fixture(autouse=True)
+def reset_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+@pytest.fixture(autouse=True)
+def reset_capacity_index():
+    capacity_index.clear()
+    yield
+    capacity_index.clear()
+
+@pytest.fixture
+def client(db_engine):
     with TestClient(app) as test_client:
         yield test_client
+    # API calls commit for real: empty the tables so each test starts clean
+    with db_engine.begin() as connection:
+        for table in reversed(Base.metadata.sorted_tables):
+            connection.execute(table.delete())
 
 @pytest.fixture
 def sample_salle():
@@ -55,6 +92,16 @@ def sample_salle():
         "disponible": True
     }
 
+@pytest.fixture
+def sample_article():
+    return {
+        "sku": "SKU-0001",
+        "designation": "Vis à bois 4x40",
+        "categorie": "Pièce détachée",
+        "poids_kg": 0.01,
+        "volume_m3": 0.0001
+    }
+
 @pytest.fixture
 def sample_reservation():
     return {
@@ -0,0 +1,192 @@
+from uuid import uuid4
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func, insert, select
+from app.models import Allocation, Article, Commande, Emplacement, Implantation, LigneCommande
+from app.models.article import CategorieArticle
+from app.models.commande import EtatCommande
+from app.models.emplacement import TypeEmplacement
+from app.services.allocation import _hold
+
+@pytest.fixture
+def stock(client: TestClient, sample_article):
+    """An article held 6 on A-01 and 4 on B-02, and a draft commande of 8"""
+    article = client.post("/articles/", json=sample_article).json()["id"]
+    implantations = {}
+    for code, quantite in (("A-01", 6), ("B-02", 4)):
+        emplacement = client.post("/emplacements/", json={
+            "code": code, "type": "Zone de stockage", "capacite_poids_kg": 500, "capacite_volume_m3": 2
+        }).json()["id"]
+        implantations[code] = client.post("/implantations/", json={
+            "article_id": article, "emplacement_id": emplacement, "quantite": quantite, "seuil_minimum": 0
+        }).json()["id"]
+    commande = client.post("/commandes/", json={
+        "reference": "CMD-1", "etat": "Brouillon", "lignes": [{"article_id": article, "quantite": 8}]
+    }).json()["id"]
+    return article, implantations, commande
+
+def _commande(client: TestClient, article: str, reference: str, quantite: int) -> str:
+    return client.post("/commandes/", json={
+        "reference": reference, "etat": "Brouillon", "lignes": [{"article_id": article, "quantite": quantite}]
+    }).json()["id"]
+
+def _reservee(client: TestClient, implantation_id: str) -> int:
+    return client.get(f"/implantations/{implantation_id}").json()["quantite_reservee"]
+
+def test_reserve_holds_stock(client: TestClient, stock):
+    """Test that a reservation holds the stock and moves the commande to Réservée"""
+    article, implantations, commande = stock
+    response = client.post(f"/commandes/{commande}/reservation")
+    assert response.status_code == 200
+    rapport = response.json()
+    assert rapport["reservee"] and rapport["manques"] == []
+    assert sorted(a["quantite"] for a in rapport["allocations"]) == [2, 6]
+    assert (_reservee(client, implantations["A-01"]), _reservee(client, implantations["B-02"])) == (6, 2)
+    assert client.get(f"/commandes/{commande}").json()["etat"] == "Réservée"
+
+    # Reserving twice is refused, unknown commandes are 404
+    assert client.post(f"/commandes/{commande}/reservation").status_code == 400
+    assert client.post("/commandes/inconnue/reservation").status_code == 404
+
+def test_shortfall_rolls_back(client: TestClient, stock):
+    """Test that a commande short of stock reserves nothing, unless partial reservation is asked"""
+    article, implantations, commande = stock
+    client.post(f"/commandes/{commande}/reservation")
+    autre = _commande(client, article, "CMD-2", 5)
+
+    rapport = client.post(f"/commandes/{autre}/reservation").json()
+    assert not rapport["reservee"] and rapport["allocations"] == []
+    assert [(m["article_id"], m["manque"]) for m in rapport["manques"]] == [(article, 3)]
+    assert client.get(f"/commandes/{autre}").json()["etat"] == "Brouillon"
+    assert _reservee(client, implantations["B-02"]) == 2
+
+    rapport = client.post(f"/commandes/{autre}/reservation", params={"partiel": True}).json()
+    assert rapport["reservee"] and [m["manque"] for m in rapport["manques"]] == [3]
+    assert [(a["implantation_id"], a["quantite"]) for a in rapport["allocations"]] == [(implantations["B-02"], 2)]
+    assert _reservee(client, implantations["B-02"]) == 4
+
+def test_release_gives_stock_back(client: TestClient, stock):
+    """Test that releasing a reservation, directly or through a state change, frees the stock"""
+    article, implantations, commande = stock
+    client.post(f"/commandes/{commande}/reservation")
+    response = client.delete(f"/commandes/{commande}/reservation")
+    assert response.status_code == 200 and response.json()["etat"] == "Brouillon"
+    assert _reservee(client, implantations["A-01"]) == 0 and _reservee(client, implantations["B-02"]) == 0
+    assert client.delete(f"/commandes/{commande}/reservation").status_code == 400
+
+    assert client.put(f"/commandes/{commande}", json={"reference": "CMD-1", "etat": "Réservée"}).status_code == 200
+    assert _reservee(client, implantations["A-01"]) == 6
+    response = client.put(f"/commandes/{commande}", json={"reference": "CMD-1", "etat": "Annulée"})
+    assert response.status_code == 200 and response.json()["etat"] == "Annulée"
+    assert _reservee(client, implantations["A-01"]) == 0
+
+def test_update_to_reserved_without_stock(client: TestClient, stock):
+    """Test that confirming a commande short of stock is refused and leaves it unchanged"""
+    article, _, _ = stock
+    commande = _commande(client, article, "CMD-2", 11)
+    response = client.put(f"/commandes/{commande}", json={"reference": "CMD-2", "etat": "Réservée"})
+    assert response.status_code == 400
+    assert "Insufficient stock" in response.json()["detail"]
+    assert client.get(f"/commandes/{commande}").json()["etat"] == "Brouillon"
+
+def test_preparation_picks_reserved_stock(client: TestClient, db_engine, stock):
+    """Test that preparation picks where the stock was reserved, and other commandes cannot take it"""
+    article, implantations, commande = stock
+    client.post(f"/commandes/{commande}/reservation")
+    emplacements = {code: client.get(f"/implantations/{i}").json()["emplacement_id"] for code, i in implantations.items()}
+
+    tournee = client.post("/commandes/preparation", json={"commande_ids": [commande]}).json()
+    assert sorted((m["source_id"], m["quantite"]) for m in tournee["missions"]) == sorted(
+        [(emplacements["A-01"], 6), (emplacements["B-02"], 2)])
+    assert tournee["lignes_non_servies"] == []
+    # Allocations already picked are not picked again
+    assert client.post("/commandes/preparation", json={"commande_ids": [commande]}).json()["missions"] == []
+
+    # A commande confirmed before reservations existed only gets what is left
+    autre = str(uuid4())
+    with db_engine.begin() as connection:
+        connection.execute(insert(Commande), [{"id": autre, "reference": "CMD-2", "etat": EtatCommande.RESERVEE}])
+        connection.execute(insert(LigneCommande), [{"id": str(uuid4()), "commande_id": autre,
+                                                    "article_id": article, "quantite": 5}])
+    tournee = client.post("/commandes/preparation", json={"commande_ids": [autre]}).json()
+    assert [(m["source_id"], m["quantite"]) for m in tournee["missions"]] == [(emplacements["B-02"], 2)]
+    assert [l["manque"] for l in tournee["lignes_non_servies"]] == [3]
+
+def test_every_exit_releases(client: TestClient, db_engine, stock):
+    """Test that leaving Réservée or Préparée any way but to Préparée gives the stock back, once"""
+    article, implantations, commande = stock
+    client.post(f"/commandes/{commande}/reservation")
+    for etat in ("Préparée", "Annulée", "Brouillon", "Réservée", "Préparée", "Brouillon", "Réservée"):
+        response = client.put(f"/commandes/{commande}", json={"reference": "CMD-1", "etat": etat})
+        assert response.status_code == 200 and response.json()["etat"] == etat
+        held = 0 if etat in ("Annulée", "Brouillon") else 6
+        assert _reservee(client, implantations["A-01"]) == held
+    assert _reservee(client, implantations["B-02"]) == 2
+
+    # Deleting a reserved commande gives its stock back and leaves no allocation behind
+    assert client.delete(f"/commandes/{commande}").status_code == 200
+    assert (_reservee(client, implantations["A-01"]), _reservee(client, implantations["B-02"])) == (0, 0)
+    with db_engine.connect() as connection:
+        assert connection.execute(select(func.count()).select_from(Allocation)).scalar() == 0
+
+def test_create_reserved(client: TestClient, stock):
+    """Test that a commande created as Réservée holds its stock, or is not created at all"""
+    article, implantations, _ = stock
+    response = client.post("/commandes/", json={
+        "reference": "CMD-2", "etat": "Réservée", "lignes": [{"article_id": article, "quantite": 3}]
+    })
+    assert response.status_code == 200 and response.json()["etat"] == "Réservée"
+    assert _reservee(client, implantations["A-01"]) == 3
+
+    response = client.post("/commandes/", json={
+        "reference": "CMD-3", "etat": "Réservée", "lignes": [{"article_id": article, "quantite": 8}]
+    })
+    assert response.status_code == 400 and "Insufficient stock" in response.json()["detail"]
+    assert sorted(c["reference"] for c in client.get("/commandes/").json()) == ["CMD-1", "CMD-2"]
+    assert _reservee(client, implantations["A-01"]) + _reservee(client, implantations["B-02"]) == 3
+
+    # The bulk import never reserves: reserved items are rejected
+    resultats = client.post("/commandes/bulk", json=[
+        {"reference": "CMD-4", "etat": "Réservée", "lignes": [{"article_id": article, "quantite": 1}]},
+        {"reference": "CMD-5", "etat": "Brouillon", "lignes": [{"article_id": article, "quantite": 1}]},
+    ]).json()
+    assert [r["status"] for r in resultats] == ["rejected", "created"]
+    assert resultats[0]["detail"] == "Bulk import cannot create reserved commandes"
+
+def test_reserved_implantation_stays_put(client: TestClient, stock):
+    """Test that an implantation holding reservations cannot move, nor drop below what is reserved"""
+    article, implantations, commande = stock
+    client.post(f"/commandes/{commande}/reservation")
+    implantation = client.get(f"/implantations/{implantations['B-02']}").json()
+    autre = client.get(f"/implantations/{implantations['A-01']}").json()["emplacement_id"]
+    donnees = {k: implantation[k] for k in ("article_id", "emplacement_id", "quantite", "seuil_minimum")}
+
+    response = client.put(f"/implantations/{implantation['id']}", json=dict(donnees, emplacement_id=autre))
+    assert response.status_code == 400 and "reserved" in response.json()["detail"]
+    response = client.put(f"/implantations/{implantation['id']}", json=dict(donnees, quantite=1))
+    assert response.status_code == 400
+    response = client.put(f"/implantations/{implantation['id']}", json=dict(donnees, quantite=2, seuil_minimum=1))
+    assert response.status_code == 200 and (response.json()["quantite"], response.json()["quantite_reservee"]) == (2, 2)
+    response = client.delete(f"/implantations/{implantation['id']}")
+    assert response.status_code == 400 and "reserved" in response.json()["detail"]
+    assert client.get(f"/implantations/{implantation['id']}").status_code == 200
+
+    # Once the commande lets go of its reservation, the implantation can go
+    assert client.delete(f"/commandes/{commande}/reservation").status_code == 200
+    assert client.delete(f"/implantations/{implantation['id']}").status_code == 200
+    assert client.get(f"/implantations/{implantation['id']}").status_code == 404
+
+def test_hold_never_oversells(db_session):
+    """Test that the guarded increment refuses what another reservation already took"""
+    article, emplacement, implantation = str(uuid4()), str(uuid4()), str(uuid4())
+    db_session.execute(insert(Article), [{"id": article, "sku": "SKU-1", "designation": "Carton",
+                                          "categorie": CategorieArticle.PRODUIT, "poids_kg": 1, "volume_m3": 0.01}])
+    db_session.execute(insert(Emplacement), [{"id": emplacement, "code": "A-01", "type": TypeEmplacement.STOCKAGE,
+                                              "capacite_poids_kg": 500, "capacite_volume_m3": 2}])
+    db_session.execute(insert(Implantation), [{"id": implantation, "article_id": article, "emplacement_id": emplacement,
+                                               "quantite": 5, "seuil_minimum": 0}])
+    # Two confirmations that both read 5 available: the second one loses its guard
+    assert _hold(db_session, implantation, 4)
+    assert not _hold(db_session, implantation, 2)
+    assert _hold(db_session, implantation, 1)
+    assert db_session.get(Implantation, implantation).quantite_reservee == 5
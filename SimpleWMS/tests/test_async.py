@@ -0,0 +1,131 @@
+import asyncio
+import pytest
+from datetime import date, datetime, time
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+pytest.importorskip("aiosqlite")
+
+from app.database.async_database import build_async_engine, get_async_db
+from app.database.config import DatabaseSettings
+from app.database.database import Base
+from app.routers import aio
+from app.schemas.commande import CommandeCreate, LigneCommandeCreate
+from app.schemas.mission import MissionCreate, MissionUpdate
+from app.schemas.reservation import ReservationCreate
+from app.schemas.salle import SalleCreate
+from app.services.aio import commande as commande_service
+from app.services.aio import mission as mission_service
+from app.services.aio import reservation as reservation_service
+from app.services.aio import salle as salle_service
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+@pytest.fixture
+def async_sessionmaker_factory(tmp_path):
+    settings = DatabaseSettings.from_env({"DATABASE_URL": f"sqlite:///{tmp_path / 'async.db'}"})
+    engine = build_async_engine(settings)
+
+    async def create_schema():
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create_schema())
+    yield async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    asyncio.run(engine.dispose())
+
+def test_async_reservation_services(async_sessionmaker_factory):
+    """Test salle and reservation services on an AsyncSession"""
+    async def scenario():
+        async with async_sessionmaker_factory() as db:
+            salle = await salle_service.create_salle(db, SalleCreate(nom="Salle", capacite=8, localisation="RDC"))
+            reservation = ReservationCreate(
+                salle_id=salle.id, date=date(2025, 1, 15), heure=time(14, 0), utilisateur="user@example.com"
+            )
+            await reservation_service.create_reservation(db, reservation)
+            assert await reservation_service.check_availability(db, salle.id, date(2025, 1, 15), time(14, 30), 30) is False
+            with pytest.raises(ValueError, match="Cette salle est déjà réservée à ce créneau"):
+                await reservation_service.create_reservation(db, reservation)
+            assert len(await reservation_service.list_reservations(db)) == 1
+
+    asyncio.run(scenario())
+
+def test_async_commande_loads_lignes(async_sessionmaker_factory):
+    """Test that commandes come back with their lignes without lazy loading"""
+    async def scenario():
+        async with async_sessionmaker_factory() as db:
+            created = await commande_service.create_commande(db, CommandeCreate(
+                reference="CMD-1", etat="Brouillon",
+                lignes=[LigneCommandeCreate(article_id="a1", quantite=2), LigneCommandeCreate(article_id="a2", quantite=1)]
+            ))
+            assert len(created.lignes) == 2
+        async with async_sessionmaker_factory() as db:
+            commandes = await commande_service.list_commandes(db)
+            assert [len(c.lignes) for c in commandes] == [2]
+
+    asyncio.run(scenario())
+
+def test_async_routers(async_sessionmaker_factory, sample_salle, sample_reservation):
+    """Test the async routers end to end"""
+    async def override_get_async_db():
+        async with async_sessionmaker_factory() as db:
+            yield db
+
+    app = FastAPI()
+    for router in aio.routers:
+        app.include_router(router)
+    app.dependency_overrides[get_async_db] = override_get_async_db
+
+    with TestClient(app) as client:
+        salle_id = client.post("/salles/", json=sample_salle).json()["id"]
+        assert client.get(f"/salles/{salle_id}").json()["nom"] == sample_salle["nom"]
+
+        reservation_data = dict(sample_reservation, salle_id=salle_id)
+        assert client.post("/reservations/", json=reservation_data).status_code == 200
+        conflict = client.post("/reservations/", json=reservation_data)
+        assert conflict.status_code == 400
+
+        response = client.get("/salles/recherche", params={"date_debut": sample_reservation["date"], "limit": 1})
+        assert response.status_code == 200
+        assert response.json()[0]["salle"]["id"] == salle_id
+
+        page = client.get("/reservations/page", params={"limit": 1}).json()
+        assert len(page["items"]) == 1 and page["next_cursor"] is None
+
+        export = client.get("/reservations/export", params={"format": "csv", "salle_id": salle_id})
+        assert export.status_code == 200
+        assert export.text.splitlines()[0].startswith("id,salle_id,date,heure")
+        assert len(export.text.splitlines()) == 2
+
+def test_async_commande_reserved_on_creation(async_sessionmaker_factory):
+    """Test that an async commande created as Réservée goes through the reservation"""
+    async def scenario():
+        async with async_sessionmaker_factory() as db:
+            with pytest.raises(ValueError, match="Insufficient stock"):
+                await commande_service.create_commande(db, CommandeCreate(
+                    reference="CMD-1", etat="Réservée", lignes=[LigneCommandeCreate(article_id="a1", quantite=2)]
+                ))
+            assert await commande_service.get_commande_by_reference(db, "CMD-1") is None
+            created = await commande_service.create_commande(db, CommandeCreate(reference="CMD-2", etat="Réservée", lignes=[]))
+            assert created.etat == "Réservée" and created.lignes == []
+            assert (await commande_service.delete_commande(db, created.id)).id == created.id
+
+    asyncio.run(scenario())
+
+def test_async_mission_update(async_sessionmaker_factory):
+    """Test that a PUT on an AsyncSession runs the state machine and writes the fields together"""
+    async def scenario():
+        async with async_sessionmaker_factory() as db:
+            donnees = dict(type="Déplacement", etat="À faire", article_id="a1", source_id=None, destination_id=None,
+                           quantite=4, agent_id=None, date_creation=datetime(2026, 3, 1))
+            mission = await mission_service.create_mission(db, MissionCreate(**donnees))
+            mise_a_jour = await mission_service.update_mission(db, mission.id, MissionUpdate(
+                **dict(donnees, etat="En cours", quantite=5)))
+            assert (mise_a_jour.etat, mise_a_jour.quantite) == ("En cours", 5)
+            terminee = await mission_service.update_mission(db, mission.id, MissionUpdate(
+                **dict(donnees, etat="Terminé", quantite=5)))
+            assert terminee.etat == "Terminé" and terminee.date_execution is not None
+            with pytest.raises(ValueError, match="A completed mission cannot change"):
+                await mission_service.update_mission(db, mission.id, MissionUpdate(
+                    **dict(donnees, etat="Terminé", quantite=6)))
+
+    asyncio.run(scenario())
@@ -0,0 +1,111 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+from typing import List
+from app.models import Mission
+from app.schemas.article import ArticleRead
+from app.schemas.mission import MissionRead
+from app.services.loading import loader_options
+
+def create_commandes(client: TestClient, article_id: str, count: int):
+    for i in range(count):
+        response = client.post("/commandes/", json={
+            "reference": f"CMD-{i:04d}",
+            "etat": "Brouillon",
+            "lignes": [{"article_id": article_id, "quantite": 1}, {"article_id": article_id, "quantite": 2}]
+        })
+        assert response.status_code == 200
+
+def test_create_commande(client: TestClient, sample_article):
+    """Test creating a commande with its lignes"""
+    article_id = client.post("/articles/", json=sample_article).json()["id"]
+    create_commandes(client, article_id, 1)
+
+    response = client.get("/commandes/")
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data) == 1
+    assert sorted(ligne["quantite"] for ligne in data[0]["lignes"]) == [1, 2]
+
+def test_list_commandes_query_count(client: TestClient, sample_article, query_counter):
+    """Test that listing commandes does not lazy load lignes once per commande"""
+    article_id = client.post("/articles/", json=sample_article).json()["id"]
+    create_commandes(client, article_id, 20)
+
+    query_counter.clear()
+    commandes = client.get("/commandes/", params={"limit": 100}).json()
+    assert sum(len(c["lignes"]) for c in commandes) == 40
+    # One SELECT for the commandes, one for all their lignes
+    assert len([s for s in query_counter if s.lstrip().upper().startswith("SELECT")]) == 2
+
+    query_counter.clear()
+    page = client.get("/commandes/page", params={"limit": 100}).json()
+    assert sum(len(c["lignes"]) for c in page["items"]) == 40
+    assert len([s for s in query_counter if s.lstrip().upper().startswith("SELECT")]) == 2
+
+def test_get_commande_query_count(client: TestClient, sample_article, query_counter):
+    """Test that a single commande is read with its lignes up front"""
+    article_id = client.post("/articles/", json=sample_article).json()["id"]
+    create_commandes(client, article_id, 1)
+    commande_id = client.get("/commandes/").json()[0]["id"]
+
+    query_counter.clear()
+    assert len(client.get(f"/commandes/{commande_id}").json()["lignes"]) == 2
+    assert len([s for s in query_counter if s.lstrip().upper().startswith("SELECT")]) == 2
+
+def test_loader_options_follow_schema():
+    """Test that loader options are derived from the relationships a schema embeds"""
+    class MissionDetail(MissionRead):
+        article: ArticleRead
+
+    assert loader_options(Mission, MissionRead) == ()
+    options = loader_options(Mission, MissionDetail)
+    assert len(options) == 1
+    assert loader_options(Mission, MissionDetail) is options
+
+def test_create_commandes_bulk(client: TestClient, sample_article, query_counter):
+    """Test bulk creation with per-item status and a constant number of statements"""
+    article_id = client.post("/articles/", json=sample_article).json()["id"]
+    create_commandes(client, article_id, 1)
+
+    payload = [
+        {"reference": f"EDI-{i:04d}", "etat": "Brouillon",
+         "lignes": [{"article_id": article_id, "quantite": q} for q in range(1, 11)]}
+        for i in range(50)
+    ]
+    payload += [
+        {"reference": "CMD-0000", "etat": "Brouillon", "lignes": []},
+        {"reference": "EDI-0000", "etat": "Brouillon", "lignes": []},
+        {"reference": "EDI-INCONNU", "etat": "Réservée", "lignes": [{"article_id": "inconnu", "quantite": 1}]},
+    ]
+
+    query_counter.clear()
+    response = client.post("/commandes/bulk", json=payload)
+    assert response.status_code == 200
+    # Two validation SELECTs and one executemany INSERT per table, whatever the batch size
+    assert len([s for s in query_counter if not s.lstrip().upper().startswith(("BEGIN", "COMMIT"))]) == 4
+
+    results = response.json()
+    assert [r["index"] for r in results] == list(range(53))
+    assert all(r["status"] == "created" and r["id"] for r in results[:50])
+    assert [r["status"] for r in results[50:]] == ["rejected"] * 3
+    assert "inconnu" in results[52]["detail"]
+
+    created = client.get(f"/commandes/{results[0]['id']}").json()
+    assert created["reference"] == "EDI-0000"
+    assert created["etat"] == "Brouillon"
+    assert len(created["lignes"]) == 10
+    assert len(client.get("/commandes/", params={"limit": 1000}).json()) == 51
+
+def test_export_commandes_filter_etat(client: TestClient, sample_article):
+    """Test that exports emit enum values and filter on them"""
+    article_id = client.post("/articles/", json=sample_article).json()["id"]
+    create_commandes(client, article_id, 2)
+    client.post("/commandes/", json={"reference": "CMD-RES", "etat": "Réservée", "lignes": []})
+
+    response = client.get("/commandes/export", params={"etat": "Réservée"})
+    assert response.status_code == 200
+    assert [json.loads(ligne) for ligne in response.text.splitlines()] == [
+        {"id": json.loads(response.text)["id"], "reference": "CMD-RES", "etat": "Réservée", "vague_id": None}
+    ]
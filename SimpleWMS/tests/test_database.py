@@ -0,0 +1,102 @@
+import gc
+import time
+from datetime import date, datetime
+import pytest
+from sqlalchemy import text
+
+from app.database.config import DatabaseSettings
+from app.database.database import SessionLocal, build_engine
+from app.schemas.mission import MissionCreate, MissionRead
+from app.schemas.reservation import ReservationCreate, ReservationRead
+from app.schemas.salle import SalleCreate, SalleRead
+from app.services import mission as mission_service, reservation as reservation_service, salle as salle_service
+from app.services.availability import index as availability_index
+
+def test_settings_default_profile():
+    """Test that the default profile targets the local SQLite file"""
+    settings = DatabaseSettings.from_env({})
+    assert settings.url == "sqlite:///./app.db"
+    assert settings.is_sqlite
+
+def test_settings_postgresql_profile_with_overrides():
+    """Test profile selection and environment overrides"""
+    settings = DatabaseSettings.from_env({
+        "DATABASE_PROFILE": "postgresql",
+        "DATABASE_POOL_SIZE": "32",
+        "DATABASE_ECHO": "true",
+    })
+    assert settings.url.startswith("postgresql")
+    assert settings.pool_size == 32
+    assert settings.max_overflow == 20
+    assert settings.pool_pre_ping is True
+    assert settings.echo is True
+    assert not settings.is_sqlite
+
+def test_settings_reject_unknown_values():
+    """Test that invalid profiles and pragmas are refused"""
+    with pytest.raises(ValueError):
+        DatabaseSettings.from_env({"DATABASE_PROFILE": "oracle"})
+    with pytest.raises(ValueError):
+        DatabaseSettings.from_env({"DATABASE_SQLITE_JOURNAL_MODE": "WAL; DROP TABLE salles"})
+
+def test_sqlite_engine_applies_pragmas(tmp_path):
+    """Test that SQLite connections get WAL, synchronous and cache settings"""
+    settings = DatabaseSettings.from_env({
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'pragmas.db'}",
+        "DATABASE_SQLITE_CACHE_SIZE": "-2000",
+    })
+    engine = build_engine(settings)
+    with engine.connect() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert connection.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert connection.execute(text("PRAGMA cache_size")).scalar() == -2000
+    assert engine.pool.size() == settings.pool_size
+    engine.dispose()
+
+def _inserts_per_second(db, creer, read, debut: int, nombre: int, refresh: bool) -> float:
+    gc.collect()
+    depart = time.perf_counter()
+    for n in range(debut, debut + nombre):
+        obj = creer(db, n)
+        if refresh:
+            # What every create_* did before: one more SELECT per insert
+            db.refresh(obj)
+        read.model_validate(obj, from_attributes=True)
+    return nombre / (time.perf_counter() - depart)
+
+@pytest.mark.slow
+def test_create_write_path(db_engine, query_counter):
+    """Benchmark create_* of salles, reservations and missions with and without the refresh after commit"""
+    nombre, jour = 300, date(2026, 3, 2)
+    connection = db_engine.connect()
+    transaction = connection.begin()
+    avant = SessionLocal(bind=connection, expire_on_commit=True)
+    apres = SessionLocal(bind=connection)
+    salle_id = salle_service.create_salle(apres, SalleCreate(nom="Salle benchmark", capacite=8, localisation="RDC")).id
+    availability_index.preload(apres, [salle_id], jour, jour)
+
+    cas = {
+        "salles": (SalleRead, lambda db, n: salle_service.create_salle(
+            db, SalleCreate(nom=f"Salle {n}", capacite=8, localisation="RDC"))),
+        "reservations": (ReservationRead, lambda db, n: reservation_service.create_reservation(
+            db, ReservationCreate(salle_id=salle_id, date=jour, heure=f"{n // 60:02d}:{n % 60:02d}", duree_minutes=1,
+                                  utilisateur="user@example.com"))),
+        "missions": (MissionRead, lambda db, n: mission_service.create_mission(
+            db, MissionCreate(type="Déplacement", etat="À faire", article_id="article", source_id=None,
+                              destination_id=None, quantite=n, agent_id=None, date_creation=datetime(2026, 3, 2)))),
+    }
+    try:
+        for entite, (read, creer) in cas.items():
+            debit_avant = _inserts_per_second(avant, creer, read, 0, nombre, refresh=True)
+            query_counter.clear()
+            debit_apres = _inserts_per_second(apres, creer, read, nombre, nombre, refresh=False)
+            debit = f"{entite}: {debit_avant:.0f} -> {debit_apres:.0f} inserts/s"
+            # Every column is known after the INSERT: the new row is never read back
+            # (a reservation re-checks the other bookings of its day before committing)
+            assert not [s for s in query_counter if s.startswith(f"SELECT {entite}.") and " AS " in s], debit
+            assert len([s for s in query_counter if s.startswith("INSERT")]) == nombre, debit
+    finally:
+        avant.close()
+        apres.close()
+        transaction.rollback()
+        connection.close()
@@ -0,0 +1,108 @@
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from uuid import uuid4
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+from app.models import Agent, Article, Mission
+from app.models.article import CategorieArticle
+from app.models.mission import EtatMission, TypeMission
+from app.services.dispatch import dispatch_missions, plan_assignments
+
+MAINTENANT = datetime(2025, 1, 15, 12, 0)
+
+def add_agents(db, *noms, actif=True):
+    agents = [Agent(nom=nom, email=f"{nom}@example.com", actif=actif) for nom in noms]
+    db.add_all(agents)
+    db.flush()
+    return [agent.id for agent in agents]
+
+def add_missions(db, *specs, agent_id=None, etat=EtatMission.A_FAIRE):
+    """Missions from (type, minutes waited) pairs"""
+    article = Article(sku=f"SKU-{uuid4()}", designation="Carton", categorie=CategorieArticle.PRODUIT,
+                      poids_kg=1, volume_m3=0.01)
+    db.add(article)
+    db.flush()
+    missions = [Mission(type=type, etat=etat, article_id=article.id, quantite=1, agent_id=agent_id,
+                        date_creation=MAINTENANT - timedelta(minutes=minutes)) for type, minutes in specs]
+    db.add_all(missions)
+    db.flush()
+    return [mission.id for mission in missions]
+
+def test_plan_by_priority_age_and_load():
+    """Test that urgent and old missions go first, each to the least loaded agent"""
+    backlog = [
+        ("inventaire", TypeMission.INVENTAIRE, MAINTENANT),
+        ("vieil-inventaire", TypeMission.INVENTAIRE, MAINTENANT - timedelta(hours=3)),
+        ("preparation", TypeMission.PREPARATION, MAINTENANT - timedelta(minutes=5)),
+        ("reappro", TypeMission.REAPPRO, MAINTENANT - timedelta(minutes=10)),
+    ]
+    plan = plan_assignments(backlog, [("occupe", 2), ("libre", 0)], MAINTENANT)
+    # Three hours of waiting promote an INVENTAIRE by six ranks, ahead of everything
+    assert plan == [
+        ("vieil-inventaire", "libre"),
+        ("preparation", "libre"),
+        ("reappro", "libre"),
+        ("inventaire", "occupe"),
+    ]
+    plan = plan_assignments(backlog, [("occupe", 2), ("libre", 0)], MAINTENANT, max_par_agent=2)
+    assert [agent for _, agent in plan] == ["libre", "libre"]
+
+def test_dispatch_balances_active_agents(db_session, query_counter):
+    """Test that the backlog is spread over active agents only, in bulk, and that a rerun assigns nothing"""
+    alice, bruno = add_agents(db_session, "alice", "bruno")
+    absent, = add_agents(db_session, "absent", actif=False)
+    add_missions(db_session, (TypeMission.DEPLACEMENT, 0), agent_id=alice, etat=EtatMission.EN_COURS)
+    add_missions(db_session, (TypeMission.DEPLACEMENT, 0), agent_id=alice, etat=EtatMission.TERMINE)
+    add_missions(db_session, *[(TypeMission.PREPARATION, n) for n in range(7)])
+
+    del query_counter[:]
+    resultat = dispatch_missions(db_session, lot=3, maintenant=MAINTENANT)
+    assert resultat == {"missions_en_attente": 7, "agents_actifs": 2,
+                        "missions_assignees": 7, "missions_non_assignees": 0}
+    assert sum(statement.startswith("UPDATE") for statement in query_counter) == 3
+
+    charges = Counter(agent_id for agent_id, in db_session.query(Mission.agent_id).filter(
+        Mission.etat.in_([EtatMission.A_FAIRE, EtatMission.EN_COURS])))
+    assert charges == {alice: 4, bruno: 4}
+    assert absent not in charges
+    assert dispatch_missions(db_session, maintenant=MAINTENANT)["missions_assignees"] == 0
+
+def test_dispatch_endpoint(client: TestClient):
+    """Test the dispatch endpoint with a per-agent cap and a type filter"""
+    article = client.post("/articles/", json={"sku": "SKU-D", "designation": "Carton", "categorie": "Produit fini",
+                                              "poids_kg": 1, "volume_m3": 0.01}).json()["id"]
+    client.post("/agents/", json={"nom": "Alice", "email": "alice@example.com", "actif": True})
+    for type in ("Préparation commande", "Préparation commande", "Inventaire"):
+        client.post("/missions/", json={"type": type, "etat": "À faire", "article_id": article, "source_id": None,
+                                        "destination_id": None, "quantite": 1, "agent_id": None,
+                                        "date_creation": "2025-01-15T08:00:00"})
+
+    response = client.post("/missions/affectation", params={"max_par_agent": 1, "types": "Préparation commande"})
+    assert response.status_code == 200
+    assert response.json() == {"missions_en_attente": 2, "agents_actifs": 1,
+                               "missions_assignees": 1, "missions_non_assignees": 1}
+    assert client.post("/missions/affectation", params={"lot": 0}).status_code == 422
+
+@pytest.mark.slow
+def test_dispatch_thousands_of_missions(db_session):
+    """Test that a shift worth of missions is dispatched quickly"""
+    agents = add_agents(db_session, *[f"agent{n}" for n in range(50)])
+    article = Article(sku="SKU-MASSE", designation="Carton", categorie=CategorieArticle.PRODUIT,
+                      poids_kg=1, volume_m3=0.01)
+    db_session.add(article)
+    db_session.flush()
+    types = list(TypeMission)
+    db_session.execute(insert(Mission), [
+        {"id": str(uuid4()), "type": types[n % len(types)], "etat": EtatMission.A_FAIRE, "article_id": article.id,
+         "quantite": 1, "date_creation": MAINTENANT - timedelta(seconds=n)}
+        for n in range(20000)
+    ])
+
+    debut = time.perf_counter()
+    resultat = dispatch_missions(db_session, maintenant=MAINTENANT)
+    assert time.perf_counter() - debut < 5
+    assert resultat["missions_assignees"] == 20000
+    charges = Counter(agent_id for agent_id, in db_session.query(Mission.agent_id))
+    assert set(charges) == set(agents) and set(charges.values()) == {400}
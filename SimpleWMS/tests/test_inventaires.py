@@ -0,0 +1,151 @@
+import json
+import time
+from uuid import uuid4
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func, insert, select, update
+from app.models import Article, Emplacement, Implantation
+from app.models.article import CategorieArticle
+from app.models.emplacement import TypeEmplacement
+from app.schemas.inventaire import ComptageCreate
+from app.services.inventaire import LOT, open_inventaire, reconcile, record_counts
+
+@pytest.fixture
+def entrepot(client: TestClient, sample_article):
+    """Three stock locations and a shop location holding two articles"""
+    articles = [client.post("/articles/", json=dict(sample_article, sku=sku)).json()["id"] for sku in ("SKU-1", "SKU-2")]
+    emplacements = {
+        code: client.post("/emplacements/", json={
+            "code": code, "type": type, "capacite_poids_kg": 500, "capacite_volume_m3": 2
+        }).json()["id"]
+        for code, type in (("A-01", "Zone de stockage"), ("A-02", "Zone de stockage"),
+                           ("B-01", "Zone de stockage"), ("V-01", "Surface de vente"))
+    }
+    implantations = {
+        (code, article): client.post("/implantations/", json={
+            "article_id": articles[article], "emplacement_id": emplacements[code], "quantite": quantite,
+            "seuil_minimum": 0
+        }).json()["id"]
+        for code, article, quantite in (("A-01", 0, 10), ("A-01", 1, 5), ("A-02", 0, 7), ("V-01", 0, 3))
+    }
+    return articles, emplacements, implantations
+
+def _quantite(client: TestClient, implantation_id: str) -> int:
+    return client.get(f"/implantations/{implantation_id}").json()["quantite"]
+
+def test_inventory_session(client: TestClient, entrepot):
+    """Test that scans are reconciled against the snapshot and only the deltas are applied"""
+    articles, emplacements, implantations = entrepot
+    inventaire = client.post("/inventaires/", json={"zone": "Zone de stockage"}).json()
+    assert inventaire["etat"] == "En cours"
+    url = f"/inventaires/{inventaire['id']}"
+
+    # Two batches for A-01 (article 1 only, article 2 is missing), found stock on B-01, A-02 not counted
+    for lot in ([{"emplacement_id": emplacements["A-01"], "article_id": articles[0], "quantite": 4}],
+                [{"emplacement_id": emplacements["A-01"], "article_id": articles[0], "quantite": 4},
+                 {"emplacement_id": emplacements["B-01"], "article_id": articles[1], "quantite": 2}]):
+        response = client.post(f"{url}/comptages", json=lot)
+        assert response.status_code == 200 and response.json()["nb_comptages"] == len(lot)
+
+    rapport = client.get(f"{url}/ecarts").json()
+    assert (rapport["nb_positions"], rapport["nb_comptees"], rapport["nb_non_comptees"]) == (3, 3, 1)
+    assert (rapport["nb_ecarts"], rapport["conflits"]) == (3, [])
+    lignes = [json.loads(ligne) for ligne in client.get(f"{url}/ecarts/export").text.splitlines()]
+    assert sorted((e["emplacement_id"], e["article_id"], e["ecart"]) for e in lignes) == sorted([
+        (emplacements["A-01"], articles[0], -2), (emplacements["A-01"], articles[1], -5),
+        (emplacements["B-01"], articles[1], 2),
+    ])
+    assert _quantite(client, implantations["A-01", 0]) == 10
+
+    # A movement after the snapshot is kept: only the difference is applied
+    client.put(f"/implantations/{implantations['A-01', 0]}", json={
+        "article_id": articles[0], "emplacement_id": emplacements["A-01"], "quantite": 12, "seuil_minimum": 0
+    })
+    rapport = client.post(f"{url}/application").json()
+    assert rapport["etat"] == "Appliqué"
+    assert _quantite(client, implantations["A-01", 0]) == 10
+    assert _quantite(client, implantations["A-01", 1]) == 0
+    assert _quantite(client, implantations["A-02", 0]) == 7
+    trouvee = next(i for i in client.get("/implantations/").json() if i["emplacement_id"] == emplacements["B-01"])
+    assert (trouvee["article_id"], trouvee["quantite"]) == (articles[1], 2)
+    assert client.get(url).json()["etat"] == "Appliqué"
+
+def test_inventory_rules(client: TestClient, entrepot):
+    """Test zone overlaps, out-of-zone scans and closed sessions"""
+    articles, emplacements, _ = entrepot
+    inventaire = client.post("/inventaires/", json={"zone": "Zone de stockage"}).json()
+    url = f"/inventaires/{inventaire['id']}"
+    assert client.post("/inventaires/", json={"zone": "Zone de stockage"}).status_code == 400
+    assert client.post("/inventaires/", json={}).status_code == 400
+    vente = client.post("/inventaires/", json={"zone": "Surface de vente"})
+    assert vente.status_code == 200
+
+    hors_zone = [{"emplacement_id": emplacements["V-01"], "article_id": articles[0], "quantite": 1}]
+    assert client.post(f"{url}/comptages", json=hors_zone).status_code == 400
+    assert client.post(f"{url}/comptages", json=[
+        {"emplacement_id": emplacements["A-01"], "article_id": "inconnu", "quantite": 1}
+    ]).status_code == 400
+    assert client.post(f"{url}/comptages", json=[
+        {"emplacement_id": emplacements["A-01"], "article_id": articles[0], "quantite": -1}
+    ]).status_code == 422
+
+    assert client.post(f"{url}/annulation").json()["etat"] == "Annulé"
+    assert client.post(f"{url}/application").status_code == 400
+    assert client.post(f"{url}/comptages", json=[]).status_code == 400
+    assert client.get("/inventaires/inconnu/ecarts").status_code == 404
+
+def test_inventory_conflicts(client: TestClient, entrepot, db_engine):
+    """Test that deltas below the reserved stock or on deleted implantations are reported, not applied"""
+    articles, emplacements, implantations = entrepot
+    inventaire = client.post("/inventaires/", json={"zone": "Zone de stockage"}).json()
+    url = f"/inventaires/{inventaire['id']}"
+    with db_engine.begin() as connection:
+        connection.execute(update(Implantation).where(Implantation.id == implantations["A-01", 0])
+                           .values(quantite_reservee=6))
+    client.post(f"{url}/comptages", json=[
+        {"emplacement_id": emplacements["A-01"], "article_id": articles[0], "quantite": 4},
+        {"emplacement_id": emplacements["A-01"], "article_id": articles[1], "quantite": 3},
+        {"emplacement_id": emplacements["A-02"], "article_id": articles[0], "quantite": 9},
+    ])
+    assert client.delete(f"/implantations/{implantations['A-02', 0]}").status_code == 200
+    avant = len(client.get("/stock/mouvements").json())
+
+    rapport = client.post(f"{url}/application").json()
+    assert (rapport["nb_ecarts"], rapport["nb_conflits"]) == (3, 2)
+    assert sorted((c["implantation_id"], c["ecart"], c["motif"]) for c in rapport["conflits"]) == sorted([
+        (implantations["A-01", 0], -6, "Counted quantity is below the reserved quantity"),
+        (implantations["A-02", 0], 2, "Implantation was deleted after the snapshot"),
+    ])
+    assert _quantite(client, implantations["A-01", 0]) == 10
+    assert _quantite(client, implantations["A-01", 1]) == 3
+    mouvements = client.get("/stock/mouvements").json()[avant:]
+    assert [(m["type"], m["quantite"]) for m in mouvements] == [("Inventaire", -2)]
+
+@pytest.mark.slow
+def test_reconcile_50k_positions(db_session, query_counter):
+    """Test that a 50k-position count is reconciled and applied in batched updates"""
+    emplacements = [{"id": str(uuid4()), "code": f"{chr(65 + a)}-{b:03d}", "type": TypeEmplacement.STOCKAGE,
+                     "capacite_poids_kg": 500, "capacite_volume_m3": 2} for a in range(10) for b in range(500)]
+    articles = [{"id": str(uuid4()), "sku": f"SKU-{n}", "designation": "Carton",
+                 "categorie": CategorieArticle.PRODUIT, "poids_kg": 1, "volume_m3": 0.01} for n in range(10)]
+    implantations = [{"id": str(uuid4()), "article_id": article["id"], "emplacement_id": emplacement["id"],
+                      "quantite": 10, "seuil_minimum": 0} for emplacement in emplacements for article in articles]
+    db_session.execute(insert(Emplacement), emplacements)
+    db_session.execute(insert(Article), articles)
+    db_session.execute(insert(Implantation), implantations)
+
+    debut = time.perf_counter()
+    inventaire = open_inventaire(db_session)
+    # Every other position is one short
+    comptages = [ComptageCreate(emplacement_id=i["emplacement_id"], article_id=i["article_id"], quantite=10 - n % 2)
+                 for n, i in enumerate(implantations)]
+    for lot in range(0, len(comptages), 5000):
+        record_counts(db_session, inventaire.id, comptages[lot:lot + 5000])
+    query_counter.clear()
+    rapport = reconcile(db_session, inventaire.id, appliquer=True)
+    assert time.perf_counter() - debut < 30
+
+    assert (rapport["nb_positions"], rapport["nb_comptees"], rapport["nb_ecarts"]) == (50000, 50000, 25000)
+    assert db_session.scalar(select(func.sum(Implantation.quantite))) == 500000 - 25000
+    mises_a_jour = [s for s in query_counter if s.startswith("UPDATE implantations")]
+    assert len(mises_a_jour) == 25000 // LOT
@@ -0,0 +1,216 @@
+import time
+from datetime import datetime
+from uuid import uuid4
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func, insert, select
+from app.models import Article, Emplacement, Implantation, Mission, Mouvement
+from app.models.article import CategorieArticle
+from app.models.emplacement import TypeEmplacement
+from app.models.mission import EtatMission, TypeMission
+from app.schemas.mission import MissionTransition
+from app.services.mission import transition_missions
+
+@pytest.fixture
+def deplacement(client: TestClient, sample_article):
+    """10 units on A-01 and a move of 4 of them to B-01"""
+    article = client.post("/articles/", json=sample_article).json()["id"]
+    emplacements = {code: client.post("/emplacements/", json={
+        "code": code, "type": "Zone de stockage", "capacite_poids_kg": 500, "capacite_volume_m3": 2
+    }).json()["id"] for code in ("A-01", "B-01")}
+    client.post("/implantations/", json={
+        "article_id": article, "emplacement_id": emplacements["A-01"], "quantite": 10, "seuil_minimum": 0
+    })
+    mission = _mission(client, article, emplacements["A-01"], emplacements["B-01"], 4)
+    return article, emplacements, mission
+
+def _mission(client: TestClient, article: str, source: str, destination: str, quantite: int) -> dict:
+    return client.post("/missions/", json={
+        "type": "Déplacement", "etat": "À faire", "article_id": article, "source_id": source,
+        "destination_id": destination, "quantite": quantite, "agent_id": None, "date_creation": "2026-03-01T08:00:00"
+    }).json()
+
+def _stock(client: TestClient, article: str) -> dict:
+    return {i["emplacement_id"]: i["quantite"] for i in client.get("/implantations/").json()
+            if i["article_id"] == article}
+
+def test_complete_moves_stock(client: TestClient, deplacement):
+    """Test that completing a mission moves its quantity and records both movements"""
+    article, emplacements, mission = deplacement
+    resultats = client.post("/missions/transitions", json=[
+        {"mission_id": mission["id"], "etat": "En cours"},
+        {"mission_id": mission["id"], "etat": "Terminé", "date": "2026-03-01T09:30:00"},
+    ]).json()
+    assert [(r["status"], r["etat"]) for r in resultats] == [("applied", "En cours"), ("applied", "Terminé")]
+    assert _stock(client, article) == {emplacements["A-01"]: 6, emplacements["B-01"]: 4}
+
+    terminee = client.get(f"/missions/{mission['id']}").json()
+    assert terminee["etat"] == "Terminé" and terminee["date_execution"] == "2026-03-01T09:30:00"
+    assert terminee["date_creation"] == "2026-03-01T08:00:00"
+    mouvements = client.get("/stock/mouvements", params={"article_id": article}).json()
+    assert [(m["type"], m["quantite"], m["reference"]) for m in mouvements[1:]] == [
+        ("Mission", -4, mission["id"]), ("Mission", 4, mission["id"])
+    ]
+
+def test_invalid_transitions_rejected(client: TestClient, deplacement):
+    """Test that invalid transitions and missing stock are rejected one by one, the rest applied"""
+    article, emplacements, mission = deplacement
+    trop = _mission(client, article, emplacements["A-01"], emplacements["B-01"], 7)
+    resultats = client.post("/missions/transitions", json=[
+        {"mission_id": mission["id"], "etat": "Terminé"},
+        {"mission_id": mission["id"], "etat": "En cours"},
+        {"mission_id": trop["id"], "etat": "Terminé"},
+        {"mission_id": "inconnue", "etat": "Terminé"},
+        {"mission_id": trop["id"], "etat": "Échoué"},
+    ]).json()
+    assert [r["status"] for r in resultats] == ["applied", "rejected", "rejected", "rejected", "applied"]
+    assert [r["detail"] for r in resultats[1:4]] == [
+        "Mission cannot go from Terminé to En cours", "Not enough stock at the source location", "Mission not found"
+    ]
+    assert _stock(client, article) == {emplacements["A-01"]: 6, emplacements["B-01"]: 4}
+
+    # PUT goes through the same rules and never rewrites date_creation
+    response = client.put(f"/missions/{mission['id']}", json=dict(mission, etat="À faire"))
+    assert response.status_code == 400
+    response = client.put(f"/missions/{trop['id']}", json=dict(trop, etat="À faire", quantite=6,
+                                                               date_creation="2030-01-01T00:00:00"))
+    assert response.status_code == 200
+    assert (response.json()["quantite"], response.json()["date_creation"]) == (6, "2026-03-01T08:00:00")
+    assert client.put(f"/missions/{trop['id']}", json=dict(trop, etat="Terminé", quantite=6)).status_code == 200
+    assert _stock(client, article) == {emplacements["A-01"]: 0, emplacements["B-01"]: 10}
+
+def test_preparation_consumes_reservation(client: TestClient, sample_article):
+    """Test that a completed preparation consumes its reservation and a failed one hands it back"""
+    article = client.post("/articles/", json=sample_article).json()["id"]
+    emplacement = client.post("/emplacements/", json={
+        "code": "A-01", "type": "Zone de stockage", "capacite_poids_kg": 500, "capacite_volume_m3": 2
+    }).json()["id"]
+    implantation = client.post("/implantations/", json={
+        "article_id": article, "emplacement_id": emplacement, "quantite": 10, "seuil_minimum": 0
+    }).json()["id"]
+    commandes = [client.post("/commandes/", json={
+        "reference": reference, "etat": "Brouillon", "lignes": [{"article_id": article, "quantite": 3}]
+    }).json()["id"] for reference in ("CMD-1", "CMD-2")]
+    for commande in commandes:
+        client.post(f"/commandes/{commande}/reservation")
+    missions = [client.post("/commandes/preparation", json={"commande_ids": [commande]}).json()["missions"][0]["id"]
+                for commande in commandes]
+
+    resultats = client.post("/missions/transitions", json=[
+        {"mission_id": missions[0], "etat": "Terminé"}, {"mission_id": missions[1], "etat": "Échoué"}
+    ]).json()
+    assert [r["status"] for r in resultats] == ["applied", "applied"]
+    stock = client.get(f"/implantations/{implantation}").json()
+    assert (stock["quantite"], stock["quantite_reservee"]) == (7, 3)
+    # The failed pick is planned again from the same reservation
+    tournee = client.post("/commandes/preparation", json={"commande_ids": [commandes[1]]}).json()
+    assert [m["quantite"] for m in tournee["missions"]] == [3] and tournee["lignes_non_servies"] == []
+
+def test_reserved_stock_guards_completion(client: TestClient, deplacement):
+    """Test that a move cannot take reserved stock, while the preparation holding it can"""
+    article, emplacements, mission = deplacement
+    commande = client.post("/commandes/", json={
+        "reference": "CMD-1", "etat": "Réservée", "lignes": [{"article_id": article, "quantite": 8}]
+    }).json()["id"]
+    preparation = client.post("/commandes/preparation", json={"commande_ids": [commande]}).json()["missions"][0]
+
+    # 10 on A-01, 8 of them reserved: the move of 4 only finds 2 free
+    resultats = client.post("/missions/transitions", json=[
+        {"mission_id": mission["id"], "etat": "Terminé"}, {"mission_id": preparation["id"], "etat": "Terminé"},
+    ]).json()
+    assert [(r["status"], r["detail"]) for r in resultats] == [
+        ("rejected", "Not enough stock at the source location"), ("applied", None)
+    ]
+    assert _stock(client, article) == {emplacements["A-01"]: 2}
+    assert client.post("/missions/transitions", json=[
+        {"mission_id": mission["id"], "etat": "Terminé"}
+    ]).json()[0]["status"] == "rejected"
+
+def test_hand_back_and_direct_completion(client: TestClient, deplacement):
+    """Test that a started mission can be handed back, and a mission completed without being started"""
+    article, emplacements, mission = deplacement
+    resultats = client.post("/missions/transitions", json=[
+        {"mission_id": mission["id"], "etat": "En cours"}, {"mission_id": mission["id"], "etat": "À faire"},
+    ]).json()
+    assert [r["status"] for r in resultats] == ["applied", "applied"]
+    rendue = client.get(f"/missions/{mission['id']}").json()
+    assert (rendue["etat"], rendue["date_execution"]) == ("À faire", None)
+    assert _stock(client, article) == {emplacements["A-01"]: 10}
+
+    # Confirmed in one scan: À faire straight to Terminé moves the stock
+    assert client.post("/missions/transitions", json=[
+        {"mission_id": mission["id"], "etat": "Terminé"}
+    ]).json()[0]["status"] == "applied"
+    assert _stock(client, article) == {emplacements["A-01"]: 6, emplacements["B-01"]: 4}
+
+def test_patch_mission_state(client: TestClient, deplacement, query_counter):
+    """Test that a state PATCH is one guarded UPDATE, and completion still moves the stock"""
+    article, emplacements, mission = deplacement
+    query_counter.clear()
+    response = client.patch(f"/missions/{mission['id']}", json={"etat": "En cours"})
+    assert response.status_code == 200
+    assert (response.json()["etat"], response.json()["date_creation"]) == ("En cours", "2026-03-01T08:00:00")
+    assert [s.split()[0] for s in query_counter] == ["UPDATE"]
+
+    assert client.patch(f"/missions/{mission['id']}", json={"etat": "En cours"}).status_code == 200
+    response = client.patch(f"/missions/{mission['id']}", json={"etat": "Terminé", "agent_id": None})
+    assert response.status_code == 200 and response.json()["date_execution"] is not None
+    assert _stock(client, article) == {emplacements["A-01"]: 6, emplacements["B-01"]: 4}
+
+    response = client.patch(f"/missions/{mission['id']}", json={"etat": "À faire"})
+    assert response.status_code == 400 and response.json()["detail"] == "Mission cannot go from Terminé to À faire"
+    assert client.patch(f"/missions/{mission['id']}", json={"etat": "Terminé"}).status_code == 200
+    assert _stock(client, article)[emplacements["A-01"]] == 6
+    assert client.patch("/missions/inconnue", json={"etat": "En cours"}).status_code == 404
+    assert client.patch("/missions/inconnue", json={"etat": "Terminé"}).status_code == 404
+
+def test_completion_is_one_transaction(client: TestClient, deplacement):
+    """Test that a completing PATCH writes its fields with the stock move, and a completed mission stays put"""
+    article, emplacements, mission = deplacement
+    url = f"/missions/{mission['id']}"
+    # The invalid field is refused before anything, the stock move included, is written
+    assert client.patch(url, json={"etat": "Terminé", "quantite": None}).status_code == 400
+    assert client.get(url).json()["etat"] == "À faire"
+    assert _stock(client, article) == {emplacements["A-01"]: 10}
+
+    response = client.patch(url, json={"etat": "Terminé", "quantite": 6})
+    assert response.status_code == 200
+    assert (response.json()["etat"], response.json()["quantite"]) == ("Terminé", 6)
+    assert response.json()["date_execution"] is not None
+    assert _stock(client, article) == {emplacements["A-01"]: 4, emplacements["B-01"]: 6}
+
+    figee = "A completed mission cannot change its type, article, locations or quantity"
+    response = client.patch(url, json={"quantite": 2})
+    assert response.status_code == 400 and response.json()["detail"] == figee
+    terminee = client.get(url).json()
+    response = client.put(url, json=dict(terminee, destination_id=emplacements["A-01"]))
+    assert response.status_code == 400 and response.json()["detail"] == figee
+    assert client.patch(url, json={"quantite": 6, "agent_id": None}).status_code == 200
+    assert client.get(url).json()["destination_id"] == emplacements["B-01"]
+
+@pytest.mark.slow
+def test_transition_batch(db_session, query_counter):
+    """Test that a batch of 500 completions is applied with a fixed number of statements"""
+    article, emplacements = str(uuid4()), [str(uuid4()) for _ in range(100)]
+    db_session.execute(insert(Article), [{"id": article, "sku": "SKU-1", "designation": "Carton",
+                                          "categorie": CategorieArticle.PRODUIT, "poids_kg": 1, "volume_m3": 0.01}])
+    db_session.execute(insert(Emplacement), [{"id": e, "code": f"A-{n:03d}", "type": TypeEmplacement.STOCKAGE,
+                                              "capacite_poids_kg": 500, "capacite_volume_m3": 2}
+                                             for n, e in enumerate(emplacements)])
+    db_session.execute(insert(Implantation), [{"id": str(uuid4()), "article_id": article, "emplacement_id": e,
+                                               "quantite": 10, "seuil_minimum": 0} for e in emplacements[:50]])
+    missions = [{"id": str(uuid4()), "type": TypeMission.DEPLACEMENT, "etat": EtatMission.EN_COURS,
+                 "article_id": article, "source_id": emplacements[n % 50], "destination_id": emplacements[50 + n % 50],
+                 "quantite": 1, "date_creation": datetime(2026, 3, 1)} for n in range(500)]
+    db_session.execute(insert(Mission), missions)
+
+    query_counter.clear()
+    debut = time.perf_counter()
+    resultats = transition_missions(db_session, [MissionTransition(mission_id=m["id"], etat="Terminé")
+                                                 for m in missions])
+    assert time.perf_counter() - debut < 2
+    assert all(r["status"] == "applied" for r in resultats)
+    assert len(query_counter) < 15
+    assert db_session.scalar(select(func.sum(Implantation.quantite))) == 500
+    assert db_session.scalar(select(func.count()).select_from(Mouvement)) == 1000
+    assert db_session.scalar(select(func.count()).where(Mission.etat == EtatMission.TERMINE)) == 500
@@ -0,0 +1,134 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+from fastapi.testclient import TestClient
+from sqlalchemy import insert, update
+from app.models import Article, Emplacement, Implantation
+from app.models.article import CategorieArticle
+from app.models.emplacement import TypeEmplacement
+from app.models.mouvement import TypeMouvement
+from app.schemas.implantation import ImplantationUpdate
+from app.services import implantation as implantation_service, mouvement as mouvement_service
+from app.services.mouvement import MARGE, append_movements, compact, stock_at
+
+def test_ledger_follows_stock_changes(client: TestClient, sample_article, monkeypatch):
+    """Test that implantation changes and receptions are appended and the ledger rebuilds the stock"""
+    article = client.post("/articles/", json=sample_article).json()["id"]
+    emplacements = [client.post("/emplacements/", json={
+        "code": code, "type": "Zone de stockage", "capacite_poids_kg": 500, "capacite_volume_m3": 2
+    }).json()["id"] for code in ("A-01", "A-02")]
+    implantation = client.post("/implantations/", json={
+        "article_id": article, "emplacement_id": emplacements[0], "quantite": 10, "seuil_minimum": 0
+    }).json()["id"]
+    client.put(f"/implantations/{implantation}", json={
+        "article_id": article, "emplacement_id": emplacements[0], "quantite": 7, "seuil_minimum": 0
+    })
+    # Moving the implantation is an exit from A-01 and an entry on A-02
+    client.put(f"/implantations/{implantation}", json={
+        "article_id": article, "emplacement_id": emplacements[1], "quantite": 7, "seuil_minimum": 0
+    })
+    reception = client.post("/receptions/rangement", json={
+        "article_id": article, "quantite": 5, "fournisseur": "ACME"
+    }).json()
+
+    mouvements = client.get("/stock/mouvements", params={"article_id": article}).json()
+    assert [(m["type"], m["quantite"]) for m in mouvements] == [
+        ("Ajustement", 10), ("Ajustement", -3), ("Ajustement", -7), ("Ajustement", 7), ("Réception", 5)
+    ]
+    assert mouvements[-1]["reference"] == reception["id"]
+    assert client.get("/stock/mouvements", params={"apres": mouvements[2]["id"]}).json() == mouvements[3:]
+
+    attendu = {}
+    for i in client.get("/implantations/").json():
+        attendu[i["emplacement_id"]] = i["quantite"]
+    historique = client.get("/stock/historique").json()
+    assert {p["emplacement_id"]: p["quantite"] for p in historique} == attendu
+
+    # Compaction changes nothing to what the ledger reports
+    monkeypatch.setattr(mouvement_service, "MARGE", timedelta(0))
+    snapshot = client.post("/stock/compaction").json()
+    assert snapshot["mouvement_id"] == mouvements[-1]["id"]
+    assert client.get("/stock/historique").json() == historique
+    assert client.post("/stock/compaction").json() is None
+
+def test_stock_at_time(db_session):
+    """Test that stock at a past time is the nearest snapshot plus the movements after it"""
+    article, emplacement = str(uuid4()), str(uuid4())
+    db_session.execute(insert(Article), [{"id": article, "sku": "SKU-1", "designation": "Carton",
+                                          "categorie": CategorieArticle.PRODUIT, "poids_kg": 1, "volume_m3": 0.01}])
+    db_session.execute(insert(Emplacement), [{"id": emplacement, "code": "A-01", "type": TypeEmplacement.STOCKAGE,
+                                              "capacite_poids_kg": 500, "capacite_volume_m3": 2}])
+    jour = datetime(2026, 3, 1)
+
+    def quantite(date=None):
+        return [p["quantite"] for p in stock_at(db_session, date, article_id=article)]
+
+    append_movements(db_session, TypeMouvement.RECEPTION, [(article, emplacement, 10)], date=jour)
+    append_movements(db_session, TypeMouvement.MISSION, [(article, emplacement, -3)], date=jour + timedelta(days=1))
+    premier = compact(db_session, jour + timedelta(days=1, hours=1) + MARGE)
+    append_movements(db_session, TypeMouvement.AJUSTEMENT, [(article, emplacement, 5)], date=jour + timedelta(days=2))
+    # Too recent to be folded yet
+    assert compact(db_session, jour + timedelta(days=2)) is None
+    second = compact(db_session, jour + timedelta(days=3))
+    assert second.mouvement_id > premier.mouvement_id
+
+    assert quantite(jour - timedelta(hours=1)) == []
+    assert quantite(jour + timedelta(hours=12)) == [10]
+    assert quantite(jour + timedelta(days=1, hours=12)) == [7]
+    assert quantite(jour + timedelta(days=2, hours=12)) == [12]
+    assert quantite() == [12]
+    # Stock emptied by a later movement disappears from the snapshot
+    append_movements(db_session, TypeMouvement.MISSION, [(article, emplacement, -12)], date=jour + timedelta(days=4))
+    compact(db_session, jour + timedelta(days=5))
+    assert quantite() == [] and quantite(jour + timedelta(days=3)) == [12]
+
+def test_update_implantation_keeps_concurrent_movements(db_session):
+    """Test that a PUT of the quantity applies its difference, not an absolute value read earlier"""
+    article, emplacement, implantation = str(uuid4()), str(uuid4()), str(uuid4())
+    db_session.execute(insert(Article), [{"id": article, "sku": "SKU-1", "designation": "Carton",
+                                          "categorie": CategorieArticle.PRODUIT, "poids_kg": 1, "volume_m3": 0.01}])
+    db_session.execute(insert(Emplacement), [{"id": emplacement, "code": "A-01", "type": TypeEmplacement.STOCKAGE,
+                                              "capacite_poids_kg": 500, "capacite_volume_m3": 2}])
+    db_session.execute(insert(Implantation), [{"id": implantation, "article_id": article, "emplacement_id": emplacement,
+                                               "quantite": 10, "seuil_minimum": 0}])
+    lue = implantation_service.get_implantation(db_session, implantation)
+    # A reception adds 5 units once the row was read
+    db_session.execute(update(Implantation).where(Implantation.id == implantation)
+                       .values(quantite=Implantation.quantite + 5).execution_options(synchronize_session=False))
+
+    implantation_service.update_implantation(db_session, implantation, ImplantationUpdate(
+        article_id=article, emplacement_id=emplacement, quantite=lue.quantite - 3, seuil_minimum=2
+    ))
+    ligne = db_session.get(Implantation, implantation)
+    assert (ligne.quantite, ligne.seuil_minimum) == (12, 2)
+
+def test_one_implantation_per_position(client: TestClient, sample_article):
+    """Test that a position holds one implantation, so quantity changes and missions apply to that row"""
+    article = client.post("/articles/", json=sample_article).json()["id"]
+    emplacements = [client.post("/emplacements/", json={
+        "code": code, "type": "Zone de stockage", "capacite_poids_kg": 500, "capacite_volume_m3": 2
+    }).json()["id"] for code in ("A-01", "A-02")]
+    implantations = [client.post("/implantations/", json={
+        "article_id": article, "emplacement_id": emplacement, "quantite": 10, "seuil_minimum": 0
+    }).json()["id"] for emplacement in emplacements]
+
+    doublon = client.post("/implantations/", json={
+        "article_id": article, "emplacement_id": emplacements[0], "quantite": 5, "seuil_minimum": 0
+    })
+    assert doublon.status_code == 400
+    assert doublon.json()["detail"] == "An implantation already exists for this article at this location"
+    assert client.put(f"/implantations/{implantations[1]}", json={
+        "article_id": article, "emplacement_id": emplacements[0], "quantite": 10, "seuil_minimum": 0
+    }).status_code == 400
+
+    assert client.put(f"/implantations/{implantations[0]}", json={
+        "article_id": article, "emplacement_id": emplacements[0], "quantite": 12, "seuil_minimum": 0
+    }).json()["quantite"] == 12
+    mission = client.post("/missions/", json={
+        "type": "Déplacement", "etat": "À faire", "article_id": article, "source_id": emplacements[0],
+        "destination_id": emplacements[1], "quantite": 4, "agent_id": None, "date_creation": "2026-03-01T08:00:00"
+    }).json()
+    assert client.post("/missions/transitions", json=[
+        {"mission_id": mission["id"], "etat": "Terminé"}
+    ]).json()[0]["status"] == "applied"
+    stock = {i["id"]: i["quantite"] for i in client.get("/implantations/").json()}
+    assert stock == {implantations[0]: 8, implantations[1]: 14}
@@ -0,0 +1,122 @@
+import random
+import time
+from uuid import uuid4
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+from app.models import Article, Commande, Emplacement, Implantation, LigneCommande
+from app.models.article import CategorieArticle
+from app.models.commande import EtatCommande
+from app.models.emplacement import TypeEmplacement
+from app.services.picking import distance, parse_code, plan_route, prepare_commandes
+
+def test_parse_code():
+    """Test aisle/bay parsing of location codes"""
+    assert parse_code("A-01-02") == (0, 1)
+    assert parse_code("c-12") == (2, 12)
+    assert parse_code("AA-003-1") == (26, 3)
+    assert parse_code("12.04") == (12, 4)
+    assert parse_code("QUAI") is None
+
+def test_plan_route_walks_aisles_in_order():
+    """Test that the route is no longer than nearest neighbour and serpentines through the aisles"""
+    positions = [(1, 9), (0, 2), (1, 2), (0, 9), (2, 5), (0, 5)]
+    ordre, longueur = plan_route(positions)
+    assert sorted(ordre) == list(range(len(positions)))
+    assert [positions[k] for k in ordre] == [(0, 2), (0, 5), (0, 9), (1, 9), (1, 2), (2, 5)]
+    points = [(0, 0)] + [positions[k] for k in ordre]
+    assert longueur == sum(distance(a, b, 10) for a, b in zip(points, points[1:]))
+    assert plan_route([]) == ([], 0)
+
+@pytest.fixture
+def rayons(client: TestClient, db_engine, sample_article):
+    """Two articles stocked in aisles A and B, and a commande of both confirmed without reservation"""
+    articles = [client.post("/articles/", json=dict(sample_article, sku=sku)).json()["id"] for sku in ("SKU-1", "SKU-2")]
+    emplacements = {
+        code: client.post("/emplacements/", json={
+            "code": code, "type": "Zone de stockage", "capacite_poids_kg": 500, "capacite_volume_m3": 2
+        }).json()["id"]
+        for code in ("B-08", "A-02", "A-09", "QUAI-01")
+    }
+    for article, code, quantite in [(0, "B-08", 50), (0, "A-02", 4), (1, "A-09", 6), (1, "QUAI-01", 10)]:
+        client.post("/implantations/", json={
+            "article_id": articles[article], "emplacement_id": emplacements[code], "quantite": quantite,
+            "seuil_minimum": 0
+        })
+    commande = _unallocated(db_engine, "CMD-1", [(articles[0], 3), (articles[1], 20)])
+    return articles, emplacements, commande
+
+def _unallocated(db_engine, reference: str, lignes) -> str:
+    """A reserved commande holding no stock: the API reserves on creation, this one predates reservations"""
+    commande = str(uuid4())
+    with db_engine.begin() as connection:
+        connection.execute(insert(Commande), [{"id": commande, "reference": reference, "etat": EtatCommande.RESERVEE}])
+        connection.execute(insert(LigneCommande), [
+            {"id": str(uuid4()), "commande_id": commande, "article_id": article, "quantite": quantite}
+            for article, quantite in lignes
+        ])
+    return commande
+
+def test_prepare_commande_route(client: TestClient, db_engine, rayons):
+    """Test that picks follow the route, unparsable locations last, and shortfalls are reported"""
+    articles, emplacements, commande = rayons
+    response = client.post("/commandes/preparation", json={"commande_ids": [commande]})
+    assert response.status_code == 200
+    tournee = response.json()
+    # The 3 units come from A-02 (on the way) rather than B-08; QUAI-01 has no aisle and comes last
+    assert [(m["source_id"], m["quantite"], m["ordre"]) for m in tournee["missions"]] == [
+        (emplacements["A-02"], 3, 1), (emplacements["A-09"], 6, 2), (emplacements["QUAI-01"], 10, 3)
+    ]
+    assert {m["tournee_id"] for m in tournee["missions"]} == {tournee["tournee_id"]}
+    assert {m["type"] for m in tournee["missions"]} == {"Préparation commande"}
+    assert tournee["lignes_non_servies"] == [{"commande_id": commande, "article_id": articles[1], "manque": 4}]
+
+    # A prepared commande is not planned twice
+    assert client.get(f"/commandes/{commande}").json()["etat"] == "Préparée"
+    tournee = client.post("/commandes/preparation", json={"commande_ids": [commande]}).json()
+    assert tournee["missions"] == [] and tournee["tournee_id"] is None
+
+    # Stock already promised to open missions is not picked twice
+    autre = _unallocated(db_engine, "CMD-2", [(articles[0], 3)])
+    tournee = client.post("/commandes/preparation", json={"commande_ids": [autre]}).json()
+    assert [(m["source_id"], m["quantite"]) for m in tournee["missions"]] == [(emplacements["B-08"], 3)]
+
+def test_prepare_rejects_unreserved_commandes(client: TestClient, rayons):
+    """Test that unknown or unreserved commandes are refused"""
+    articles, _, _ = rayons
+    brouillon = client.post("/commandes/", json={
+        "reference": "CMD-2", "etat": "Brouillon", "lignes": [{"article_id": articles[0], "quantite": 1}]
+    }).json()["id"]
+    assert client.post("/commandes/preparation", json={"commande_ids": [brouillon]}).status_code == 400
+    assert client.post("/commandes/preparation", json={"commande_ids": ["inconnue"]}).status_code == 400
+
+@pytest.mark.slow
+def test_prepare_wave_of_200_lines(db_session, query_counter):
+    """Test that a 200-line wave is routed and its missions created in a fixed number of statements"""
+    aleatoire = random.Random(17)
+    emplacements = [{"id": str(uuid4()), "code": f"{chr(65 + a)}-{b:02d}-01", "type": TypeEmplacement.STOCKAGE,
+                     "capacite_poids_kg": 500, "capacite_volume_m3": 2} for a in range(20) for b in range(1, 41)]
+    articles = [{"id": str(uuid4()), "sku": f"SKU-{n}", "designation": "Carton",
+                 "categorie": CategorieArticle.PRODUIT, "poids_kg": 1, "volume_m3": 0.01} for n in range(200)]
+    db_session.execute(insert(Emplacement), emplacements)
+    db_session.execute(insert(Article), articles)
+    db_session.execute(insert(Implantation), [
+        {"id": str(uuid4()), "article_id": article["id"], "emplacement_id": emplacement["id"],
+         "quantite": 20, "seuil_minimum": 0}
+        for article in articles for emplacement in aleatoire.sample(emplacements, 3)
+    ])
+    commandes = [{"id": str(uuid4()), "reference": f"CMD-{n}", "etat": EtatCommande.RESERVEE} for n in range(20)]
+    db_session.execute(insert(Commande), commandes)
+    db_session.execute(insert(LigneCommande), [
+        {"id": str(uuid4()), "commande_id": commandes[n % 20]["id"], "article_id": article["id"], "quantite": 5}
+        for n, article in enumerate(articles)
+    ])
+
+    query_counter.clear()
+    debut = time.perf_counter()
+    tournee = prepare_commandes(db_session, [c["id"] for c in commandes])
+    # The route itself is capped by BUDGET_2OPT; the margin absorbs slow CI runners
+    assert time.perf_counter() - debut < 1
+    assert len(tournee["missions"]) == 200 and not tournee["lignes_non_servies"]
+    # Commandes, lines, their allocations and the stock are read once; one UPDATE and one INSERT write them
+    assert [s.split()[0] for s in query_counter] == ["SELECT"] * 4 + ["UPDATE", "INSERT"]
@@ -0,0 +1,87 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.models import Article, Emplacement, Implantation
+from app.models.article import CategorieArticle
+from app.models.emplacement import TypeEmplacement
+from app.services.putaway import assign_putaway, capacity_index, suggest_putaway
+
+@pytest.fixture
+def quai(client: TestClient, sample_article):
+    """An article of 0.1 m3 / 1 kg, a reception dock short on weight, two storage locations and a shop floor"""
+    article = client.post("/articles/", json=dict(sample_article, poids_kg=1, volume_m3=0.1)).json()["id"]
+    emplacements = {
+        code: client.post("/emplacements/", json={
+            "code": code, "type": type, "capacite_poids_kg": poids, "capacite_volume_m3": volume
+        }).json()["id"]
+        for code, type, poids, volume in [
+            ("QUAI-01", "Réception", 3, 0.8),
+            ("A-01-01", "Zone de stockage", 500, 2),
+            ("A-01-02", "Zone de stockage", 500, 5),
+            ("V-01", "Surface de vente", 500, 0.6),
+        ]
+    }
+    client.post("/implantations/", json={
+        "article_id": article, "emplacement_id": emplacements["A-01-01"], "quantite": 10, "seuil_minimum": 0
+    })
+    return article, emplacements
+
+def test_suggest_best_fit(client: TestClient, quai):
+    """Test that the tightest location holding both the volume and the weight is suggested"""
+    article, emplacements = quai
+    response = client.get("/receptions/rangement", params={"article_id": article, "quantite": 5})
+    assert response.status_code == 200
+    data = response.json()
+    # QUAI-01 has the least volume left but only 3 kg; A-01-01 has 1 m3 left once loaded with 10 units
+    assert data["code"] == "A-01-01"
+    assert data["volume_restant_m3"] == pytest.approx(1.0)
+    assert data["poids_restant_kg"] == pytest.approx(490)
+
+    response = client.get("/receptions/rangement", params={"article_id": article, "quantite": 2})
+    assert response.json()["code"] == "QUAI-01"
+    response = client.get("/receptions/rangement", params={"article_id": article, "quantite": 5, "types": "Réception"})
+    assert response.status_code == 404
+    response = client.get("/receptions/rangement", params={"article_id": article, "quantite": 51})
+    assert response.status_code == 404
+    response = client.get("/receptions/rangement", params={"article_id": article, "quantite": 1, "types": "Surface de vente"})
+    assert response.status_code == 400
+    assert client.get("/receptions/rangement", params={"article_id": "inconnu", "quantite": 1}).status_code == 400
+
+def test_assign_stores_and_updates_index(client: TestClient, quai):
+    """Test that an assignment creates the reception, adds the stock and is reflected in the next suggestion"""
+    article, emplacements = quai
+    response = client.post("/receptions/rangement", json={"article_id": article, "quantite": 5, "fournisseur": "ACME"})
+    assert response.status_code == 200
+    assert response.json()["emplacement_id"] == emplacements["A-01-01"]
+    assert client.get(f"/stock/articles/{article}").json()["quantite_totale"] == 15
+
+    response = client.get("/receptions/rangement", params={"article_id": article, "quantite": 6})
+    assert response.json()["code"] == "A-01-02"
+
+    # Emptying A-01-01 through the implantation API makes it the best fit again
+    implantation = client.get("/implantations/").json()[0]
+    client.put(f"/implantations/{implantation['id']}", json={
+        "article_id": article, "emplacement_id": emplacements["A-01-01"], "quantite": 0, "seuil_minimum": 0
+    })
+    response = client.get("/receptions/rangement", params={"article_id": article, "quantite": 6})
+    assert response.json()["code"] == "A-01-01"
+
+def test_assign_rechecks_stale_index(db_session, query_counter):
+    """Test that stock moved behind the index's back is detected before storing"""
+    article = Article(sku="SKU-P1", designation="Palette", categorie=CategorieArticle.PRODUIT, poids_kg=1, volume_m3=1)
+    petit = Emplacement(code="S-01", type=TypeEmplacement.STOCKAGE, capacite_poids_kg=100, capacite_volume_m3=3)
+    grand = Emplacement(code="S-02", type=TypeEmplacement.STOCKAGE, capacite_poids_kg=100, capacite_volume_m3=10)
+    db_session.add_all([article, petit, grand])
+    db_session.flush()
+
+    assert suggest_putaway(db_session, article.id, 2).emplacement_id == petit.id
+    del query_counter[:]
+    assert suggest_putaway(db_session, article.id, 2).emplacement_id == petit.id
+    assert not any("GROUP BY" in statement for statement in query_counter)
+
+    # Another worker fills S-01 without this process knowing
+    db_session.add(Implantation(article_id=article.id, emplacement_id=petit.id, quantite=3, seuil_minimum=0))
+    db_session.flush()
+    reception = assign_putaway(db_session, article.id, 2, "ACME")
+    assert reception.emplacement_id == grand.id
+    assert capacity_index.best_fit(db_session, 8, 8).emplacement_id == grand.id
+    assert capacity_index.best_fit(db_session, 9, 9) is None
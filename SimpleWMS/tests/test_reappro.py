@@ -0,0 +1,136 @@
+import time
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from app.database.database import Base
+from app.models import Allocation, Article, Commande, Emplacement, Implantation, LigneCommande, Mission
+from app.models.commande import EtatCommande
+from app.models.article import CategorieArticle
+from app.models.emplacement import TypeEmplacement
+from app.models.mission import EtatMission, TypeMission
+from app.services.reappro import generate_replenishment_missions
+
+def add_article(db, sku):
+    article = Article(sku=sku, designation=sku, categorie=CategorieArticle.PIECE, poids_kg=1, volume_m3=0.01)
+    db.add(article)
+    db.flush()
+    return article.id
+
+def add_emplacement(db, code):
+    emplacement = Emplacement(code=code, type=TypeEmplacement.STOCKAGE, capacite_poids_kg=1000, capacite_volume_m3=10)
+    db.add(emplacement)
+    db.flush()
+    return emplacement.id
+
+def add_implantation(db, article_id, emplacement_id, quantite, seuil_minimum, quantite_reservee=0):
+    implantation = Implantation(article_id=article_id, emplacement_id=emplacement_id, quantite=quantite,
+                                seuil_minimum=seuil_minimum, quantite_reservee=quantite_reservee)
+    db.add(implantation)
+    db.flush()
+    return implantation.id
+
+def reappro_missions(db):
+    return db.query(Mission).filter(Mission.type == TypeMission.REAPPRO).order_by(Mission.quantite.desc()).all()
+
+def test_reappro_from_fullest_source_and_idempotent(db_session):
+    """Test that a shortfall is served from the fullest source, once"""
+    article = add_article(db_session, "SKU-R1")
+    picking, reserve, vrac = (add_emplacement(db_session, code) for code in ("P-01", "R-01", "R-02"))
+    add_implantation(db_session, article, picking, quantite=2, seuil_minimum=10)
+    add_implantation(db_session, article, reserve, quantite=30, seuil_minimum=10)
+    add_implantation(db_session, article, vrac, quantite=15, seuil_minimum=10)
+
+    resultat = generate_replenishment_missions(db_session)
+    assert resultat == {"implantations_sous_seuil": 1, "missions_creees": 1, "quantite_planifiee": 8, "sans_source": 0}
+    (mission,) = reappro_missions(db_session)
+    assert (mission.source_id, mission.destination_id, mission.quantite) == (reserve, picking, 8)
+    assert mission.etat == EtatMission.A_FAIRE
+
+    # The open mission covers the shortfall: a second run creates nothing
+    assert generate_replenishment_missions(db_session)["missions_creees"] == 0
+    assert len(reappro_missions(db_session)) == 1
+
+def test_reappro_splits_and_respects_open_missions(db_session):
+    """Test splitting a shortfall over several sources, net of stock already promised"""
+    article = add_article(db_session, "SKU-R2")
+    orphelin = add_article(db_session, "SKU-R3")
+    picking, reserve, vrac, autre = (add_emplacement(db_session, code) for code in ("P-02", "R-03", "R-04", "P-03"))
+    add_implantation(db_session, article, picking, quantite=0, seuil_minimum=25)
+    add_implantation(db_session, article, reserve, quantite=30, seuil_minimum=10)
+    add_implantation(db_session, article, vrac, quantite=20, seuil_minimum=5)
+    add_implantation(db_session, orphelin, autre, quantite=1, seuil_minimum=5)
+    # 12 units of the reserve are already promised to another move
+    db_session.add(Mission(type=TypeMission.DEPLACEMENT, etat=EtatMission.A_FAIRE, article_id=article,
+                           source_id=reserve, destination_id=autre, quantite=12))
+    db_session.flush()
+
+    resultat = generate_replenishment_missions(db_session)
+    assert resultat["sans_source"] == 1
+    assert [(m.source_id, m.quantite) for m in reappro_missions(db_session)] == [(vrac, 15), (reserve, 8)]
+
+def test_reappro_leaves_reserved_stock(db_session):
+    """Test that stock reserved for commandes is no surplus, and a pick of it is not counted twice"""
+    article = add_article(db_session, "SKU-R5")
+    picking, reserve, vrac = (add_emplacement(db_session, code) for code in ("P-05", "R-06", "R-07"))
+    add_implantation(db_session, article, picking, quantite=0, seuil_minimum=20)
+    tenue = add_implantation(db_session, article, reserve, quantite=30, seuil_minimum=10, quantite_reservee=15)
+    add_implantation(db_session, article, vrac, quantite=14, seuil_minimum=10)
+    # 6 of the 15 reserved units are already being picked
+    commande = Commande(reference="CMD-R5", etat=EtatCommande.RESERVEE)
+    db_session.add(commande)
+    db_session.flush()
+    ligne = LigneCommande(commande_id=commande.id, article_id=article, quantite=15)
+    preparation = Mission(type=TypeMission.PREPARATION, etat=EtatMission.A_FAIRE, article_id=article,
+                          source_id=reserve, destination_id=None, quantite=6)
+    db_session.add_all([ligne, preparation])
+    db_session.flush()
+    db_session.add(Allocation(ligne_id=ligne.id, implantation_id=tenue, quantite=6, mission_id=preparation.id))
+    db_session.flush()
+
+    resultat = generate_replenishment_missions(db_session)
+    assert resultat["quantite_planifiee"] == 9
+    assert [(m.source_id, m.quantite) for m in reappro_missions(db_session)] == [(reserve, 5), (vrac, 4)]
+
+def test_reappro_dry_run(db_session):
+    """Test that a dry run plans without writing"""
+    article = add_article(db_session, "SKU-R4")
+    add_implantation(db_session, article, add_emplacement(db_session, "P-04"), quantite=0, seuil_minimum=5)
+    add_implantation(db_session, article, add_emplacement(db_session, "R-05"), quantite=50, seuil_minimum=5)
+
+    resultat = generate_replenishment_missions(db_session, dry_run=True)
+    assert resultat["missions_creees"] == 0 and resultat["quantite_planifiee"] == 5
+    assert reappro_missions(db_session) == []
+
+@pytest.mark.slow
+def test_reappro_100k_implantations(tmp_path):
+    """Test that 100k implantations are processed in seconds"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'reappro.db'}")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    articles, emplacements = 5000, 20
+    with engine.begin() as connection:
+        connection.execute(insert(Article), [
+            {"id": f"a{i}", "sku": f"SKU-{i}", "designation": "x", "categorie": CategorieArticle.PIECE,
+             "poids_kg": 1, "volume_m3": 0.01} for i in range(articles)
+        ])
+        connection.execute(insert(Emplacement), [
+            {"id": f"e{j}", "code": f"E-{j}", "type": TypeEmplacement.STOCKAGE,
+             "capacite_poids_kg": 1000, "capacite_volume_m3": 10} for j in range(emplacements)
+        ])
+        # One location in four is below its minimum
+        connection.execute(insert(Implantation), [
+            {"id": f"i{i}-{j}", "article_id": f"a{i}", "emplacement_id": f"e{j}",
+             "quantite": 2 if j % 4 == 0 else 50, "seuil_minimum": 10}
+            for i in range(articles) for j in range(emplacements)
+        ])
+
+    with Session() as db:
+        debut = time.perf_counter()
+        resultat = generate_replenishment_missions(db)
+        duree = time.perf_counter() - debut
+        assert resultat["missions_creees"] == articles * emplacements // 4
+        assert duree < 10
+        debut = time.perf_counter()
+        assert generate_replenishment_missions(db)["missions_creees"] == 0
+        assert time.perf_counter() - debut < 10
+    engine.dispose()
@@ -1,5 +1,8 @@
 import pytest
+from datetime import date, time
 from fastapi.testclient import TestClient
+from sqlalchemy import insert
+from app.models.reservation import Reservation
 
 def test_create_reservation(client: TestClient, sample_salle, sample_reservation):
     """Test creation of a new reservation"""
@@ -20,6 +23,18 @@ def test_create_reservation(client: TestClient, sample_salle, sample_reservation
     assert data["utilisateur"] == sample_reservation["utilisateur"]
     assert "id" in data
 
+def test_create_reservation_statements(client: TestClient, sample_salle, sample_reservation, query_counter):
+    """Test that a booking of an indexed day is one INSERT and one overlap check, with no read before or after"""
+    salle_id = client.post("/salles/", json=sample_salle).json()["id"]
+    client.get(f"/salles/{salle_id}/disponibilite", params={"jour": sample_reservation["date"], "debut": "08:00",
+                                                           "fin": "20:00"})
+    query_counter.clear()
+    response = client.post("/reservations/", json=dict(sample_reservation, salle_id=salle_id))
+    assert response.status_code == 200
+    # The availability check is served by the index; the locking overlap read runs in the writing transaction
+    assert [s.split()[0] for s in query_counter] == ["INSERT", "SELECT"]
+    assert query_counter[1].startswith("SELECT reservations.id") and "FROM salles LEFT OUTER JOIN" in query_counter[1]
+
 def test_create_reservation_conflict(client: TestClient, sample_salle, sample_reservation):
     """Test that creating conflicting reservations fails"""
     # Create salle
@@ -179,3 +194,130 @@ def test_create_reservation_with_comment(client: TestClient, sample_salle, sampl
     assert response.status_code == 200
     data = response.json()
     assert data["commentaire"] == "Réunion équipe dev"
+
+def test_salle_creneaux_libres(client: TestClient, sample_salle, sample_reservation):
+    """Test listing free slots of a room, before and after a deletion"""
+    salle_response = client.post("/salles/", json=sample_salle)
+    salle_id = salle_response.json()["id"]
+
+    reservation_data = sample_reservation.copy()
+    reservation_data["salle_id"] = salle_id
+    reservation_data["duree_minutes"] = 120
+    create_response = client.post("/reservations/", json=reservation_data)
+    reservation_id = create_response.json()["id"]
+
+    params = {"jour": sample_reservation["date"], "debut": "08:00:00", "fin": "18:00:00"}
+    response = client.get(f"/salles/{salle_id}/creneaux", params=params)
+    assert response.status_code == 200
+    assert response.json() == [
+        {"debut": "08:00:00", "fin": "14:00:00"},
+        {"debut": "16:00:00", "fin": "18:00:00"},
+    ]
+
+    client.delete(f"/reservations/{reservation_id}")
+    response = client.get(f"/salles/{salle_id}/creneaux", params=params)
+    assert response.json() == [{"debut": "08:00:00", "fin": "18:00:00"}]
+
+def test_salle_disponibilite(client: TestClient, sample_salle, sample_reservation):
+    """Test checking whether a room is free over an interval"""
+    salle_response = client.post("/salles/", json=sample_salle)
+    salle_id = salle_response.json()["id"]
+
+    reservation_data = sample_reservation.copy()
+    reservation_data["salle_id"] = salle_id
+    client.post("/reservations/", json=reservation_data)
+
+    params = {"jour": sample_reservation["date"], "debut": "13:00:00", "fin": "14:30:00"}
+    response = client.get(f"/salles/{salle_id}/disponibilite", params=params)
+    assert response.status_code == 200
+    assert response.json()["disponible"] is False
+
+    params["fin"] = "14:00:00"
+    response = client.get(f"/salles/{salle_id}/disponibilite", params=params)
+    assert response.json()["disponible"] is True
+
+    response = client.get("/salles/nonexistent-id/disponibilite", params=params)
+    assert response.status_code == 404
+
+def test_create_recurring_reservation(client: TestClient, sample_salle, sample_reservation, query_counter):
+    """Test that a weekly series books its free occurrences in one INSERT and reports the taken ones"""
+    salle_id = client.post("/salles/", json=sample_salle).json()["id"]
+    existante = client.post("/reservations/", json=dict(
+        sample_reservation, salle_id=salle_id, date="2025-01-29", heure="14:30:00"
+    )).json()["id"]
+
+    query_counter.clear()
+    response = client.post("/reservations/recurrentes", json=dict(
+        sample_reservation, salle_id=salle_id, recurrence={"frequence": "Hebdomadaire", "nombre": 4}
+    ))
+    assert response.status_code == 200
+    data = response.json()
+    assert [r["date"] for r in data["reservations"]] == ["2025-01-15", "2025-01-22", "2025-02-05"]
+    assert data["conflits"] == [{"date": "2025-01-29", "heure": "14:00:00", "reservation_id": existante}]
+    # One read to preload the series, one to re-check it in the writing transaction
+    assert len([s for s in query_counter if s.startswith("SELECT reservations")]) == 2
+    assert len([s for s in query_counter if s.startswith("INSERT INTO reservations")]) == 1
+
+    # The booked occurrences are taken for the next requests
+    response = client.post("/reservations/", json=dict(sample_reservation, salle_id=salle_id, date="2025-02-05"))
+    assert response.status_code == 400
+    assert len(client.get("/reservations/").json()) == 4
+
+def test_overlap_rechecked_in_transaction(client: TestClient, db_engine, sample_salle, sample_reservation):
+    """Test that an overlap the worker's index has not seen is still refused when writing"""
+    salle_id = client.post("/salles/", json=sample_salle).json()["id"]
+    for jour in ("2025-01-15", "2025-01-16", "2025-01-17"):
+        client.get(f"/salles/{salle_id}/disponibilite", params={"jour": jour, "debut": "08:00", "fin": "20:00"})
+    # Another worker books 13:30-14:30 once this worker's index is loaded
+    with db_engine.begin() as connection:
+        connection.execute(insert(Reservation), [{"id": "autre", "salle_id": salle_id, "date": date(2025, 1, 16),
+                                                  "heure": time(13, 30), "duree_minutes": 60,
+                                                  "utilisateur": "autre@example.com"}])
+
+    data = client.post("/reservations/recurrentes", json=dict(
+        sample_reservation, salle_id=salle_id, recurrence={"frequence": "Quotidienne", "nombre": 3}
+    )).json()
+    assert [r["date"] for r in data["reservations"]] == ["2025-01-15", "2025-01-17"]
+    assert data["conflits"] == [{"date": "2025-01-16", "heure": "14:00:00", "reservation_id": "autre"}]
+
+    # Same for a single booking, the day being indexed by an earlier one
+    assert client.post("/reservations/", json=dict(sample_reservation, salle_id=salle_id, date="2025-01-18",
+                                                   heure="09:00:00")).status_code == 200
+    with db_engine.begin() as connection:
+        connection.execute(insert(Reservation), [{"id": "encore", "salle_id": salle_id, "date": date(2025, 1, 18),
+                                                  "heure": time(13, 45), "duree_minutes": 30,
+                                                  "utilisateur": "autre@example.com"}])
+    response = client.post("/reservations/", json=dict(sample_reservation, salle_id=salle_id, date="2025-01-18"))
+    assert response.status_code == 400
+    assert len(client.get("/reservations/").json()) == 5
+
+def test_update_keeps_duration(client: TestClient, sample_salle, sample_reservation):
+    """Test that a PUT without duree_minutes keeps the booked duration"""
+    salle_id = client.post("/salles/", json=sample_salle).json()["id"]
+    reservation = client.post("/reservations/", json=dict(sample_reservation, salle_id=salle_id,
+                                                          duree_minutes=90)).json()
+    response = client.put(f"/reservations/{reservation['id']}", json=dict(sample_reservation, salle_id=salle_id,
+                                                                           commentaire="Projet"))
+    assert response.status_code == 200
+    assert (response.json()["duree_minutes"], response.json()["commentaire"]) == (90, "Projet")
+
+def test_recurring_reservation_rules(client: TestClient, sample_salle, sample_reservation):
+    """Test monthly and daily expansion and the bounds of a series"""
+    salle_id = client.post("/salles/", json=sample_salle).json()["id"]
+
+    def serie(jour, **recurrence):
+        return client.post("/reservations/recurrentes", json=dict(
+            sample_reservation, salle_id=salle_id, date=jour, recurrence=recurrence
+        ))
+
+    # Months without a 31st are skipped
+    data = serie("2025-01-31", frequence="Mensuelle", jusqu_au="2025-06-30").json()
+    assert [r["date"] for r in data["reservations"]] == ["2025-01-31", "2025-03-31", "2025-05-31"]
+    data = serie("2025-03-03", frequence="Quotidienne", intervalle=2, jusqu_au="2025-03-09").json()
+    assert [r["date"] for r in data["reservations"]] == ["2025-03-03", "2025-03-05", "2025-03-07", "2025-03-09"]
+
+    assert serie("2025-04-01", frequence="Hebdomadaire").status_code == 400
+    assert serie("2025-04-01", frequence="Hebdomadaire", nombre=2, jusqu_au="2025-05-01").status_code == 400
+    assert serie("2025-04-01", frequence="Hebdomadaire", jusqu_au="2025-03-01").status_code == 400
+    assert serie("2025-04-01", frequence="Quotidienne", nombre=400).status_code == 400
+    assert serie("2025-04-01", frequence="Quotidienne", nombre=0).status_code == 422
@@ -1,5 +1,10 @@
+import csv
+import io
+import json
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import delete, select, update
+from app.models.salle import Salle
 
 def test_create_salle(client: TestClient, sample_salle):
     """Test creation of a new salle"""
@@ -113,6 +118,23 @@ def test_update_salle_not_found(client: TestClient, sample_salle):
     assert response.status_code == 404
     assert "Salle non trouvée" in response.json()["detail"]
 
+def test_patch_salle(client: TestClient, sample_salle, query_counter):
+    """Test that a PATCH writes the sent fields in one UPDATE, bumps the version and refreshes the cache"""
+    salle_id = client.post("/salles/", json=sample_salle).json()["id"]
+    client.get(f"/salles/{salle_id}")
+
+    query_counter.clear()
+    response = client.patch(f"/salles/{salle_id}", json={"disponible": False})
+    assert response.status_code == 200
+    assert response.json() == dict(sample_salle, id=salle_id, disponible=False)
+    assert [s.split()[0] for s in query_counter] == ["UPDATE"]
+    assert "capacite" not in query_counter[0].split("WHERE")[0]
+
+    response = client.get(f"/salles/{salle_id}")
+    assert response.headers["etag"] == '"v2"' and response.json()["disponible"] is False
+    assert client.patch(f"/salles/{salle_id}", json={"capacite": None}).status_code == 400
+    assert client.patch("/salles/nonexistent-id", json={"capacite": 4}).status_code == 404
+
 def test_delete_salle(client: TestClient, sample_salle):
     """Test deleting a salle"""
     # Create salle
@@ -132,3 +154,160 @@ def test_delete_salle_not_found(client: TestClient):
     response = client.delete("/salles/nonexistent-id")
     assert response.status_code == 404
     assert "Salle non trouvée" in response.json()["detail"]
+
+def test_search_salles(client: TestClient, sample_salle):
+    """Test searching free rooms ranked by capacity fit then start time"""
+    salle_ids = {}
+    for nom, capacite, disponible in (("Petite", 5, True), ("Moyenne", 12, True),
+                                      ("Grande", 30, True), ("Fermée", 12, False)):
+        salle = sample_salle.copy()
+        salle.update(nom=nom, capacite=capacite, disponible=disponible)
+        salle_ids[nom] = client.post("/salles/", json=salle).json()["id"]
+
+    client.post("/reservations/", json={
+        "salle_id": salle_ids["Moyenne"],
+        "date": "2025-01-15",
+        "heure": "08:00:00",
+        "duree_minutes": 120,
+        "utilisateur": "user@example.com"
+    })
+
+    response = client.get("/salles/recherche", params={
+        "date_debut": "2025-01-15", "capacite_min": 10, "duree_minutes": 60, "limit": 3
+    })
+    assert response.status_code == 200
+    data = response.json()
+    assert [(c["salle"]["nom"], c["debut"], c["fin"]) for c in data] == [
+        ("Moyenne", "10:00:00", "11:00:00"),
+        ("Moyenne", "10:30:00", "11:30:00"),
+        ("Moyenne", "11:00:00", "12:00:00"),
+    ]
+
+    response = client.get("/salles/recherche", params={"date_debut": "2025-01-15", "capacite_min": 20})
+    assert {c["salle"]["nom"] for c in response.json()} == {"Grande"}
+
+def test_search_salles_invalid_period(client: TestClient):
+    """Test that an inverted search period is rejected"""
+    response = client.get("/salles/recherche", params={"date_debut": "2025-01-15", "date_fin": "2025-01-10"})
+    assert response.status_code == 400
+
+def test_list_salles_page(client: TestClient, sample_salle):
+    """Test walking salles page by page with the opaque cursor"""
+    for i in range(5):
+        client.post("/salles/", json=dict(sample_salle, nom=f"Salle {i}"))
+
+    ids, cursor = [], None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/salles/page", params=params)
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["items"]) <= 2
+        ids += [salle["id"] for salle in data["items"]]
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len(ids) == 5
+    assert ids == sorted(ids)
+
+def test_list_salles_page_invalid_cursor(client: TestClient):
+    """Test that a forged cursor is rejected"""
+    response = client.get("/salles/page", params={"cursor": "pas-un-curseur"})
+    assert response.status_code == 400
+    # Valid base64 and JSON, but not a key: [{"a": 1}]
+    response = client.get("/salles/page", params={"cursor": "W3siYSI6IDF9XQ"})
+    assert response.status_code == 400
+
+def test_export_salles(client: TestClient, sample_salle, monkeypatch):
+    """Test streaming salles as NDJSON and CSV, with a filter"""
+    from app.services import export as export_service
+    monkeypatch.setattr(export_service, "EXPORT_BATCH_SIZE", 2)
+    for i in range(5):
+        client.post("/salles/", json=dict(sample_salle, nom=f"Salle {i}", disponible=i % 2 == 0))
+
+    response = client.get("/salles/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lignes = [json.loads(ligne) for ligne in response.text.splitlines()]
+    assert sorted(ligne["nom"] for ligne in lignes) == [f"Salle {i}" for i in range(5)]
+
+    response = client.get("/salles/export", params={"format": "csv", "disponible": False})
+    assert response.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert sorted(row["nom"] for row in rows) == ["Salle 1", "Salle 3"]
+    assert set(rows[0]) == {"id", "nom", "capacite", "localisation", "disponible", "version", "date_modification"}
+
+def test_get_salle_cached(client: TestClient, sample_salle, query_counter):
+    """Test that repeated reads of a salle are served by the cache and refreshed after an update"""
+    salle_id = client.post("/salles/", json=sample_salle).json()["id"]
+    client.get(f"/salles/{salle_id}")
+
+    query_counter.clear()
+    assert client.get(f"/salles/{salle_id}").json()["nom"] == sample_salle["nom"]
+    # Only the version lookup behind the ETag reaches the database
+    assert not [s for s in query_counter if "salles.nom" in s]
+
+    client.put(f"/salles/{salle_id}", json=dict(sample_salle, nom="Salle renommée"))
+    assert client.get(f"/salles/{salle_id}").json()["nom"] == "Salle renommée"
+
+    # The PUT reads the row from the database; the update invalidated the cached copy
+    stats = client.get("/cache/stats").json()
+    assert stats["hits"] >= 1 and stats["misses"] >= 2
+
+def test_write_paths_bypass_cache(client: TestClient, db_engine, sample_salle):
+    """Test that PUT and DELETE read the row from the database, not a stale cached copy"""
+    salle_id = client.post("/salles/", json=sample_salle).json()["id"]
+    client.get(f"/salles/{salle_id}")
+    # Another worker renames the room: the cached copy still has the old name
+    with db_engine.begin() as connection:
+        connection.execute(update(Salle).where(Salle.id == salle_id).values(nom="Ailleurs"))
+
+    client.put(f"/salles/{salle_id}", json=sample_salle)
+    with db_engine.connect() as connection:
+        assert connection.scalar(select(Salle.nom).where(Salle.id == salle_id)) == sample_salle["nom"]
+
+    client.get(f"/salles/{salle_id}")
+    with db_engine.begin() as connection:
+        connection.execute(delete(Salle).where(Salle.id == salle_id))
+    assert client.delete(f"/salles/{salle_id}").status_code == 404
+    assert client.put(f"/salles/{salle_id}", json=sample_salle).status_code == 404
+
+def test_get_salle_conditional(client: TestClient, sample_salle, query_counter):
+    """Test ETag / If-None-Match on a single salle"""
+    salle_id = client.post("/salles/", json=sample_salle).json()["id"]
+    response = client.get(f"/salles/{salle_id}")
+    etag = response.headers["etag"]
+    assert etag == '"v1"'
+    assert "last-modified" in response.headers
+
+    query_counter.clear()
+    response = client.get(f"/salles/{salle_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    assert not [s for s in query_counter if "salles.nom" in s]
+
+    response = client.get(f"/salles/{salle_id}", headers={"If-Modified-Since": response.headers["last-modified"]})
+    assert response.status_code == 304
+
+    client.put(f"/salles/{salle_id}", json=dict(sample_salle, capacite=25))
+    response = client.get(f"/salles/{salle_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] == '"v2"'
+    assert response.json()["capacite"] == 25
+
+def test_list_salles_conditional(client: TestClient, sample_salle):
+    """Test that the list ETag changes only when a listed salle changes"""
+    client.post("/salles/", json=sample_salle)
+    etag = client.get("/salles/").headers["etag"]
+
+    assert client.get("/salles/", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/salles/", params={"disponible": False}, headers={"If-None-Match": etag}).status_code == 200
+
+    client.post("/salles/", json=dict(sample_salle, nom="Salle B"))
+    response = client.get("/salles/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()) == 2
@@ -1,9 +1,16 @@
 import pytest
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, time
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
 from app.services import salle as salle_service
 from app.services import reservation as reservation_service
 from app.schemas.salle import SalleCreate
 from app.schemas.reservation import ReservationCreate
+from app.models.reservation import Reservation
+from sqlalchemy.exc import IntegrityError
+from app.database.database import Base
 
 def test_salle_service_create(db_session):
     """Test salle service creation"""
@@ -88,3 +95,211 @@ def test_reservation_service_conflict_prevention(db_session):
     
     with pytest.raises(ValueError, match="Cette salle est déjà réservée à ce créneau"):
         reservation_service.create_reservation(db_session, reservation2_data)
+
+def test_reservation_service_variable_duration_overlap(db_session):
+    """Test that bookings longer than one hour block every overlapping slot"""
+    salle = salle_service.create_salle(
+        db_session, SalleCreate(nom="Test Salle", capacite=10, localisation="Test", disponible=True)
+    )
+    test_date = date(2025, 1, 15)
+
+    reservation_service.create_reservation(db_session, ReservationCreate(
+        salle_id=salle.id,
+        date=test_date,
+        heure=time(14, 0),
+        duree_minutes=90,
+        utilisateur="user1@example.com"
+    ))
+
+    assert reservation_service.check_availability(db_session, salle.id, test_date, time(15, 0)) is False
+    assert reservation_service.check_availability(db_session, salle.id, test_date, time(13, 30), 30) is True
+    assert reservation_service.check_availability(db_session, salle.id, test_date, time(15, 30)) is True
+
+    with pytest.raises(ValueError, match="Cette salle est déjà réservée à ce créneau"):
+        reservation_service.create_reservation(db_session, ReservationCreate(
+            salle_id=salle.id,
+            date=test_date,
+            heure=time(13, 30),
+            duree_minutes=60,
+            utilisateur="user2@example.com"
+        ))
+
+def test_reservation_service_free_slots(db_session):
+    """Test listing free slots around existing bookings"""
+    salle = salle_service.create_salle(
+        db_session, SalleCreate(nom="Test Salle", capacite=10, localisation="Test", disponible=True)
+    )
+    test_date = date(2025, 1, 15)
+    for heure, duree in ((time(9, 0), 60), (time(11, 0), 120)):
+        reservation_service.create_reservation(db_session, ReservationCreate(
+            salle_id=salle.id, date=test_date, heure=heure, duree_minutes=duree, utilisateur="user@example.com"
+        ))
+
+    slots = reservation_service.list_free_slots(db_session, salle.id, test_date, time(8, 0), time(18, 0))
+    assert slots == [
+        (time(8, 0), time(9, 0)),
+        (time(10, 0), time(11, 0)),
+        (time(13, 0), time(18, 0)),
+    ]
+
+    slots = reservation_service.list_free_slots(db_session, salle.id, test_date, time(8, 0), time(18, 0), 90)
+    assert slots == [(time(13, 0), time(18, 0))]
+
+def test_reservation_unique_slot_enforced_by_database(db_session):
+    """Test that the database itself rejects two bookings of the same slot"""
+    salle = salle_service.create_salle(
+        db_session, SalleCreate(nom="Test Salle", capacite=10, localisation="Test", disponible=True)
+    )
+    for utilisateur in ("user1@example.com", "user2@example.com"):
+        db_session.add(Reservation(salle_id=salle.id, date=date(2025, 1, 15), heure=time(14, 0), utilisateur=utilisateur))
+
+    with pytest.raises(IntegrityError):
+        db_session.flush()
+
+def test_reservation_concurrent_creation_single_winner(tmp_path):
+    """Test that concurrent bookings of one slot yield exactly one success"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'concurrency.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    with SessionLocal() as db:
+        salle = salle_service.create_salle(db, SalleCreate(nom="Salle", capacite=10, localisation="Test"))
+        salle_id = salle.id
+
+    threads = 16
+    barrier = threading.Barrier(threads)
+
+    def book(n):
+        with SessionLocal() as db:
+            barrier.wait()
+            try:
+                reservation_service.create_reservation(db, ReservationCreate(
+                    salle_id=salle_id, date=date(2025, 1, 15), heure=time(14, 0), utilisateur=f"user{n}@example.com"
+                ))
+                return True
+            except ValueError:
+                return False
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(book, range(threads)))
+
+    assert results.count(True) == 1
+    with SessionLocal() as db:
+        assert db.query(Reservation).filter(Reservation.salle_id == salle_id).count() == 1
+    engine.dispose()
+
+def test_keyset_pagination_is_stable(db_session):
+    """Test that a page cursor skips rows already seen even after inserts"""
+    for i in range(4):
+        salle_service.create_salle(db_session, SalleCreate(nom=f"Salle {i}", capacite=10, localisation="RDC"))
+
+    premiere, cursor = salle_service.list_salles_page(db_session, limit=2)
+    assert len(premiere) == 2 and cursor is not None
+
+    # A row inserted before the cursor must not shift the next page
+    salle_service.create_salle(db_session, SalleCreate(nom="Salle ajoutée", capacite=10, localisation="RDC"))
+    seconde, _ = salle_service.list_salles_page(db_session, cursor=cursor, limit=10)
+    assert not {s.id for s in premiere} & {s.id for s in seconde}
+    assert all(s.id > premiere[-1].id for s in seconde)
+
+    with pytest.raises(ValueError):
+        salle_service.list_salles_page(db_session, cursor="%%%")
+    # Well-formed cursors holding anything but a key are refused too
+    from app.services.pagination import encode_cursor
+    for valeur in ({"a": 1}, 12, None, ["a", "b"]):
+        with pytest.raises(ValueError):
+            salle_service.list_salles_page(db_session, cursor=encode_cursor(valeur))
+
+def test_memory_cache_ttl_and_lru():
+    """Test that the memory backend expires entries and evicts the least recently used"""
+    from app.services.cache import MemoryBackend
+    now = [0.0]
+    backend = MemoryBackend(maxsize=2, ttl=10, clock=lambda: now[0])
+    backend.set("a", 1)
+    backend.set("b", 2)
+    assert backend.get("a") == 1  # "b" becomes the least recently used
+    backend.set("c", 3)
+    assert backend.get("b") is None
+    assert backend.get("a") == 1 and backend.get("c") == 3
+
+    now[0] = 10
+    assert backend.get("a") is None
+    assert len(backend) == 1
+
+def test_availability_index_expiry_and_eviction(db_session):
+    """Test that index buckets are reloaded after their TTL and the least recently used are evicted"""
+    from app.services.availability import AvailabilityIndex
+    now = [0.0]
+    index = AvailabilityIndex(ttl=30, maxsize=2, clock=lambda: now[0])
+    salle = salle_service.create_salle(db_session, SalleCreate(nom="Salle TTL", capacite=4, localisation="RDC"))
+    jour = date(2025, 1, 15)
+    assert index.is_free(db_session, salle.id, jour, time(9, 0))
+
+    # Booked by another worker: not seen until the bucket expires
+    db_session.add(Reservation(salle_id=salle.id, date=jour, heure=time(9, 0), utilisateur="autre@example.com"))
+    db_session.flush()
+    assert index.is_free(db_session, salle.id, jour, time(9, 0))
+    now[0] = 30
+    assert not index.is_free(db_session, salle.id, jour, time(9, 0))
+
+    index.preload(db_session, [salle.id], date(2025, 2, 1), date(2025, 2, 2))
+    assert len(index._journees) == 2 and (salle.id, jour) not in index._journees
+    # A range larger than the index is not preloaded at all
+    index.preload(db_session, [salle.id], date(2025, 3, 1), date(2025, 3, 3))
+    assert (salle.id, date(2025, 3, 1)) not in index._journees
+
+def test_article_lookup_cache_invalidation(db_session, query_counter):
+    """Test that SKU lookups are served from the cache until the article changes"""
+    from app.schemas.article import ArticleCreate, ArticleUpdate
+    from app.services import article as article_service
+    from app.services.cache import cache
+
+    donnees = dict(sku="SKU-CACHE", designation="Écrou M6", categorie="Pièce détachée", poids_kg=0.01, volume_m3=0.0001)
+    article = article_service.create_article(db_session, ArticleCreate(**donnees))
+    assert article_service.get_article_by_sku(db_session, "SKU-CACHE").id == article.id
+    db_session.expunge_all()
+
+    query_counter.clear()
+    cached = article_service.get_article_by_sku(db_session, "SKU-CACHE")
+    assert query_counter == []
+    assert cached.id == article.id and cached.categorie.name == "PIECE"
+    assert cache.stats()["hits"] == 1
+
+    article_service.update_article(db_session, article.id, ArticleUpdate(**dict(donnees, sku="SKU-RENOMME")))
+    assert article_service.get_article_by_sku(db_session, "SKU-CACHE") is None
+    assert article_service.get_article_by_sku(db_session, "SKU-RENOMME").designation == "Écrou M6"
+
+    article_service.delete_article(db_session, article.id)
+    assert article_service.get_article_by_sku(db_session, "SKU-RENOMME") is None
+
+def test_article_patch_evicts_old_sku(db_session):
+    """Test that renaming an article SKU through a PATCH evicts the old SKU from the cache"""
+    from app.schemas.article import ArticleCreate, ArticlePatch
+    from app.services import article as article_service
+
+    donnees = dict(sku="SKU-PATCH", designation="Vis", categorie="Consommable", poids_kg=0.01, volume_m3=0.0001)
+    article_id = article_service.create_article(db_session, ArticleCreate(**donnees)).id
+    assert article_service.get_article_by_sku(db_session, "SKU-PATCH").id == article_id
+
+    patched = article_service.patch_article(db_session, article_id, ArticlePatch(sku="SKU-PATCH-2"))
+    assert (patched["sku"], patched["designation"], patched["version"]) == ("SKU-PATCH-2", "Vis", 2)
+    db_session.expunge_all()
+    assert article_service.get_article_by_sku(db_session, "SKU-PATCH") is None
+    assert article_service.get_article_by_sku(db_session, "SKU-PATCH-2").id == article_id
+
+def test_article_version_bumped_on_update(db_session):
+    """Test that updating an article increments its row version"""
+    from app.schemas.article import ArticleCreate, ArticleUpdate
+    from app.services import article as article_service
+
+    donnees = dict(sku="SKU-VERSION", designation="Rondelle", categorie="Consommable", poids_kg=0.01, volume_m3=0.0001)
+    article = article_service.create_article(db_session, ArticleCreate(**donnees))
+    assert tuple(article_service.get_article_version(db_session, article.id))[0] == 1
+
+    article_service.update_article(db_session, article.id, ArticleUpdate(**dict(donnees, designation="Rondelle M6")))
+    version, date_modification = article_service.get_article_version(db_session, article.id)
+    assert version == 2
+    assert date_modification >= article.date_modification
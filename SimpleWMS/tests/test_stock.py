@@ -0,0 +1,60 @@
+import pytest
+from fastapi.testclient import TestClient
+
+@pytest.fixture
+def entrepot(client: TestClient, sample_article):
+    """Three articles, two of them stocked over three emplacements"""
+    articles = [
+        client.post("/articles/", json=dict(sample_article, sku=sku)).json()["id"]
+        for sku in ("SKU-A", "SKU-B", "SKU-C")
+    ]
+    emplacements = [
+        client.post("/emplacements/", json={
+            "code": code, "type": "Zone de stockage", "capacite_poids_kg": 500, "capacite_volume_m3": 2
+        }).json()["id"]
+        for code in ("A-01-01", "A-01-02", "B-02-01")
+    ]
+    for article, emplacement, quantite, seuil in [
+        (0, 0, 40, 10), (0, 1, 5, 10), (0, 2, 15, 10), (1, 1, 2, 20),
+    ]:
+        response = client.post("/implantations/", json={
+            "article_id": articles[article], "emplacement_id": emplacements[emplacement],
+            "quantite": quantite, "seuil_minimum": seuil
+        })
+        assert response.status_code == 200
+    return articles, emplacements
+
+def test_stock_by_article(client: TestClient, entrepot):
+    """Test total stock per article, including articles without stock"""
+    articles, _ = entrepot
+    data = client.get("/stock/articles").json()
+    assert [(s["sku"], s["quantite_totale"], s["nb_emplacements"]) for s in data] == [
+        ("SKU-A", 60, 3), ("SKU-B", 2, 1), ("SKU-C", 0, 0)
+    ]
+
+    response = client.get(f"/stock/articles/{articles[1]}")
+    assert response.status_code == 200
+    assert response.json()["quantite_totale"] == 2
+    assert client.get("/stock/articles/inconnu").status_code == 404
+
+def test_stock_by_emplacement(client: TestClient, entrepot):
+    """Test total stock and distinct articles per emplacement"""
+    data = client.get("/stock/emplacements", params={"type": "Zone de stockage"}).json()
+    assert [(s["code"], s["quantite_totale"], s["nb_articles"]) for s in data] == [
+        ("A-01-01", 40, 1), ("A-01-02", 7, 2), ("B-02-01", 15, 1)
+    ]
+    assert client.get("/stock/emplacements", params={"type": "Expédition"}).json() == []
+
+def test_below_threshold_follows_implantations(client: TestClient, entrepot):
+    """Test the below-threshold list, largest shortfall first, and that it reflects updates immediately"""
+    articles, emplacements = entrepot
+    data = client.get("/stock/sous-seuil").json()
+    assert [(s["sku"], s["code"], s["manque"]) for s in data] == [("SKU-B", "A-01-02", 18), ("SKU-A", "A-01-02", 5)]
+
+    implantation = data[1]
+    client.put(f"/implantations/{implantation['implantation_id']}", json={
+        "article_id": articles[0], "emplacement_id": emplacements[1], "quantite": 12, "seuil_minimum": 10
+    })
+    data = client.get("/stock/sous-seuil", params={"article_id": articles[0]}).json()
+    assert data == []
+    assert client.get(f"/stock/articles/{articles[0]}").json()["quantite_totale"] == 67
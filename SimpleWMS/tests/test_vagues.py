@@ -0,0 +1,121 @@
+import random
+import time
+from uuid import uuid4
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func, insert, update
+from app.models import Article, Commande, Emplacement, Implantation, LigneCommande, Mission
+from app.models.article import CategorieArticle
+from app.models.commande import EtatCommande
+from app.models.emplacement import TypeEmplacement
+from app.services.vague import group_by_articles, group_by_size, group_by_zone, plan_waves
+
+COMMANDES = {
+    "c1": {"vis": 1, "ecrou": 1, "clou": 1},
+    "c2": {"vis": 2, "ecrou": 1},
+    "c3": {"colle": 1, "pinceau": 1},
+    "c4": {"pinceau": 3},
+    "c5": {"clou": 1},
+}
+
+def test_group_by_articles():
+    """Test that commandes sharing articles end up in the same wave"""
+    assert group_by_articles(COMMANDES, max_commandes=2) == [["c1", "c2"], ["c3", "c4"], ["c5"]]
+    assert group_by_articles(COMMANDES, max_commandes=3) == [["c1", "c2", "c5"], ["c3", "c4"]]
+    # The line limit stops c2 from joining c1; c5 (one line) still fits
+    assert group_by_articles(COMMANDES, max_commandes=3, max_lignes=4) == [["c1", "c5"], ["c2", "c3"], ["c4"]]
+
+def test_group_by_size_and_zone():
+    """Test grouping by commande size and by storage zone"""
+    assert group_by_size(COMMANDES, max_commandes=2) == [["c5", "c4"], ["c3", "c2"], ["c1"]]
+    zones = {"vis": TypeEmplacement.STOCKAGE, "ecrou": TypeEmplacement.STOCKAGE, "clou": TypeEmplacement.VENTE,
+             "colle": TypeEmplacement.VENTE, "pinceau": TypeEmplacement.VENTE}
+    assert group_by_zone(COMMANDES, zones.get, max_commandes=10) == [["c1", "c2"], ["c3", "c4", "c5"]]
+
+@pytest.fixture
+def commandes(client: TestClient, sample_article):
+    """Three reserved commandes over two articles and a draft"""
+    articles = [client.post("/articles/", json=dict(sample_article, sku=sku)).json()["id"] for sku in ("SKU-1", "SKU-2")]
+    for article, code in zip(articles, ("A-01", "B-05")):
+        emplacement = client.post("/emplacements/", json={
+            "code": code, "type": "Zone de stockage", "capacite_poids_kg": 500, "capacite_volume_m3": 2
+        }).json()["id"]
+        client.post("/implantations/", json={
+            "article_id": article, "emplacement_id": emplacement, "quantite": 10, "seuil_minimum": 0
+        })
+    ids = []
+    for reference, etat, lignes in [
+        ("CMD-1", "Réservée", [(0, 2), (1, 1)]),
+        ("CMD-2", "Réservée", [(0, 3)]),
+        ("CMD-3", "Brouillon", [(1, 20)]),
+        ("CMD-4", "Brouillon", [(0, 1)]),
+    ]:
+        ids.append(client.post("/commandes/", json={
+            "reference": reference, "etat": etat,
+            "lignes": [{"article_id": articles[a], "quantite": q} for a, q in lignes]
+        }).json()["id"])
+    # CMD-3 holds the 9 units left and misses 11
+    client.post(f"/commandes/{ids[2]}/reservation", params={"partiel": True})
+    return articles, ids
+
+def test_plan_waves_merges_picks(client: TestClient, commandes):
+    """Test that a wave merges identical picks, is persisted and is not planned twice"""
+    articles, ids = commandes
+    simulation = client.post("/vagues/", params={"simulation": True}).json()
+    assert [sorted(v["commande_ids"]) for v in simulation] == [sorted(ids[:3])]
+    assert client.get(f"/vagues/{simulation[0]['vague_id']}").status_code == 404
+
+    vagues = client.post("/vagues/").json()
+    assert len(vagues) == 1
+    vague = vagues[0]
+    assert vague["strategie"] == "Articles communs"
+    assert (vague["nb_lignes"], vague["nb_missions"]) == (4, 2)
+    assert vague["articles_non_servis"] == [{"article_id": articles[1], "manque": 11}]
+
+    missions = client.get(f"/vagues/{vague['vague_id']}/missions").json()
+    assert [(m["article_id"], m["quantite"], m["ordre"]) for m in missions] == [(articles[0], 5, 1), (articles[1], 10, 2)]
+    assert client.get(f"/commandes/{ids[0]}").json()["vague_id"] == vague["vague_id"]
+    assert client.get(f"/commandes/{ids[0]}").json()["etat"] == "Préparée"
+    assert client.get(f"/commandes/{ids[3]}").json()["vague_id"] is None
+    assert client.post("/vagues/").json() == []
+    assert client.post("/vagues/", params={"max_lignes": 0}).status_code == 422
+
+def test_prepared_commandes_not_waved(client: TestClient, db_engine, commandes):
+    """Test that commandes already picked by missions are left out of the waves"""
+    articles, ids = commandes
+    client.post("/commandes/preparation", json={"commande_ids": [ids[1]]})
+    assert client.get(f"/commandes/{ids[1]}").json()["etat"] == "Préparée"
+    # Even set back to Réservée by hand, its allocations are linked to missions
+    with db_engine.begin() as connection:
+        connection.execute(update(Commande).where(Commande.id == ids[1]).values(etat=EtatCommande.RESERVEE))
+
+    vagues = client.post("/vagues/", params={"simulation": True}).json()
+    assert [sorted(v["commande_ids"]) for v in vagues] == [sorted([ids[0], ids[2]])]
+
+@pytest.mark.slow
+def test_plan_10k_orders(db_session):
+    """Test that 10k open orders are planned into waves quickly"""
+    aleatoire = random.Random(18)
+    emplacements = [{"id": str(uuid4()), "code": f"{chr(65 + a)}-{b:02d}", "type": TypeEmplacement.STOCKAGE,
+                     "capacite_poids_kg": 500, "capacite_volume_m3": 2} for a in range(20) for b in range(1, 41)]
+    articles = [{"id": str(uuid4()), "sku": f"SKU-{n}", "designation": "Carton",
+                 "categorie": CategorieArticle.PRODUIT, "poids_kg": 1, "volume_m3": 0.01} for n in range(2000)]
+    db_session.execute(insert(Emplacement), emplacements)
+    db_session.execute(insert(Article), articles)
+    db_session.execute(insert(Implantation), [
+        {"id": str(uuid4()), "article_id": article["id"], "emplacement_id": aleatoire.choice(emplacements)["id"],
+         "quantite": 1000, "seuil_minimum": 0} for article in articles
+    ])
+    commandes = [{"id": str(uuid4()), "reference": f"CMD-{n}", "etat": EtatCommande.RESERVEE} for n in range(10000)]
+    db_session.execute(insert(Commande), commandes)
+    db_session.execute(insert(LigneCommande), [
+        {"id": str(uuid4()), "commande_id": commande["id"], "article_id": article["id"], "quantite": 1}
+        for commande in commandes for article in aleatoire.sample(articles[:400], 4)
+    ])
+
+    debut = time.perf_counter()
+    vagues = plan_waves(db_session)
+    assert time.perf_counter() - debut < 15
+    assert sum(len(v["commande_ids"]) for v in vagues) == 10000
+    assert db_session.query(func.count(Mission.id)).scalar() == sum(v["nb_missions"] for v in vagues)
+    assert db_session.query(Commande).filter(Commande.vague_id.is_(None)).count() == 0